@@ -17,41 +17,68 @@ Usage examples:
   clawmarket.py award --task T123 --requester +31... --worker +31...
   clawmarket.py submit --task T123 --worker +31... --result "..."
   clawmarket.py approve --task T123 --requester +31...
+  clawmarket.py import --jsonl tasks.jsonl   (or --jsonl - for stdin)
+  clawmarket.py export --jsonl [--out backup.jsonl]
+  clawmarket.py maintain [--retention-days 30]   (expire overdue tasks, archive old ones)
+  clawmarket.py --profile open-tasks   (writes a sampled profile, see clawmarket_profile.py)
 
-All commands print JSON to stdout.
+All commands print JSON to stdout (`export` without --out prints the JSONL itself).
 """
 
 from __future__ import annotations
 
 import argparse
+import itertools
 import json
 import os
 import re
+import sys
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-STATE_PATH = os.path.join(os.path.dirname(__file__), "..", "state", "clawmarket.json")
+import clawmarket_store as store
+
+STATE_PATH = os.environ.get("CLAWMARKET_STATE") or os.path.join(
+    os.path.dirname(__file__), "..", "state", "clawmarket.json"
+)
+
+# A long-running caller (the API) can keep the state resident: _load() then
+# returns it without touching the file and _save() hands it to `_persist`
+# instead of writing (the API funnels writes through a single writer task).
+_resident: Optional[Dict[str, Any]] = None
+_persist: Optional[Callable[[Dict[str, Any]], None]] = None
+
+# Commands that never write; every other one holds the state lock.
+READ_ONLY_CMDS = ("open-tasks", "export")
 
 
 def _now() -> int:
     return int(time.time())
 
 
+def _empty_state() -> Dict[str, Any]:
+    return {"version": 1, "createdAt": _now(), "users": {}, "tasks": {}, "seq": 0}
+
+
+def use_resident_state(state: Dict[str, Any], persist: Callable[[Dict[str, Any]], None]) -> None:
+    global _resident, _persist
+    _resident = state
+    _persist = persist
+
+
 def _load() -> Dict[str, Any]:
-    try:
-        with open(STATE_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"version": 1, "createdAt": _now(), "users": {}, "tasks": {}, "seq": 0}
+    if _resident is not None:
+        return _resident
+    return store.load_state(STATE_PATH, lazy=True) or _empty_state()
 
 
 def _save(state: Dict[str, Any]) -> None:
-    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
-    tmp = STATE_PATH + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, STATE_PATH)
+    if _persist is not None:
+        _persist(state)
+        return
+    store.write_state(STATE_PATH, state)
 
 
 def _norm_phone(p: str) -> str:
@@ -63,9 +90,11 @@ def _norm_phone(p: str) -> str:
     return p
 
 
+_TASK_ID = re.compile(r"T(\d+)")
+
+
 def _new_task_id(state: Dict[str, Any]) -> str:
-    state["seq"] = int(state.get("seq") or 0) + 1
-    return f"T{state['seq']:06d}"
+    return _new_task_ids(state, 1)[0]
 
 
 def init_cmd(_: argparse.Namespace) -> Dict[str, Any]:
@@ -93,31 +122,81 @@ def register_cmd(args: argparse.Namespace) -> Dict[str, Any]:
     return {"ok": True, "user": u}
 
 
-def create_task_cmd(args: argparse.Namespace) -> Dict[str, Any]:
-    st = _load()
-    requester = _norm_phone(args.requester)
+_RELATIVE_DEADLINE = re.compile(r"^\s*(?:in\s+)?(\d+)\s*(m|min|mins|minutes?|h|hrs?|hours?|d|days?|w|weeks?)\s*$", re.I)
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
 
-    if requester not in st["users"]:
-        st["users"][requester] = {
-            "phone": requester,
-            "role": "requester",
-            "createdAt": _now(),
-            "updatedAt": _now(),
-            "reputation": {"approved": 0, "rejected": 0, "onTime": 0, "late": 0},
-        }
 
-    tid = _new_task_id(st)
-    task = {
+def _parse_deadline(deadline: Optional[str], now: int) -> Optional[int]:
+    """Best-effort deadline -> unix timestamp.
+
+    Accepts unix seconds (10+ digits), ISO 8601 dates/datetimes (naive = UTC; a bare date
+    means end of that day) and relative forms like "2h", "in 3 days", "45m".
+    Anything else stays a free-form note and returns None.
+    """
+    if not deadline:
+        return None
+    d = deadline.strip()
+    if d.isdigit() and len(d) >= 10:  # unix seconds (shorter numbers are not plausible ones)
+        return int(d)
+    if d.isdigit() and len(d) == 8:  # YYYYMMDD
+        d = f"{d[:4]}-{d[4:6]}-{d[6:]}"
+    m = _RELATIVE_DEADLINE.match(d)
+    if m:
+        return now + int(m.group(1)) * _UNIT_SECONDS[m.group(2)[0].lower()]
+    try:
+        dt = datetime.fromisoformat(d.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if len(d) == 10:  # YYYY-MM-DD
+        dt = dt.replace(hour=23, minute=59, second=59)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _new_task_ids(state: Dict[str, Any], n: int) -> List[str]:
+    """Allocate `n` task ids with a single bump of the sequence, skipping ids already taken."""
+    tasks = state.get("tasks", {})
+    seq = int(state.get("seq") or 0)
+    ids: List[str] = []
+    while len(ids) < n:
+        seq += 1
+        tid = f"T{seq:06d}"
+        if tid not in tasks:
+            ids.append(tid)
+    state["seq"] = seq
+    return ids
+
+
+def _claim_task_id(state: Dict[str, Any], tid: str) -> None:
+    """Move the sequence past a task id that was not allocated here (restore)."""
+    m = _TASK_ID.fullmatch(tid)
+    if m:
+        state["seq"] = max(int(state.get("seq") or 0), int(m.group(1)))
+
+
+def _new_task(
+    tid: str,
+    requester: str,
+    title: str,
+    instructions: str,
+    budget: float,
+    category: str,
+    deadline: Optional[str],
+    now: int,
+) -> Dict[str, Any]:
+    return {
         "id": tid,
-        "status": "open",  # open -> awarded -> submitted -> approved | rejected
+        "status": "open",  # open -> awarded -> submitted -> approved | rejected; open -> expired
         "requester": requester,
-        "title": args.title.strip(),
-        "instructions": args.instructions.strip(),
-        "budget": float(args.budget),
-        "category": args.category,
-        "deadline": args.deadline,
-        "createdAt": _now(),
-        "updatedAt": _now(),
+        "title": title.strip(),
+        "instructions": instructions.strip(),
+        "budget": float(budget),
+        "category": category,
+        "deadline": deadline,
+        "deadlineAt": _parse_deadline(deadline, now),
+        "createdAt": now,
+        "updatedAt": now,
         "proposals": [],
         "acceptedBy": [],
         "awardedTo": None,
@@ -125,18 +204,253 @@ def create_task_cmd(args: argparse.Namespace) -> Dict[str, Any]:
         "updates": [],
         "lastUpdateAt": None,
         "lastNudgedAt": None,
-        "history": [{"at": _now(), "event": "created", "by": requester}],
+        "history": [{"at": now, "event": "created", "by": requester}],
     }
+
+
+def _ensure_requester(st: Dict[str, Any], requester: str, now: int) -> None:
+    if requester not in st["users"]:
+        st["users"][requester] = {
+            "phone": requester,
+            "role": "requester",
+            "createdAt": now,
+            "updatedAt": now,
+            "reputation": {"approved": 0, "rejected": 0, "onTime": 0, "late": 0},
+        }
+
+
+def create_task_cmd(args: argparse.Namespace) -> Dict[str, Any]:
+    st = _load()
+    requester = _norm_phone(args.requester)
+    now = _now()
+    _ensure_requester(st, requester, now)
+
+    tid = _new_task_id(st)
+    task = _new_task(tid, requester, args.title, args.instructions, args.budget, args.category, args.deadline, now)
     st["tasks"][tid] = task
     _save(st)
     return {"ok": True, "task": task}
 
 
+def _check_task_record(rec: Any) -> Optional[str]:
+    """Validate a create-task record; returns an error code or None."""
+    if not isinstance(rec, dict):
+        return "not_an_object"
+    for k in ("requester", "title", "instructions"):
+        if not isinstance(rec.get(k), str) or not rec[k].strip():
+            return f"missing_{k}"
+    budget = rec.get("budget")
+    if isinstance(budget, bool) or not isinstance(budget, (int, float)):
+        try:
+            float(budget)  # type: ignore[arg-type]
+        except (TypeError, ValueError):
+            return "invalid_budget"
+    if not isinstance(rec.get("category", "general"), str):
+        return "invalid_category"
+    if rec.get("deadline") is not None and not isinstance(rec["deadline"], str):
+        return "invalid_deadline"
+    return None
+
+
+def import_chunk(
+    st: Dict[str, Any], records: List[Tuple[int, Any]], allow_restore: bool = True
+) -> Dict[str, Any]:
+    """Apply one chunk of import records to `st` (no save).
+
+    `records` are (line number, parsed JSON) pairs. A record is either a
+    create-task object (requester/title/instructions/budget[/category/deadline])
+    or, with `allow_restore`, an export record ({"type": "meta"|"user"|"task"})
+    that is restored as-is. New tasks get their ids in one allocation.
+    """
+    now = _now()
+    created: List[str] = []
+    restored = 0
+    errors: List[Dict[str, Any]] = []
+    fresh: List[Tuple[int, Dict[str, Any]]] = []
+
+    for line, rec in records:
+        if rec is None:
+            errors.append({"line": line, "error": "invalid_json"})
+            continue
+        kind = rec.get("type") if isinstance(rec, dict) else None
+        if kind is not None:
+            if not allow_restore:
+                errors.append({"line": line, "error": "restore_not_allowed"})
+            elif kind == "meta":
+                st["seq"] = max(int(st.get("seq") or 0), int(rec.get("seq") or 0))
+            elif kind == "user" and isinstance(rec.get("user"), dict) and rec["user"].get("phone"):
+                st["users"].setdefault(rec["user"]["phone"], rec["user"])
+                restored += 1
+            elif kind == "task" and isinstance(rec.get("task"), dict) and rec["task"].get("id"):
+                t = rec["task"]
+                if t["id"] in st["tasks"]:
+                    errors.append({"line": line, "error": "task_exists", "task": t["id"]})
+                    continue
+                st["tasks"][t["id"]] = t
+                _claim_task_id(st, t["id"])
+                restored += 1
+            else:
+                errors.append({"line": line, "error": "invalid_record"})
+            continue
+
+        err = _check_task_record(rec)
+        if err:
+            errors.append({"line": line, "error": err})
+            continue
+        fresh.append((line, rec))
+
+    for tid, (_, rec) in zip(_new_task_ids(st, len(fresh)) if fresh else [], fresh):
+        requester = _norm_phone(rec["requester"])
+        _ensure_requester(st, requester, now)
+        st["tasks"][tid] = _new_task(
+            tid,
+            requester,
+            rec["title"],
+            rec["instructions"],
+            rec["budget"],
+            rec.get("category") or "general",
+            rec.get("deadline"),
+            now,
+        )
+        created.append(tid)
+
+    return {"created": created, "restored": restored, "errors": errors}
+
+
+def _iter_jsonl(f) -> Iterator[Tuple[int, Any]]:
+    for n, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield n, json.loads(line)
+        except ValueError:
+            yield n, None
+
+
+def import_cmd(args: argparse.Namespace) -> Dict[str, Any]:
+    """Stream a JSONL file (or stdin) into the state, saving once per chunk."""
+    st = _load()
+    chunk = max(int(args.chunk), 1)
+    created = restored = 0
+    first_id = last_id = None
+    errors: List[Dict[str, Any]] = []
+    f = sys.stdin if args.jsonl == "-" else open(args.jsonl, "r", encoding="utf-8")
+    try:
+        records = _iter_jsonl(f)
+        while True:
+            batch = list(itertools.islice(records, chunk))
+            if not batch:
+                break
+            res = import_chunk(st, batch)
+            if res["created"] or res["restored"]:
+                _save(st)
+            created += len(res["created"])
+            restored += res["restored"]
+            if res["created"]:
+                first_id = first_id or res["created"][0]
+                last_id = res["created"][-1]
+            errors.extend(res["errors"][: max(0, 100 - len(errors))])
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    return {
+        "ok": True,
+        "created": created,
+        "restored": restored,
+        "firstId": first_id,
+        "lastId": last_id,
+        "errors": errors,
+    }
+
+
+def export_cmd(args: argparse.Namespace) -> Optional[Dict[str, Any]]:
+    """Write every record as JSONL to --out, or to stdout (then no summary is printed)."""
+    st = _load()
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    n = 0
+    try:
+        for rec in iter_export_records(st):
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            n += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if not args.out:
+        return None
+    return {"ok": True, "records": n, "path": args.out}
+
+
+def iter_open_tasks(st: Dict[str, Any], viewer: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Yield open tasks, most recent first (createdAt, then id), without building the full list.
+
+    Only the open ids are sorted, by createdAt from the index when the state is
+    lazy; insertion order is not enough once tasks are restored or imported.
+    If `viewer` is given, their own requested tasks are skipped.
+    """
+    tasks = st.get("tasks", {})
+    ids = list(store.iter_task_ids(tasks, ("open",)))
+    # Usually already in order, which sort() handles in one pass.
+    ids.sort(key=lambda tid: (int(store.task_meta(tasks, tid).get("createdAt") or 0), tid), reverse=True)
+    for tid in ids:
+        t = st["tasks"].get(tid)
+        if not t or t.get("status") != "open":
+            continue
+        if viewer and t.get("requester") == viewer:
+            continue
+        yield t
+
+
+def iter_needs_nudge(
+    st: Dict[str, Any], silence_seconds: int, now: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield awarded tasks with no update for >silence_seconds and not yet nudged."""
+    now = now or _now()
+    for tid in store.iter_task_ids(st.get("tasks", {}), ("awarded",)):
+        t = st["tasks"].get(tid)
+        if not t or t.get("status") != "awarded":
+            continue
+        last = t.get("lastUpdateAt") or t.get("updatedAt") or t.get("createdAt")
+        if not last:
+            continue
+        if now - int(last) <= int(silence_seconds):
+            continue
+        if t.get("lastNudgedAt"):
+            # one-time auto nudge
+            continue
+        worker = t.get("awardedTo")
+        requester = t.get("requester")
+        if not worker or not requester:
+            continue
+        yield {"task": t.get("id"), "worker": worker, "requester": requester}
+
+
+def iter_export_records(st: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield the whole state as flat records: one meta record, then users, then tasks."""
+    yield {
+        "type": "meta",
+        "version": st.get("version", 1),
+        "createdAt": st.get("createdAt"),
+        "seq": int(st.get("seq") or 0),
+    }
+    # One pass over everything: peek() parses without filling the record cache.
+    users = st.get("users", {})
+    peek = getattr(users, "peek", users.get)
+    for phone in list(users):
+        u = peek(phone)
+        if u is not None:
+            yield {"type": "user", "user": u}
+    tasks = st.get("tasks", {})
+    peek = getattr(tasks, "peek", tasks.get)
+    for tid in list(tasks):
+        t = peek(tid)
+        if t is not None:
+            yield {"type": "task", "task": t}
+
+
 def open_tasks_cmd(_: argparse.Namespace) -> Dict[str, Any]:
     st = _load()
-    tasks = [t for t in st["tasks"].values() if t.get("status") == "open"]
-    tasks.sort(key=lambda x: x.get("createdAt", 0), reverse=True)
-    return {"ok": True, "tasks": tasks}
+    return {"ok": True, "tasks": list(iter_open_tasks(st))}
 
 
 def propose_cmd(args: argparse.Namespace) -> Dict[str, Any]:
@@ -266,6 +580,13 @@ def submit_cmd(args: argparse.Namespace) -> Dict[str, Any]:
         return {"ok": False, "error": "not_awarded_worker"}
 
     sub = {"worker": worker, "result": args.result, "at": _now()}
+    if task.get("deadlineAt"):
+        sub["late"] = sub["at"] > int(task["deadlineAt"])
+        u = st["users"].get(worker)
+        if u and u.get("reputation") is not None:
+            key = "late" if sub["late"] else "onTime"
+            u["reputation"][key] = int(u["reputation"].get(key) or 0) + 1
+            st["users"][worker] = u
     task["status"] = "submitted"
     task["submission"] = sub
     task["updatedAt"] = _now()
@@ -293,15 +614,42 @@ def approve_cmd(args: argparse.Namespace) -> Dict[str, Any]:
 
     worker = task.get("awardedTo")
     if worker and worker in st["users"]:
-        st["users"][worker]["reputation"]["approved"] += 1
+        u = st["users"][worker]
+        u["reputation"]["approved"] += 1
+        st["users"][worker] = u
 
     st["tasks"][tid] = task
     _save(st)
     return {"ok": True, "task": task}
 
 
+def maintain_cmd(args: argparse.Namespace) -> Dict[str, Any]:
+    """Expire overdue tasks and archive/purge old expired ones (cron-friendly)."""
+    import clawmarket_expiry as expiry
+
+    st = _load()
+    idx = expiry.ExpiryIndex(
+        retention_seconds=int(args.retention_days * 86400) if args.retention_days is not None else None
+    )
+    backfilled = idx.rebuild(st, _parse_deadline)
+    res = idx.run_due(st, budget=10**9)
+    if backfilled or res["expired"] or res["overdue"] or res["removed"]:
+        # Archive before saving: the archive skips ids it already holds, so
+        # a run that dies in between loses nothing and is safe to repeat.
+        expiry.append_archive(STATE_PATH, res["removed"], idx.mode)
+        _save(st)
+    return {
+        "ok": True,
+        "expired": res["expired"],
+        "overdue": res["overdue"],
+        "removed": [t.get("id") for t in res["removed"]],
+        "mode": idx.mode,
+    }
+
+
 def main() -> int:
     p = argparse.ArgumentParser()
+    p.add_argument("--profile", action="store_true", help="write a sampling profile of this run")
     sub = p.add_subparsers(dest="cmd", required=True)
 
     sub.add_parser("init")
@@ -320,6 +668,14 @@ def main() -> int:
 
     sub.add_parser("open-tasks")
 
+    im = sub.add_parser("import")
+    im.add_argument("--jsonl", required=True, help="JSONL file, or - for stdin")
+    im.add_argument("--chunk", type=int, default=5000, help="records per save")
+
+    ex = sub.add_parser("export")
+    ex.add_argument("--jsonl", action="store_true", required=True)
+    ex.add_argument("--out", default=None)
+
     pr = sub.add_parser("propose")
     pr.add_argument("--task", required=True)
     pr.add_argument("--worker", required=True)
@@ -351,8 +707,38 @@ def main() -> int:
     ap.add_argument("--task", required=True)
     ap.add_argument("--requester", required=True)
 
+    mt = sub.add_parser("maintain")
+    mt.add_argument("--retention-days", type=float, default=None)
+
     args = p.parse_args()
 
+    session = None
+    if args.profile:
+        import threading
+
+        import clawmarket_profile as prof
+
+        session = prof.start(f"cli {args.cmd}", threads={threading.get_ident()})
+
+    try:
+        if args.cmd in READ_ONLY_CMDS:
+            out = _dispatch(args)
+        else:
+            # Shared with the API: load, change and write back without interleaving.
+            with store.state_lock(STATE_PATH):
+                out = _dispatch(args)
+    finally:
+        if session is not None:
+            path = prof.finish(session)
+            if path:
+                print(f"profile: {path}", file=sys.stderr)
+
+    if out is not None:
+        print(json.dumps(out, ensure_ascii=False))
+    return 0
+
+
+def _dispatch(args: argparse.Namespace) -> Optional[Dict[str, Any]]:
     if args.cmd == "init":
         out = init_cmd(args)
     elif args.cmd == "register":
@@ -361,6 +747,10 @@ def main() -> int:
         out = create_task_cmd(args)
     elif args.cmd == "open-tasks":
         out = open_tasks_cmd(args)
+    elif args.cmd == "import":
+        out = import_cmd(args)
+    elif args.cmd == "export":
+        out = export_cmd(args)
     elif args.cmd == "propose":
         out = propose_cmd(args)
     elif args.cmd == "accept":
@@ -373,11 +763,11 @@ def main() -> int:
         out = submit_cmd(args)
     elif args.cmd == "approve":
         out = approve_cmd(args)
+    elif args.cmd == "maintain":
+        out = maintain_cmd(args)
     else:
         out = {"ok": False, "error": "unknown_cmd"}
-
-    print(json.dumps(out, ensure_ascii=False))
-    return 0
+    return out
 
 
 if __name__ == "__main__":
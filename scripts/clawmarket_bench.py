@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Concurrency benchmark for the ClawMarket API.
+
+Opens N keep-alive connections at once, each issuing requests back to back for
+a fixed time (mostly reads: open tasks and single tasks, plus a share of
+proposals), and reports throughput, latency percentiles and errors for each N.
+The last line is the largest N that stayed within the p99 budget with no errors.
+
+Stdlib only (raw HTTP/1.1 over asyncio streams), so the client itself is not
+the bottleneck at a few thousand connections.
+
+Usage:
+  clawmarket_bench.py --serve                       # spawn uvicorn on a temp state
+  clawmarket_bench.py --url http://127.0.0.1:8091   # hit a running instance (it WILL write proposals)
+  clawmarket_bench.py --serve --levels 100,1000,4000 --seconds 10 --tasks 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+import clawmarket as cm
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _seed(path: str, n: int) -> None:
+    st = cm._empty_state()  # noqa: SLF001
+    now = cm._now()  # noqa: SLF001
+    for i in range(n):
+        tid = cm._new_task_id(st)  # noqa: SLF001
+        st["tasks"][tid] = {
+            "id": tid,
+            "status": "open" if i % 3 else "awarded",
+            "requester": f"+1000{i % 97}",
+            "title": f"bench task {i}",
+            "instructions": "x" * 200,
+            "budget": 10.0,
+            "category": "general",
+            "deadline": None,
+            "createdAt": now,
+            "updatedAt": now,
+            "proposals": [],
+            "acceptedBy": [],
+            "awardedTo": None if i % 3 else "+2000",
+            "submission": None,
+            "updates": [],
+            "lastUpdateAt": now,
+            "lastNudgedAt": None,
+            "history": [{"at": now, "event": "created", "by": f"+1000{i % 97}"}],
+        }
+    cm.store.write_state(path, st)
+
+
+def _serve(tasks: int) -> Tuple[subprocess.Popen, str, str]:
+    tmp = tempfile.mkdtemp(prefix="clawmarket-bench-")
+    state = os.path.join(tmp, "clawmarket.json")
+    _seed(state, tasks)
+    port = _free_port()
+    env = dict(os.environ, CLAWMARKET_STATE=state)
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "clawmarket_api:app",
+            "--app-dir", os.path.join(ROOT, "services"),
+            "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", "--backlog", "8192",
+        ],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/ready", timeout=1) as r:
+                if r.status == 200:
+                    return proc, url, tmp
+        except Exception:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("API did not become ready")
+
+
+def _task_ids(url: str, n: int = 200) -> List[str]:
+    req = urllib.request.Request(url + f"/tasks/open?limit={n}")
+    with urllib.request.urlopen(req, timeout=30) as r:
+        return [t["id"] for t in json.load(r)["tasks"]]
+
+
+async def _request(reader, writer, host: str, method: str, path: str, body: Optional[bytes]) -> int:
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+    if body is not None:
+        head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+    writer.write(head.encode() + b"\r\n" + (body or b""))
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("closed")
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        k, _, v = line.decode("latin-1").partition(":")
+        if k.lower() == "content-length":
+            length = int(v.strip())
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _conn(host: str, port: int, ids: List[str], until: float, write_ratio: float, lat: List[float], errs: List[int]) -> None:
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        errs[0] += 1
+        return
+    rnd = random.Random()
+    try:
+        while time.perf_counter() < until:
+            x = rnd.random()
+            body = None
+            if x < write_ratio:
+                method, path = "POST", "/tasks/propose"
+                body = json.dumps({"task": rnd.choice(ids), "worker": f"+3{rnd.randrange(10**6)}", "price": 12}).encode()
+            elif x < 0.5:
+                method, path = "GET", "/tasks/open?limit=3"
+            else:
+                method, path = "GET", "/tasks/" + rnd.choice(ids)
+            t0 = time.perf_counter()
+            try:
+                status = await _request(reader, writer, host, method, path, body)
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                errs[0] += 1
+                return
+            lat.append(time.perf_counter() - t0)
+            if status >= 500:
+                errs[0] += 1
+    finally:
+        writer.close()
+
+
+async def _level(url: str, conns: int, seconds: float, ids: List[str], write_ratio: float) -> Dict[str, Any]:
+    u = urllib.parse.urlparse(url)
+    lat: List[float] = []
+    errs = [0]
+    until = time.perf_counter() + seconds
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_conn(u.hostname or "127.0.0.1", u.port or 80, ids, until, write_ratio, lat, errs) for _ in range(conns)))
+    wall = time.perf_counter() - t0
+    lat.sort()
+
+    def pct(p: float) -> float:
+        return lat[min(len(lat) - 1, int(p * len(lat)))] * 1000 if lat else float("nan")
+
+    return {"conns": conns, "requests": len(lat), "rps": len(lat) / wall, "p50": pct(0.50), "p99": pct(0.99), "errors": errs[0]}
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--url", default=None)
+    p.add_argument("--serve", action="store_true", help="spawn uvicorn on a seeded temp state")
+    p.add_argument("--tasks", type=int, default=5000)
+    p.add_argument("--levels", default="10,100,500,1000,2000")
+    p.add_argument("--seconds", type=float, default=5)
+    p.add_argument("--write-ratio", type=float, default=0.05)
+    p.add_argument("--p99-ms", type=float, default=1000)
+    args = p.parse_args()
+
+    if not args.serve and not args.url:
+        p.error("give --url or --serve")
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    proc = None
+    url = args.url
+    if args.serve:
+        proc, url, tmp = _serve(args.tasks)
+        print(f"serving {url} (state in {tmp}, {args.tasks} tasks)")
+    try:
+        ids = _task_ids(url)
+        sustained = 0
+        print(f"{'conns':>6} {'requests':>9} {'rps':>9} {'p50_ms':>8} {'p99_ms':>8} {'errors':>7}")
+        for n in [int(x) for x in args.levels.split(",") if x.strip()]:
+            r = asyncio.run(_level(url, n, args.seconds, ids, args.write_ratio))
+            print(f"{r['conns']:>6} {r['requests']:>9} {r['rps']:>9.0f} {r['p50']:>8.1f} {r['p99']:>8.1f} {r['errors']:>7}")
+            if r["errors"] == 0 and r["p99"] <= args.p99_ms:
+                sustained = n
+        print(f"SUSTAINED_CONNECTIONS={sustained}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Deadline expiry + retention for ClawMarket tasks.
+
+Two min-heaps keyed by time replace full scans:
+  - deadlines: (deadlineAt, task id) for open/awarded tasks. When a deadline
+    passes, an open task becomes `expired`; an awarded task is flagged
+    `overdueAt` once (a later submit is counted as late, see submit_cmd).
+  - stale: (updatedAt + stale, task id) for open tasks without a deadline.
+    When due, the task becomes `expired` too, so abandoned tasks do not stay
+    in the state forever.
+  - retention: (updatedAt + retention, task id) for tasks in RETAIN_STATUSES.
+    When due, the task is archived to a JSONL file (or just dropped with
+    mode "purge") and removed from the state. Archiving skips ids already in
+    the archive, so a run that died before saving can simply be repeated.
+
+Heaps are built once from the index metadata (no records materialized) and
+kept current with track(); entries are verified against the task when popped,
+so outdated ones cost nothing. rebuild() also fills in deadlineAt for tasks
+written before it existed (persisted with the next save). run_due() does a bounded amount of work per call,
+so a background job can call it often.
+
+Config:
+  CLAWMARKET_RETENTION_DAYS   days an expired task is kept (default 30)
+  CLAWMARKET_STALE_DAYS       days without an update before an open task with
+                              no deadline expires (default 90, 0 = never)
+  CLAWMARKET_RETENTION_MODE   archive | purge (default archive)
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import clawmarket_store as store
+
+DEADLINE_STATUSES = ("open", "awarded")
+RETAIN_STATUSES = ("expired",)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+class ExpiryIndex:
+    def __init__(
+        self,
+        retention_seconds: Optional[int] = None,
+        mode: Optional[str] = None,
+        stale_seconds: Optional[int] = None,
+    ) -> None:
+        self.retention_seconds = (
+            retention_seconds if retention_seconds is not None else _env_int("CLAWMARKET_RETENTION_DAYS", 30) * 86400
+        )
+        self.stale_seconds = stale_seconds if stale_seconds is not None else _env_int("CLAWMARKET_STALE_DAYS", 90) * 86400
+        self.mode = mode or os.environ.get("CLAWMARKET_RETENTION_MODE") or "archive"
+        self._deadlines: List[Tuple[int, str]] = []
+        self._stale: List[Tuple[int, str]] = []
+        self._retention: List[Tuple[int, str]] = []
+
+    def rebuild(self, st: Dict[str, Any], parse_deadline: Optional[Callable[[str, int], Optional[int]]] = None) -> int:
+        """Rebuild the heaps from the state. Returns how many tasks got a deadlineAt.
+
+        With `parse_deadline`, open/awarded tasks that have a `deadline` but no
+        `deadlineAt` get one (assigned back, so the next save persists it).
+        """
+        tasks = st.get("tasks", {})
+        self._deadlines = []
+        self._stale = []
+        self._retention = []
+        backfilled = 0
+        for tid in list(tasks):
+            meta = store.task_meta(tasks, tid)
+            if parse_deadline is not None and meta.get("status") in DEADLINE_STATUSES and not meta.get("deadlineAt"):
+                if _backfill(tasks, tid, parse_deadline):
+                    meta = store.task_meta(tasks, tid)
+                    backfilled += 1
+            for heap, entry in self._entries(tid, meta):
+                heap.append(entry)
+        heapq.heapify(self._deadlines)
+        heapq.heapify(self._stale)
+        heapq.heapify(self._retention)
+        return backfilled
+
+    def track(self, task: Dict[str, Any]) -> None:
+        """Schedule a task that was created or changed outside run_due()."""
+        if task.get("id"):
+            for heap, entry in self._entries(task["id"], task):
+                heapq.heappush(heap, entry)
+
+    def _entries(self, tid: str, meta: Dict[str, Any]):
+        status = meta.get("status")
+        if status in DEADLINE_STATUSES and meta.get("deadlineAt"):
+            yield self._deadlines, (int(meta["deadlineAt"]), tid)
+        elif status == "open" and self.stale_seconds > 0:
+            yield self._stale, (int(meta.get("updatedAt") or 0) + self.stale_seconds, tid)
+        elif status in RETAIN_STATUSES:
+            yield self._retention, (int(meta.get("updatedAt") or 0) + self.retention_seconds, tid)
+
+    def next_due(self) -> Optional[int]:
+        heads = [h[0][0] for h in (self._deadlines, self._stale, self._retention) if h]
+        return min(heads) if heads else None
+
+    def run_due(self, st: Dict[str, Any], now: Optional[int] = None, budget: int = 500) -> Dict[str, Any]:
+        """Apply up to `budget` due transitions to `st` (no save, no archive write).
+
+        Returns {"expired": [ids], "overdue": [ids], "removed": [task dicts]};
+        the caller appends `removed` to the archive before saving the state.
+        """
+        now = int(now or time.time())
+        tasks = st.get("tasks", {})
+        expired: List[str] = []
+        overdue: List[str] = []
+        removed: List[Dict[str, Any]] = []
+
+        while self._deadlines and self._deadlines[0][0] <= now and budget > 0:
+            due, tid = heapq.heappop(self._deadlines)
+            t = tasks.get(tid)
+            if not t or t.get("deadlineAt") != due:
+                continue
+            budget -= 1
+            if t.get("status") == "open":
+                t["status"] = "expired"
+                t["updatedAt"] = now
+                t.setdefault("history", []).append({"at": now, "event": "expired"})
+                tasks[tid] = t
+                expired.append(tid)
+                heapq.heappush(self._retention, (now + self.retention_seconds, tid))
+            elif t.get("status") == "awarded" and not t.get("overdueAt"):
+                t["overdueAt"] = now
+                t["updatedAt"] = now
+                t.setdefault("history", []).append({"at": now, "event": "overdue"})
+                tasks[tid] = t
+                overdue.append(tid)
+
+        while self._stale and self._stale[0][0] <= now and budget > 0:
+            due, tid = heapq.heappop(self._stale)
+            meta = store.task_meta(tasks, tid) if tid in tasks else None
+            if not meta or meta.get("status") != "open" or meta.get("deadlineAt"):
+                continue
+            stale_at = int(meta.get("updatedAt") or 0) + self.stale_seconds
+            if stale_at > now:
+                heapq.heappush(self._stale, (stale_at, tid))
+                continue
+            budget -= 1
+            t = tasks[tid]
+            t["status"] = "expired"
+            t["updatedAt"] = now
+            t.setdefault("history", []).append({"at": now, "event": "expired", "reason": "stale"})
+            tasks[tid] = t
+            expired.append(tid)
+            heapq.heappush(self._retention, (now + self.retention_seconds, tid))
+
+        while self._retention and self._retention[0][0] <= now and budget > 0:
+            due, tid = heapq.heappop(self._retention)
+            meta = store.task_meta(tasks, tid) if tid in tasks else None
+            if not meta or meta.get("status") not in RETAIN_STATUSES:
+                continue
+            keep_until = int(meta.get("updatedAt") or 0) + self.retention_seconds
+            if keep_until > now:
+                heapq.heappush(self._retention, (keep_until, tid))
+                continue
+            budget -= 1
+            t = tasks[tid]
+            del tasks[tid]
+            removed.append(t)
+
+        return {"expired": expired, "overdue": overdue, "removed": removed}
+
+
+def archive_path(state_path: str) -> str:
+    base, _ = os.path.splitext(state_path)
+    return base + ".archive.jsonl"
+
+
+def _backfill(tasks: Any, tid: str, parse_deadline: Callable[[str, int], Optional[int]]) -> bool:
+    peek = getattr(tasks, "peek", None)
+    t = peek(tid) if peek is not None else tasks.get(tid)
+    if not t or not isinstance(t.get("deadline"), str):
+        return False
+    at = parse_deadline(t["deadline"], int(t.get("createdAt") or time.time()))
+    if at is None:
+        return False
+    tasks[tid] = dict(t, deadlineAt=at)
+    return True
+
+
+def _archived_ids(path: str) -> Tuple[set, bool]:
+    """Ids in the archive, and whether it ends in a torn (unterminated) line."""
+    ids = set()
+    torn = False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                torn = not line.endswith("\n")
+                try:
+                    ids.add(json.loads(line).get("id"))
+                except (ValueError, AttributeError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return ids, torn
+
+
+def append_archive(state_path: str, tasks: List[Dict[str, Any]], mode: str = "archive") -> None:
+    """Append `tasks` to the archive, skipping ids it already holds."""
+    if not tasks or mode == "purge":
+        return
+    path = archive_path(state_path)
+    done, torn = _archived_ids(path)
+    with open(path, "a", encoding="utf-8") as f:
+        if torn:
+            f.write("\n")
+        for t in tasks:
+            if t.get("id") not in done:
+                f.write(json.dumps(t, ensure_ascii=False) + "\n")
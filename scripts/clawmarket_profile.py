@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Opt-in sampling profiler for the ClawMarket CLI and API.
+
+A single background thread wakes every `interval` seconds, grabs the Python
+stacks of the threads it was asked to watch (sys._current_frames) and counts
+them. Nothing is traced, so the profiled code runs at full speed; the cost is
+one stack walk per watched thread per tick.
+
+The API profiles on its event loop thread, which interleaves every request in
+flight, so a request's session is tied to its asyncio task and only ticks on
+which that task is running are counted. Work the handler hands to other tasks
+or threads is not attributed to it. In slow-request mode every request gets a
+session; the extra cost per tick is one current-task lookup per request.
+
+Results are written as collapsed stacks (`*.folded`, for flamegraph.pl /
+speedscope / inferno) or as speedscope JSON, into a directory that keeps only
+the newest `keep` files.
+
+Configuration (API, read at import; can be changed via POST /admin/profile):
+  CLAWMARKET_PROFILE_SAMPLE=N      profile 1 in N requests (0 = off)
+  CLAWMARKET_PROFILE_SLOW_MS=MS    profile every request, keep only slower ones (0 = off)
+  CLAWMARKET_PROFILE_INTERVAL_MS   sampling interval (default 5)
+  CLAWMARKET_PROFILE_DIR           output directory (default state/profiles)
+  CLAWMARKET_PROFILE_KEEP          files to keep (default 200)
+  CLAWMARKET_PROFILE_FORMAT        collapsed | speedscope (default collapsed)
+
+CLI: `clawmarket.py --profile <cmd> ...` always profiles that one invocation.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional, Set
+
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), "..", "state", "profiles")
+
+# Innermost frames that mean "this thread is parked", e.g. idle threadpool
+# workers or the event loop waiting in select(). Their samples are dropped.
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+@dataclass
+class ProfileConfig:
+    sample_every: int = 0
+    slow_ms: float = 0.0
+    interval_ms: float = 5.0
+    out_dir: str = PROFILE_DIR
+    keep: int = 200
+    fmt: str = "collapsed"
+
+    @classmethod
+    def from_env(cls) -> "ProfileConfig":
+        return cls(
+            sample_every=int(_env_float("CLAWMARKET_PROFILE_SAMPLE", 0)),
+            slow_ms=_env_float("CLAWMARKET_PROFILE_SLOW_MS", 0),
+            interval_ms=_env_float("CLAWMARKET_PROFILE_INTERVAL_MS", 5),
+            out_dir=os.environ.get("CLAWMARKET_PROFILE_DIR") or PROFILE_DIR,
+            keep=int(_env_float("CLAWMARKET_PROFILE_KEEP", 200)),
+            fmt=os.environ.get("CLAWMARKET_PROFILE_FORMAT") or "collapsed",
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_every > 0 or self.slow_ms > 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES
+
+
+@dataclass(eq=False)
+class Session:
+    label: str
+    threads: Optional[Set[int]]  # None = every thread except the sampler
+    keep_if_ms: float = 0.0  # 0 = always write
+    task: Optional[asyncio.Task] = None  # count only ticks where this task runs
+    started: float = field(default_factory=time.perf_counter)
+    stacks: Counter = field(default_factory=Counter)
+    samples: int = 0
+
+    def running(self) -> bool:
+        return self.task is None or asyncio.current_task(self.task.get_loop()) is self.task
+
+    def add(self, frames: Dict[int, Any], sampler_ident: Optional[int]) -> None:
+        for ident, frame in frames.items():
+            if ident == sampler_ident:
+                continue
+            if self.threads is not None and ident not in self.threads:
+                continue
+            if _is_idle(frame):
+                continue
+            stack = []
+            f = frame
+            while f is not None:
+                stack.append(_frame_label(f))
+                f = f.f_back
+            stack.reverse()
+            if self.threads is None or len(self.threads) > 1:
+                stack.insert(0, f"thread-{ident}")
+            self.stacks[tuple(stack)] += 1
+            self.samples += 1
+
+
+class _Sampler:
+    """One shared sampling thread; runs only while at least one session is active."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sessions: Set[Session] = set()
+        self._thread: Optional[threading.Thread] = None
+        self.interval = 0.005
+
+    def add(self, s: Session) -> None:
+        with self._lock:
+            self._sessions.add(s)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="clawmarket-profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, s: Session) -> None:
+        with self._lock:
+            self._sessions.discard(s)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+                sessions = list(self._sessions)
+            # The task must be current both before and after the snapshot.
+            running = [s for s in sessions if s.running()]
+            frames = sys._current_frames()  # noqa: SLF001
+            for s in running:
+                if s.running():
+                    s.add(frames, me)
+            del frames
+
+
+_SAMPLER = _Sampler()
+_COUNTER = itertools.count(1)
+config = ProfileConfig.from_env()
+
+
+def configure(**changes: Any) -> ProfileConfig:
+    """Update the process-wide config in place (admin endpoint)."""
+    for k, v in changes.items():
+        if v is not None and hasattr(config, k):
+            setattr(config, k, type(getattr(config, k))(v))
+    return config
+
+
+def start(
+    label: str,
+    threads: Optional[Set[int]] = None,
+    keep_if_ms: float = 0.0,
+    task: Optional[asyncio.Task] = None,
+) -> Session:
+    """Start profiling unconditionally (used by the CLI `--profile` flag)."""
+    _SAMPLER.interval = max(config.interval_ms, 0.5) / 1000.0
+    s = Session(label=label, threads=threads, keep_if_ms=keep_if_ms, task=task)
+    _SAMPLER.add(s)
+    return s
+
+
+def maybe_start(
+    label: str, threads: Optional[Set[int]] = None, task: Optional[asyncio.Task] = None
+) -> Optional[Session]:
+    """Start a session if this request is sampled (1-in-N) or slow-tracking is on."""
+    if not config.enabled:
+        return None
+    if config.sample_every > 0 and next(_COUNTER) % config.sample_every == 0:
+        return start(label, threads, task=task)
+    if config.slow_ms > 0:
+        return start(label, threads, keep_if_ms=config.slow_ms, task=task)
+    return None
+
+
+def finish(s: Session) -> Optional[str]:
+    """Stop a session and write it out if it qualifies. Returns the file path.
+
+    Writing is blocking file I/O; async callers run this in a thread.
+    """
+    _SAMPLER.remove(s)
+    elapsed_ms = (time.perf_counter() - s.started) * 1000.0
+    if s.keep_if_ms and elapsed_ms < s.keep_if_ms:
+        return None
+    if not s.stacks:
+        return None
+    return _write(s, elapsed_ms)
+
+
+def _write(s: Session, elapsed_ms: float) -> str:
+    os.makedirs(config.out_dir, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", s.label).strip("_")[:60] or "profile"
+    base = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{slug}-{int(elapsed_ms)}ms"
+
+    if config.fmt == "speedscope":
+        path = os.path.join(config.out_dir, base + ".speedscope.json")
+        doc = _speedscope(s, elapsed_ms)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+    else:
+        path = os.path.join(config.out_dir, base + ".folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in s.stacks.most_common():
+                f.write(";".join(stack) + f" {n}\n")
+
+    _rotate(config.out_dir, config.keep)
+    return path
+
+
+def _speedscope(s: Session, elapsed_ms: float) -> Dict[str, Any]:
+    frames: Dict[str, int] = {}
+    samples = []
+    weights = []
+    unit_ms = elapsed_ms / max(s.samples, 1)
+    for stack, n in s.stacks.items():
+        samples.append([frames.setdefault(name, len(frames)) for name in stack])
+        weights.append(n * unit_ms)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": [{"name": name} for name in frames]},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": s.label,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+        "name": s.label,
+        "exporter": "clawmarket_profile",
+    }
+
+
+def _rotate(out_dir: str, keep: int) -> None:
+    try:
+        names = [n for n in os.listdir(out_dir) if n.endswith((".folded", ".speedscope.json"))]
+    except FileNotFoundError:
+        return
+    if len(names) <= keep:
+        return
+    paths = sorted((os.path.join(out_dir, n) for n in names), key=os.path.getmtime)
+    for p in paths[: len(paths) - keep]:
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,698 @@
+#!/usr/bin/env python3
+"""On-disk layout + offset index for the ClawMarket state file.
+
+The state is still a single JSON document (state/clawmarket.json) and can be read
+with a plain json.load, but it is written with one user / one task per line, and
+a sidecar index (clawmarket.json.idx) records where every user and task record
+starts, its length, and for tasks a few scheduling fields (status, createdAt,
+deadlineAt, updatedAt; see META_FIELDS).
+
+A reader (the API, and the CLI) can then mmap the file and materialize records
+one at a time on first access instead of parsing the whole marketplace before
+it can answer anything. Parsed records live in a bounded LRU, so memory is the
+index plus a fixed number of records however long the history gets. Saving
+copies untouched records from the old file as raw bytes, so a lazily loaded
+state is never fully parsed just to be written back.
+
+The index is only trusted when the file size and mtime it recorded still match;
+otherwise callers fall back to a full parse.
+
+The CLI and the API serialize changes with an exclusive flock on
+clawmarket.json.lock (state_lock), held from loading the state to writing it
+back, so neither writes over the other.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import logging
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+INDEX_SUFFIX = ".idx"
+LOCK_SUFFIX = ".lock"
+INDEX_FORMAT = 3
+
+# Parsed records kept per mapping (tasks, users) by a lazily loaded state.
+RECORD_CACHE = int(os.environ.get("CLAWMARKET_RECORD_CACHE") or 20_000)
+
+# Task fields copied into the index so listings and the expiry job can filter
+# and schedule without materializing records.
+META_FIELDS = ("status", "createdAt", "deadlineAt", "updatedAt")
+
+Stamp = Tuple[int, int]
+
+log = logging.getLogger("clawmarket")
+
+
+def file_stamp(path: str) -> Optional[Stamp]:
+    try:
+        s = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (s.st_size, s.st_mtime_ns)
+
+
+class StateChanged(RuntimeError):
+    """The state file was replaced by someone else since it was loaded."""
+
+
+def lock_file(path: str):
+    """Block until the state lock of `path` is held; returns the handle for unlock_file()."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    f = open(path + LOCK_SUFFIX, "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX)
+    except BaseException:
+        f.close()
+        raise
+    return f
+
+
+def unlock_file(f) -> None:
+    try:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    finally:
+        f.close()
+
+
+@contextmanager
+def state_lock(path: str) -> Iterator[None]:
+    """Hold the state lock of `path` (the CLI wraps every mutating command in it)."""
+    f = lock_file(path)
+    try:
+        yield
+    finally:
+        unlock_file(f)
+
+
+def _meta_tuple(rec: Dict[str, Any], fields: Tuple[str, ...] = META_FIELDS) -> Tuple[Any, ...]:
+    return tuple(rec.get(k) for k in fields)
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class LazyRecords(MutableMapping):
+    """Record mapping (tasks or users) backed by an mmapped state file.
+
+    Records are parsed on first access. Parsed records are kept in a bounded
+    LRU (`max_cached`, env CLAWMARKET_RECORD_CACHE); only records that match the
+    file on disk are evicted, so memory holds the index plus at most that many
+    parsed records, plus whatever was assigned and not yet saved.
+
+    Writers must assign changed records back (`tasks[tid] = task`, which every
+    *_cmd already does): only assigned records are re-encoded on save,
+    everything else is copied from the previous file as raw bytes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        entries: List[list],
+        meta_fields: Tuple[str, ...] = META_FIELDS,
+        max_cached: Optional[int] = None,
+    ) -> None:
+        self.meta_fields = meta_fields
+        self.max_cached = max_cached if max_cached is not None else RECORD_CACHE
+        self._lock = threading.RLock()
+        self._slots: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._meta: Dict[str, Tuple[Any, ...]] = {}
+        # clean (matches the file, evictable) / assigned since the last save /
+        # handed to a save that has not been applied yet
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._dirty: Dict[str, Dict[str, Any]] = {}
+        self._saving: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._clock = 0
+        self._mm: Optional[mmap.mmap] = None
+        self._rebind(path, entries)
+
+    def _rebind(self, path: str, entries: List[list]) -> None:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with self._lock:
+            old = self._mm
+            self._mm = mm
+            for key, off, length, *meta in entries:
+                # Skip records deleted while the file was being written.
+                if old is not None and key not in self._slots:
+                    continue
+                self._slots[key] = (off, length)
+                self._meta[key] = tuple(meta)
+            # What was being saved is on disk now and may be evicted.
+            for key, rec in self._saving.items():
+                self._cache[key] = rec
+            self._saving.clear()
+            self._trim()
+            if old is not None:
+                old.close()
+
+    def _held(self, key: str) -> Optional[Dict[str, Any]]:
+        rec = self._dirty.get(key)
+        if rec is None:
+            rec = self._saving.get(key)
+        if rec is None:
+            rec = self._cache.get(key)
+        return rec
+
+    def _parse(self, key: str) -> Dict[str, Any]:
+        slot = self._slots[key]
+        if slot is None:
+            raise KeyError(key)
+        off, length = slot
+        return json.loads(self._mm[off : off + length])  # type: ignore[index]
+
+    def _trim(self) -> None:
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+    # Mapping protocol
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            rec = self._dirty.get(key)
+            if rec is None:
+                rec = self._saving.get(key)
+            if rec is not None:
+                return rec
+            rec = self._cache.get(key)
+            if rec is not None:
+                self._cache.move_to_end(key)
+                return rec
+            rec = self._parse(key)
+            self._cache[key] = rec
+            self._trim()
+            return rec
+
+    def __setitem__(self, key: str, rec: Dict[str, Any]) -> None:
+        with self._lock:
+            if key not in self._slots:
+                self._slots[key] = None
+            self._cache.pop(key, None)
+            self._saving.pop(key, None)
+            self._dirty[key] = rec
+            self._clock += 1
+            self._versions[key] = self._clock
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            del self._slots[key]
+            self._meta.pop(key, None)
+            self._cache.pop(key, None)
+            self._dirty.pop(key, None)
+            self._saving.pop(key, None)
+            self._versions.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._slots
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._slots)
+
+    def __reversed__(self) -> Iterator[str]:
+        return reversed(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    # Index-backed helpers
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """The record without caching it (for one-pass scans like export); None if unknown."""
+        with self._lock:
+            rec = self._held(key)
+            if rec is not None or key not in self._slots:
+                return rec
+            return self._parse(key)
+
+    def status_of(self, key: str) -> Optional[str]:
+        """Status without materializing the record (None if unknown)."""
+        rec = self._held(key)
+        if rec is not None:
+            return rec.get("status")
+        meta = self._meta.get(key)
+        return meta[0] if meta else None
+
+    def meta_of(self, key: str) -> Dict[str, Any]:
+        """`meta_fields` of a record without materializing it."""
+        rec = self._held(key)
+        if rec is not None:
+            return {k: rec.get(k) for k in self.meta_fields}
+        return dict(zip(self.meta_fields, self._meta.get(key) or ()))
+
+    def warm(self, statuses: Iterable[str]) -> int:
+        """Materialize records currently in one of `statuses`, up to the cache size. Returns the count."""
+        wanted = set(statuses)
+        n = 0
+        for key in list(self._slots):
+            if n >= self.max_cached:
+                break
+            if self.status_of(key) in wanted:
+                try:
+                    self[key]
+                except KeyError:
+                    continue
+                n += 1
+        return n
+
+    def version_of(self, key: str) -> int:
+        """Changes on every assignment (never reused); lets callers cache derived data per record."""
+        return self._versions.get(key, 0)
+
+    def raw(self, key: str) -> Optional[bytes]:
+        """The record's JSON bytes as stored on disk, if it has not been assigned since."""
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None or key in self._dirty or key in self._saving:
+                return None
+            off, length = slot
+            return self._mm[off : off + length]  # type: ignore[index]
+
+    def materialized(self) -> int:
+        return len(self._cache) + len(self._dirty) + len(self._saving)
+
+    def _record(self, key: str) -> Tuple[Any, Tuple[Any, ...]]:
+        """Record for saving: encoded bytes if assigned, else its (offset, length) in the current file."""
+        with self._lock:
+            slot = self._slots[key]
+            rec = self._dirty.pop(key, None)
+            if rec is None:
+                rec = self._saving.get(key)
+            if rec is None and slot is not None:
+                return slot, self._meta[key]
+            if rec is None:
+                rec = self._cache[key]
+            self._saving[key] = rec
+            return _dumps(rec), _meta_tuple(rec, self.meta_fields)
+
+
+class _Out:
+    def __init__(self, f) -> None:
+        self.f = f
+        self.pos = 0
+
+    def put(self, b: bytes) -> None:
+        self.f.write(b)
+        self.pos += len(b)
+
+
+def _key(k: str) -> bytes:
+    # Task ids / phone numbers need no escaping; skip the encoder for them.
+    if k.isascii() and k.replace("+", "").isalnum():
+        return b'"' + k.encode("ascii") + b'"'
+    return _dumps(k)
+
+
+def _put_records(out: _Out, records: Iterable[tuple], source) -> List[list]:
+    """Write one `{key: record, ...}` block; returns its index entries [key, off, len, *meta]."""
+    entries: List[list] = []
+    out.put(b"{")
+    sep = b"\n"
+    for key, body, meta in records:
+        if isinstance(body, tuple):
+            off, length = body
+            body = source[off : off + length]
+        prefix = sep + _key(key) + b": "
+        entries.append([key, out.pos + len(prefix), len(body), *meta])
+        out.put(prefix + body)
+        sep = b",\n"
+    out.put(b"}" if sep == b"\n" else b"\n}")
+    return entries
+
+
+class SavePlan:
+    """Everything needed to write one version of the state, detached from it.
+
+    Built on the thread that owns the state (prepare_save); records are either
+    freshly encoded bytes or (offset, length) references into the mapping of
+    the previous file (`users_source` / `tasks_source`), so writing needs no
+    access to the state.
+    """
+
+    def __init__(self, meta: Dict[str, Any], users: Iterable[tuple], tasks: Iterable[tuple], users_source, tasks_source) -> None:
+        self.meta = meta
+        self.users = users  # [(phone, bytes | (off, len), ())]
+        self.tasks = tasks  # [(tid, bytes | (off, len), meta)]
+        self.users_source = users_source
+        self.tasks_source = tasks_source
+
+
+def _plan_records(records: Any, fields: Tuple[str, ...]) -> Tuple[Iterator[tuple], Any]:
+    if isinstance(records, LazyRecords):
+        return ((key,) + records._record(key) for key in list(records)), records._mm  # noqa: SLF001
+    return ((key, _dumps(r), _meta_tuple(r, fields)) for key, r in list(records.items())), None
+
+
+def prepare_save(state: Dict[str, Any], stream: bool = False) -> SavePlan:
+    """Snapshot `state` for writing.
+
+    With `stream=True` records are encoded while the plan is written instead
+    of up front; only valid when nothing touches the state in between (the
+    synchronous write_state).
+    """
+    users, users_source = _plan_records(state.get("users") or {}, ())
+    tasks, tasks_source = _plan_records(state.get("tasks") or {}, META_FIELDS)
+    if not stream:
+        locks = [m._lock for m in (state.get("users"), state.get("tasks")) if isinstance(m, LazyRecords)]  # noqa: SLF001
+        for lock in locks:
+            lock.acquire()
+        try:
+            users, tasks = list(users), list(tasks)
+        finally:
+            for lock in locks:
+                lock.release()
+    meta = {k: v for k, v in state.items() if k not in ("users", "tasks")}
+    return SavePlan(meta, users, tasks, users_source, tasks_source)
+
+
+def write_plan(path: str, plan: SavePlan) -> Tuple[Optional[Stamp], Dict[str, List[list]]]:
+    """Write a prepared plan atomically plus its index. Safe to run off-thread.
+
+    Returns the new stamp and the index entries of both blocks.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        out = _Out(f)
+        head = json.dumps(plan.meta, ensure_ascii=False)[:-1]
+        out.put((head + (",\n" if plan.meta else "\n") + '"users": ').encode("utf-8"))
+        users = _put_records(out, plan.users, plan.users_source)
+        out.put(b',\n"tasks": ')
+        tasks = _put_records(out, plan.tasks, plan.tasks_source)
+        out.put(b"\n}\n")
+    os.replace(tmp, path)
+
+    stamp = file_stamp(path)
+    idx = {
+        "format": INDEX_FORMAT,
+        "size": stamp[0] if stamp else None,
+        "mtimeNs": stamp[1] if stamp else None,
+        "meta": plan.meta,
+        "users": users,
+        "tasks": tasks,
+    }
+    with open(path + INDEX_SUFFIX + ".tmp", "w", encoding="utf-8") as f:
+        # dumps (C encoder) rather than dump, which streams through the pure-Python one.
+        f.write(json.dumps(idx, ensure_ascii=False, separators=(",", ":")))
+    os.replace(path + INDEX_SUFFIX + ".tmp", path + INDEX_SUFFIX)
+    return stamp, {"users": users, "tasks": tasks}
+
+
+def apply_save(path: str, state: Dict[str, Any], entries: Dict[str, List[list]]) -> None:
+    """Point the state at the file just written.
+
+    A plain users/tasks dict is swapped for a LazyRecords mapping, so later
+    saves of the same state copy untouched records. Records it held stay
+    parsed until the cache bound evicts them.
+    """
+    for name, fields in (("users", ()), ("tasks", META_FIELDS)):
+        records = state.get(name)
+        if isinstance(records, LazyRecords):
+            records._rebind(path, entries[name])  # noqa: SLF001
+        elif records:
+            lazy = LazyRecords(path, entries[name], meta_fields=fields)
+            for key, rec in records.items():
+                lazy._cache[key] = rec  # noqa: SLF001
+            lazy._trim()  # noqa: SLF001
+            state[name] = lazy
+
+
+def write_state(path: str, state: Dict[str, Any]) -> Optional[Stamp]:
+    """Write `state` atomically in the line layout plus its index. Returns the new stamp."""
+    stamp, entries = write_plan(path, prepare_save(state, stream=True))
+    apply_save(path, state, entries)
+    return stamp
+
+
+def _read_index(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path + INDEX_SUFFIX, "r", encoding="utf-8") as f:
+            idx = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if idx.get("format") != INDEX_FORMAT:
+        return None
+    if file_stamp(path) != (idx.get("size"), idx.get("mtimeNs")):
+        return None
+    return idx
+
+
+def index_is_fresh(path: str) -> bool:
+    return _read_index(path) is not None
+
+
+def load_state(path: str, lazy: bool = False) -> Optional[Dict[str, Any]]:
+    """Load the state file; None if it does not exist.
+
+    With `lazy=True` and a fresh index, only the index is parsed and
+    `state["users"]` / `state["tasks"]` are LazyRecords mappings. Otherwise
+    this is a plain json.load of the whole file.
+    """
+    if lazy:
+        idx = _read_index(path)
+        if idx is not None:
+            try:
+                tasks = LazyRecords(path, idx["tasks"])
+                users = LazyRecords(path, idx["users"], meta_fields=())
+            except FileNotFoundError:
+                return None
+            # The file may have been replaced between reading the index and
+            # mapping it; only trust the mappings if they are the indexed file.
+            if len(tasks._mm) == len(users._mm) == idx["size"]:  # type: ignore[arg-type]  # noqa: SLF001
+                st: Dict[str, Any] = dict(idx.get("meta") or {})
+                st["users"] = users
+                st["tasks"] = tasks
+                return st
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def iter_task_ids(tasks: Any, statuses: Optional[Iterable[str]] = None, reverse: bool = False) -> Iterator[str]:
+    """Task ids (optionally only those in `statuses`), using the index when available."""
+    wanted = set(statuses) if statuses is not None else None
+    ids = list(tasks)
+    if reverse:
+        ids.reverse()
+    status_of = getattr(tasks, "status_of", None)
+    for tid in ids:
+        if wanted is not None:
+            status = status_of(tid) if status_of else (tasks.get(tid) or {}).get("status")
+            if status not in wanted:
+                continue
+        yield tid
+
+
+def task_meta(tasks: Any, tid: str) -> Dict[str, Any]:
+    """META_FIELDS of one task, from the index when `tasks` is lazy."""
+    meta_of = getattr(tasks, "meta_of", None)
+    if meta_of is not None:
+        return meta_of(tid)
+    t = tasks.get(tid) or {}
+    return {k: t.get(k) for k in META_FIELDS}
+
+
+class AsyncWriter:
+    """Funnels saves of one in-memory state through a single asyncio task.
+
+    Callers mutate the state on the event loop, call mark_dirty() and await
+    flushed(). A write covers everything marked dirty before it started, so
+    mutations that arrive while the disk is busy share the next write (group
+    commit). Changed records are encoded on the loop; file I/O runs in a worker
+    thread, so the loop never blocks on the disk.
+
+    Mutations belong inside `async with writer.exclusive()`, which holds the
+    state lock (shared by every holder on this loop), first reloads the file
+    through `on_reload` if someone else (the CLI) replaced it, and writes before
+    letting go. Every write re-checks the file and refuses (StateChanged) to
+    replace one it did not load. While idle, the writer also reloads a file
+    replaced by someone else, so reads catch up too.
+    """
+
+    def __init__(self, path: str, state: Dict[str, Any], stamp: Optional[Stamp], on_reload=None, poll: float = 2.0) -> None:
+        self.path = path
+        self.state = state
+        self.stamp = stamp
+        self.on_reload = on_reload
+        self.poll = poll
+        self.writes = 0
+        self._dirty_gen = 0
+        self._written_gen = 0
+        self._waiters: List[Tuple[int, Any]] = []
+        self._wake: Optional[Any] = None
+        self._task: Optional[Any] = None
+        self._lockf: Optional[Any] = None
+        self._holders = 0
+        self._guard: Optional[asyncio.Lock] = None
+
+    def start(self) -> None:
+        self._wake = asyncio.Event()
+        self._guard = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def mark_dirty(self, state: Optional[Dict[str, Any]] = None) -> None:
+        if state is not None:
+            self.state = state
+        self._dirty_gen += 1
+        if self._wake is not None:
+            self._wake.set()
+
+    async def flushed(self) -> None:
+        """Return once everything marked dirty so far is on disk."""
+        if self._written_gen >= self._dirty_gen:
+            return
+        if self._task is not None and self._task.done():
+            raise RuntimeError("state writer is not running")
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((self._dirty_gen, fut))
+        if self._wake is not None:
+            self._wake.set()  # retries a write that failed earlier
+        await fut
+
+    @asynccontextmanager
+    async def exclusive(self) -> AsyncIterator[None]:
+        """Hold the state lock around a read-modify-write of the state."""
+        async with self._guard:  # type: ignore[union-attr]
+            if self._lockf is None:
+                self._lockf = await asyncio.to_thread(lock_file, self.path)
+                try:
+                    await self._sync()
+                except BaseException:
+                    unlock_file(self._lockf)
+                    self._lockf = None
+                    raise
+            self._holders += 1
+        try:
+            yield
+        finally:
+            self._holders -= 1
+            if not self._holders:
+                await self._release()
+
+    async def _sync(self) -> None:
+        stamp = await asyncio.to_thread(file_stamp, self.path)
+        if stamp == self.stamp:
+            return
+        st = await asyncio.to_thread(load_state, self.path, True)
+        if st is None:
+            return
+        # Changes that failed to write are dropped in favour of the file.
+        self._written_gen = self._dirty_gen
+        self._adopt(st, stamp)
+
+    async def _release(self) -> None:
+        async with self._guard:  # type: ignore[union-attr]
+            if self._holders or self._lockf is None:
+                return
+            try:
+                await self.flushed()
+            except Exception:  # noqa: BLE001 (already raised to the writers' callers)
+                pass
+            finally:
+                unlock_file(self._lockf)
+                self._lockf = None
+
+    def _adopt(self, st: Dict[str, Any], stamp: Optional[Stamp]) -> None:
+        self.state = st
+        self.stamp = stamp
+        if self.on_reload is not None:
+            self.on_reload(st)
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except BaseException:  # noqa: BLE001 (CancelledError)
+            pass
+        self._task = None
+        if self._written_gen < self._dirty_gen:
+            await self._write_once()
+
+    @property
+    def alive(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _run(self) -> None:
+        failures = 0
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll)  # type: ignore[union-attr]
+                except asyncio.TimeoutError:
+                    await self._check_external()
+                    continue
+                self._wake.clear()  # type: ignore[union-attr]
+                if self._written_gen < self._dirty_gen:
+                    await self._write_once()
+                failures = 0
+            except Exception:  # noqa: BLE001 (keep the only writer running)
+                failures += 1
+                log.exception("state writer: pass failed (%d in a row)", failures)
+                await asyncio.sleep(min(self.poll * 2**failures, 60.0))
+
+    async def _write_once(self) -> None:
+        gen = self._dirty_gen
+        try:
+            plan = prepare_save(self.state)
+            self.stamp, entries = await asyncio.to_thread(self._write_checked, plan, self._lockf is None)
+            apply_save(self.path, self.state, entries)
+        except StateChanged as e:
+            # Written outside exclusive() and lost a race: keep the file, reload it when idle.
+            log.warning("state writer: %s", e)
+            self._written_gen = max(self._written_gen, gen)
+            self._resolve(gen, e)
+            return
+        except Exception as e:  # noqa: BLE001
+            log.error("state writer: saving %s failed: %s", self.path, e)
+            self._resolve(gen, e)
+            return
+        self.writes += 1
+        self._written_gen = max(self._written_gen, gen)
+        self._resolve(gen, None)
+
+    def _write_checked(self, plan: SavePlan, lock: bool) -> Tuple[Optional[Stamp], Dict[str, List[list]]]:
+        f = lock_file(self.path) if lock else None
+        try:
+            if file_stamp(self.path) != self.stamp:
+                raise StateChanged(f"{self.path} changed on disk; not overwriting it")
+            return write_plan(self.path, plan)
+        finally:
+            if f is not None:
+                unlock_file(f)
+
+    def _resolve(self, gen: int, err: Optional[BaseException]) -> None:
+        keep = []
+        for want, fut in self._waiters:
+            if want > gen:
+                keep.append((want, fut))
+            elif not fut.done():
+                if err is None:
+                    fut.set_result(None)
+                else:
+                    fut.set_exception(err)
+        self._waiters = keep
+
+    async def _check_external(self) -> None:
+        if self._written_gen < self._dirty_gen or self._lockf is not None:
+            return
+        stamp = await asyncio.to_thread(file_stamp, self.path)
+        if stamp is None or stamp == self.stamp:
+            return
+        st = await asyncio.to_thread(load_state, self.path, True)
+        # exclusive() may have been entered (and synced) while we were loading.
+        if st is None or self._written_gen < self._dirty_gen or self._lockf is not None:
+            return
+        self._adopt(st, stamp)
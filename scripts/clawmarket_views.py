@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Pre-serialized task views for the ClawMarket API.
+
+Read endpoints mostly return the same unchanged tasks over and over. This cache
+keeps the encoded JSON bytes of each task per view:
+
+  full      the task as stored
+  redacted  what non-participants see once a task is awarded
+  summary   a small listing card (id, status, title, budget, ...)
+
+Entries are keyed by the task's version in the LazyRecords mapping, which changes
+whenever a task is assigned back (every *_cmd transition does that), so there is
+no explicit invalidation. An untouched task's full view is its raw record from
+the state file, so it is never encoded at all. List responses are built by
+joining cached fragments.
+
+Bytes match FastAPI's default JSONResponse rendering (compact, non-ASCII kept).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+PRIVATE_FIELDS = ("requester", "awardedTo", "submission", "updates", "proposals", "acceptedBy")
+SUMMARY_FIELDS = ("id", "status", "title", "budget", "category", "deadline", "deadlineAt", "createdAt")
+VIEWS = ("full", "redacted", "summary")
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def redact(t: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in t.items() if k not in PRIVATE_FIELDS}
+
+
+def summary(t: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: t.get(k) for k in SUMMARY_FIELDS}
+
+
+class ViewCache:
+    def __init__(self, max_entries: Optional[int] = None) -> None:
+        self.max_entries = max_entries or int(os.environ.get("CLAWMARKET_VIEW_CACHE") or 50_000)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, bytes]]" = OrderedDict()
+        self._tasks: Any = None
+        self.hits = 0
+        self.misses = 0
+
+    def _bind(self, tasks: Any) -> None:
+        # A reload swaps in a new mapping whose versions start over.
+        if tasks is not self._tasks:
+            self._entries.clear()
+            self._tasks = tasks
+
+    def get(self, tasks: Any, tid: str, view: str = "full") -> Optional[bytes]:
+        """Encoded view of one task, or None if it does not exist."""
+        version_of = getattr(tasks, "version_of", None)
+        if version_of is None:
+            t = tasks.get(tid)
+            return self._encode(t, view) if t is not None else None
+        if tid not in tasks:
+            return None
+
+        self._bind(tasks)
+        key = (tid, view)
+        version = version_of(tid)
+        hit = self._entries.get(key)
+        if hit is not None and hit[0] == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return hit[1]
+
+        self.misses += 1
+        body = tasks.raw(tid) if view == "full" else None
+        if body is None:
+            body = self._encode(tasks[tid], view)
+        self._entries[key] = (version, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return body
+
+    @staticmethod
+    def _encode(t: Dict[str, Any], view: str) -> bytes:
+        if view == "redacted":
+            return _dumps(redact(t))
+        if view == "summary":
+            return _dumps(summary(t))
+        return _dumps(t)
+
+    def join(self, tasks: Any, tids: Iterable[str], view: str = "full") -> bytes:
+        """JSON array of the given tasks' views, assembled from cached fragments."""
+        parts = [b for b in (self.get(tasks, tid, view) for tid in tids) if b is not None]
+        return b"[" + b",".join(parts) + b"]"
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Offline ingestion benchmark for youtube_monitor.py.
+
+Starts youtube_fixture_server.py in-process, points YOUTUBE_BASE_URL at it (with
+the state store and transcript cache in a temporary directory, never state/)
+and, for each number of channels, polls them all three times on a fresh state:
+
+  cold  first run: resolve handles, fetch feeds, transcript of each newest video
+  idle  nothing changed (conditional feed GETs)
+  new   after one new video per channel
+
+and reports wall time, requests and bytes on the wire (as counted by the server)
+per sweep and per channel poll, plus p50 / max poll time. Transcripts come from
+the watch-page source, the only one that can be pointed at a stand-in.
+
+Usage:
+  youtube_bench.py [--levels 1,10,100] [--latency MS] [--jitter MS] [--error-rate P]
+                   [--workers 16] [--fixtures DIR] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import youtube_fixture_server as fixtures
+
+
+def _poll(ym, ch) -> Tuple[float, int, bool]:
+    t0 = time.perf_counter()
+    try:
+        _, new = ym.check_channel(ch)
+        ok = True
+    except Exception:  # noqa: BLE001 (counted as an error)
+        new, ok = 0, False
+    return time.perf_counter() - t0, new, ok
+
+
+def _sweep(ym, fx: fixtures.FixtureServer, channels: list, workers: int) -> Dict[str, Any]:
+    fx.reset()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(channels)))) as pool:
+        results = list(pool.map(lambda ch: _poll(ym, ch), channels))
+    wall = time.perf_counter() - t0
+    stats = fx.stats()
+    times = sorted(r[0] for r in results)
+    n = len(channels)
+    return {
+        "wall_s": wall,
+        "requests": stats["requests"],
+        "bytes": stats["bytes"],
+        "req_per_channel": stats["requests"] / n,
+        "kb_per_channel": stats["bytes"] / n / 1024,
+        "p50_ms": times[n // 2] * 1000,
+        "max_ms": times[-1] * 1000,
+        "new_videos": sum(r[1] for r in results),
+        "errors": sum(not r[2] for r in results),
+        "by_kind": {k: v["requests"] for k, v in sorted(stats["by_kind"].items())},
+    }
+
+
+def _level(ym, fx: fixtures.FixtureServer, n: int, workers: int) -> List[Tuple[str, Dict[str, Any]]]:
+    tmp = tempfile.mkdtemp(prefix=f"youtube-bench-{n}-")
+    ym.store = ym.ystate.StateStore(os.path.join(tmp, "youtube_state.json"))
+    channels = [ym.Channel(name=f"c{i}", handle=f"@bench{n}x{i}", languages=["en"], fallbacks=["watch-page"]) for i in range(n)]
+    rows = [("cold", _sweep(ym, fx, channels, workers)), ("idle", _sweep(ym, fx, channels, workers))]
+    for ch in channels:
+        fx.publish(fixtures.channel_id_for(ch.handle))
+    rows.append(("new", _sweep(ym, fx, channels, workers)))
+    return rows
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="youtube_bench.py")
+    p.add_argument("--levels", default="1,10,100")
+    p.add_argument("--latency", type=float, default=0.0, help="ms the server waits before every answer")
+    p.add_argument("--jitter", type=float, default=0.0)
+    p.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    p.add_argument("--workers", type=int, default=16)
+    p.add_argument("--fixtures", help="directory with recorded pages (see youtube_fixture_server.py)")
+    p.add_argument("--json", action="store_true", help="one JSON line per sweep")
+    args = p.parse_args(argv)
+
+    fx = fixtures.FixtureServer(
+        fixtures=args.fixtures, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate
+    )
+    fx.start()
+    # All are read when the YouTube modules are imported; nothing the bench
+    # makes up may end up in the real state/ dir.
+    scratch = tempfile.mkdtemp(prefix="youtube-bench-")
+    os.environ["YOUTUBE_BASE_URL"] = fx.url
+    os.environ["YOUTUBE_STATE_PATH"] = os.path.join(scratch, "youtube_state.json")
+    os.environ["YOUTUBE_TRANSCRIPT_CACHE_DIR"] = os.path.join(scratch, "transcripts")
+    import youtube_monitor as ym
+
+    ym.LEGACY_CHANNEL_IDS_PATH = os.path.join(scratch, "youtube_channel_ids.json")
+    conflicts = ym.stand_in_conflicts()
+    if conflicts:
+        fx.close()
+        raise SystemExit(f"youtube_bench.py: {', '.join(conflicts)} would write under {ym.STATE_DIR}")
+
+    try:
+        if not args.json:
+            print(f"fixtures at {fx.url}, latency {args.latency:g}ms, error rate {args.error_rate:g}")
+            print(
+                f"{'channels':>8} {'sweep':>5} {'wall_s':>7} {'requests':>8} {'kB':>8} "
+                f"{'req/ch':>6} {'kB/ch':>7} {'p50_ms':>7} {'max_ms':>7} {'new':>4} {'errors':>6}"
+            )
+        for n in [int(x) for x in args.levels.split(",") if x.strip()]:
+            for sweep, r in _level(ym, fx, n, args.workers):
+                if args.json:
+                    print(json.dumps({"channels": n, "sweep": sweep, **r}), flush=True)
+                    continue
+                print(
+                    f"{n:>8} {sweep:>5} {r['wall_s']:>7.2f} {r['requests']:>8} {r['bytes'] / 1024:>8.1f} "
+                    f"{r['req_per_channel']:>6.1f} {r['kb_per_channel']:>7.1f} {r['p50_ms']:>7.1f} "
+                    f"{r['max_ms']:>7.1f} {r['new_videos']:>4} {r['errors']:>6}",
+                    flush=True,
+                )
+    finally:
+        fx.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""Caption formats -> timestamped segments, shared by the YouTube scripts.
+
+Parsers (all streaming; `src` is a str, bytes, a file-like object with
+read(), or an iterable of str/bytes chunks):
+  parse_json3(src)   timedtext fmt=json3 ({"events": [{"tStartMs", "segs"}...]})
+  parse_xml(src)     timedtext srv3 (<p t= d=>, ms) and the legacy format
+                     (<text start= dur=>, seconds)
+  parse_vtt(src)     WebVTT, as written by yt-dlp
+  parse(src)         any of the above, detected from the first bytes
+  from_api(items)    youtube_transcript_api dicts (text, start, duration)
+
+YouTube's auto-captions are "rolling": each cue repeats the previous line (or
+the whole cue) before adding new words. dedupe_rolling() drops a cue's leading
+words when they repeat the end of the text emitted so far, so every word
+comes out once. It is only meant for such captions -- a manual transcript may
+repeat a line on purpose -- so callers go through dedupe_if_rolling(), which
+takes the track's kind when the source reports it (timedtext kind=asr, the
+API's is_generated) and otherwise checks whether most cues overlap their
+predecessor. to_text() joins segments into one string.
+"""
+
+import codecs
+import html
+import json
+import re
+import xml.etree.ElementTree as ET
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+_WS_RE = re.compile(r"\s+")
+_TAG_RE = re.compile(r"<[^>]*>")
+_VTT_TIMING_RE = re.compile(r"^((?:\d+:)?\d{1,2}:\d{2}\.\d{3})\s+-->\s+((?:\d+:)?\d{1,2}:\d{2}\.\d{3})")
+_WORD_STRIP = ".,!?;:\"'()[]…-"
+
+# A cue whose first words repeat the last ones emitted is rolling-caption
+# overlap; shorter overlaps are only dropped when they are the whole cue.
+ROLLING_WINDOW = 48
+MIN_OVERLAP = 3
+# Captions of unknown kind count as rolling when at least ROLLING_SHARE of the
+# first ROLLING_SAMPLE cues start with their predecessor's last words.
+ROLLING_SAMPLE = 50
+ROLLING_SHARE = 0.5
+
+
+class Segment(NamedTuple):
+    start: float  # seconds
+    end: float
+    text: str
+
+
+def clean_text(s: str) -> str:
+    return _WS_RE.sub(" ", s).strip()
+
+
+def _text_chunks(src, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    if isinstance(src, str):
+        yield src
+        return
+    if isinstance(src, (bytes, bytearray)):
+        yield bytes(src).decode("utf-8", errors="ignore")
+        return
+    dec = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    if hasattr(src, "read"):
+        chunks = iter(lambda: src.read(chunk_size), None)
+    else:
+        chunks = iter(src)
+    for chunk in chunks:
+        if not chunk:
+            break
+        text = dec.decode(chunk) if isinstance(chunk, (bytes, bytearray)) else chunk
+        if text:
+            yield text
+    tail = dec.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _lines(chunks: Iterable[str]) -> Iterator[str]:
+    buf = ""
+    for chunk in chunks:
+        buf += chunk
+        lines = buf.split("\n")
+        buf = lines.pop()
+        yield from lines
+    if buf:
+        yield buf
+
+
+# json3
+
+
+def _json_array_items(chunks: Iterator[str], key: str) -> Iterator:
+    """Items of the top-level array `"key": [...]`, decoded one at a time."""
+    decoder = json.JSONDecoder()
+    marker = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    buf = ""
+    pos = None
+    eof = False
+
+    def more() -> bool:
+        # Consumed text is dropped only here, so a body that arrived in one
+        # piece is never copied.
+        nonlocal buf, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            return False
+        if pos:
+            buf, pos = buf[pos:], 0
+        buf += chunk
+        return True
+
+    while pos is None:
+        m = marker.search(buf)
+        if m:
+            pos = m.end()
+        elif not more():
+            return
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buf):
+            if not more():
+                return
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if eof or not more():
+                return
+            continue
+        yield item
+        pos = end
+
+
+def parse_json3(src) -> Iterator[Segment]:
+    for ev in _json_array_items(_text_chunks(src), "events"):
+        segs = ev.get("segs") if isinstance(ev, dict) else None
+        if not segs:
+            continue
+        text = clean_text(html.unescape("".join(s.get("utf8") or "" for s in segs)))
+        if text:
+            start = (ev.get("tStartMs") or 0) / 1000.0
+            yield Segment(start, start + (ev.get("dDurationMs") or 0) / 1000.0, text)
+
+
+# srv3 / legacy XML
+
+
+def parse_xml(src) -> Iterator[Segment]:
+    parser = ET.XMLPullParser(events=("end",))
+
+    def segments():
+        for _, el in parser.read_events():
+            if el.tag == "p" and el.get("t") is not None:  # srv3, milliseconds
+                start = int(el.get("t") or 0) / 1000.0
+                dur = int(el.get("d") or 0) / 1000.0
+            elif el.tag == "text" and el.get("start") is not None:  # legacy, seconds
+                start = float(el.get("start") or 0)
+                dur = float(el.get("dur") or 0)
+            else:
+                continue
+            text = clean_text(html.unescape("".join(el.itertext())))
+            el.clear()
+            if text:
+                yield Segment(start, start + dur, text)
+
+    try:
+        for chunk in _text_chunks(src):
+            parser.feed(chunk)
+            yield from segments()
+        parser.close()
+    except ET.ParseError:
+        pass  # a truncated body still yields what parsed
+    yield from segments()
+
+
+# WebVTT
+
+
+def _vtt_seconds(ts: str) -> float:
+    secs = 0.0
+    for part in ts.split(":"):
+        secs = secs * 60 + float(part)
+    return secs
+
+
+def parse_vtt(src) -> Iterator[Segment]:
+    cue: Optional[List] = None  # [start, end, lines]
+    skipping = False  # inside a NOTE / STYLE / REGION block
+    for raw in _lines(_text_chunks(src)):
+        if not raw.rstrip("\r"):  # only a truly empty line ends a block
+            if cue is not None:
+                text = clean_text(html.unescape(_TAG_RE.sub(" ", " ".join(cue[2]))))
+                if text:
+                    yield Segment(cue[0], cue[1], text)
+            cue = None
+            skipping = False
+            continue
+        line = raw.strip().lstrip("\ufeff")
+        if cue is not None:
+            cue[2].append(line)
+            continue
+        if skipping or not line:
+            continue
+        m = _VTT_TIMING_RE.match(line)
+        if m:
+            cue = [_vtt_seconds(m.group(1)), _vtt_seconds(m.group(2)), []]
+        elif line.startswith(("NOTE", "STYLE", "REGION")):
+            skipping = True
+        # anything else (WEBVTT header, Kind:, cue ids) is not cue text
+    if cue is not None:
+        text = clean_text(html.unescape(_TAG_RE.sub(" ", " ".join(cue[2]))))
+        if text:
+            yield Segment(cue[0], cue[1], text)
+
+
+# Detection / other sources
+
+
+def parse(src, fmt: Optional[str] = None) -> Iterator[Segment]:
+    """Segments from json3, srv3/XML or VTT; `fmt` ("json3", "xml", "vtt") skips detection."""
+    chunks = _text_chunks(src)
+    if fmt is None:
+        first = head = ""
+        for chunk in chunks:
+            first += chunk
+            head = first.lstrip("\ufeff \t\r\n")
+            if len(head) >= 6:
+                break
+        fmt = "json3" if head.startswith("{") else "vtt" if head.startswith("WEBVTT") else "xml"
+        chunks = _chain(first, chunks)
+    parser = {"json3": parse_json3, "xml": parse_xml, "srv3": parse_xml, "vtt": parse_vtt}[fmt]
+    return parser(chunks)
+
+
+def _chain(first: str, rest: Iterator[str]) -> Iterator[str]:
+    if first:
+        yield first
+    yield from rest
+
+
+def from_api(items) -> Iterator[Segment]:
+    for it in items:
+        text = clean_text(html.unescape((it.get("text") or "").replace("\n", " ")))
+        if text:
+            start = float(it.get("start") or 0)
+            yield Segment(start, start + float(it.get("duration") or 0), text)
+
+
+# Rolling-caption dedup
+
+
+def _norm(word: str) -> str:
+    return word.strip(_WORD_STRIP).casefold()
+
+
+def dedupe_rolling(segments: Iterable[Segment], window: int = ROLLING_WINDOW, min_overlap: int = MIN_OVERLAP) -> Iterator[Segment]:
+    """Drop the part of each segment that repeats the end of what came before.
+
+    A segment that is entirely a repeat is dropped; its time span is folded
+    into the previous one.
+    """
+    tail: List[str] = []  # normalized last `window` words emitted
+    prev: Optional[Segment] = None
+    for seg in segments:
+        words = seg.text.split(" ")
+        norm = [_norm(w) for w in words]
+        k = _overlap(tail, norm)
+        if k and k < len(words) and k < min_overlap:
+            k = 0
+        if k == len(words):
+            if prev is not None and seg.end > prev.end:
+                prev = prev._replace(end=seg.end)
+            continue
+        if prev is not None:
+            yield prev
+        prev = Segment(seg.start, seg.end, " ".join(words[k:]))
+        tail = (tail + norm[k:])[-window:]
+    if prev is not None:
+        yield prev
+
+
+def _overlap(tail: List[str], norm: List[str]) -> int:
+    k = min(len(norm), len(tail))
+    while k > 0 and tail[-k:] != norm[:k]:
+        k -= 1
+    return k
+
+
+def looks_rolling(segments: Iterable[Segment], sample: int = ROLLING_SAMPLE) -> bool:
+    """Whether most cues start by repeating the last words of the cue before."""
+    pairs = hits = 0
+    prev: Optional[List[str]] = None
+    for seg in islice(segments, sample + 1):
+        norm = [_norm(w) for w in seg.text.split(" ")]
+        if prev is not None:
+            pairs += 1
+            hits += _overlap(prev, norm) >= min(MIN_OVERLAP, len(norm))
+        prev = norm
+    return pairs > 0 and hits >= pairs * ROLLING_SHARE
+
+
+def dedupe_if_rolling(segments: Iterable[Segment], rolling: Optional[bool] = None) -> Iterator[Segment]:
+    """dedupe_rolling() for auto-captions; anything else passes through.
+
+    `rolling` is the track's kind when the source says (asr / generated); None
+    decides with looks_rolling() on the first cues.
+    """
+    segments = iter(segments)
+    if rolling is None:
+        head = list(islice(segments, ROLLING_SAMPLE + 1))
+        rolling = looks_rolling(head)
+        segments = chain(head, segments)
+    return dedupe_rolling(segments) if rolling else segments
+
+
+def to_text(segments: Iterable[Segment], dedupe: bool = True) -> str:
+    if dedupe:
+        segments = dedupe_if_rolling(segments)
+    return clean_text(" ".join(s.text for s in segments))
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""Budget-aware chunking of timestamped transcripts.
+
+  sentences(segments)            caption segments -> sentence-aligned spans
+                                 (punctuation, else pauses / a length cap, since
+                                 auto-captions have no punctuation)
+  iter_chunks(segments, chars)   generator of Chunk(index, start, end, text), each
+                                 at most `chars` long, for parallel processing
+  score_chunks(chunks, title)    cheap relevance: keyword density, title overlap,
+                                 position (intro / wrap-up)
+  select(chunks, budget, title)  the best-scoring chunks that fit `budget` chars
+                                 when rendered, spread over the video, in time order
+  fit(segments, budget, title)   the whole transcript if it fits, else render(select(...))
+
+Rendered chunks start with their timestamp ("[12:34] ..."), so a reader can
+jump to the part of the video a chunk came from.
+
+Usage:
+  youtube_chunker.py [--chars N | --tokens N] [--select BUDGET] [--title T] [FILE]
+
+reads captions (json3, srv3/XML or VTT; stdin by default) and prints every
+chunk as a JSON line, or with --select the rendered subset.
+"""
+
+import argparse
+import json
+import re
+import sys
+from collections import Counter
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+import youtube_captions as captions
+
+CHARS_PER_TOKEN = 4  # rough, for callers that budget in tokens
+
+SENTENCE_MAX_CHARS = 300
+PAUSE_SECONDS = 1.5
+KEYWORDS = 30
+W_DENSITY, W_TITLE, W_POSITION = 0.5, 0.35, 0.15
+
+_SENT_SPLIT_RE = re.compile(r"(?<=[.!?…])\s+")
+_SENT_END_RE = re.compile(r"[.!?…][\"'”’)\]]*$")
+_TOKEN_RE = re.compile(r"\w+")
+
+# Channels are pt and en; words under 4 letters are ignored anyway.
+STOPWORDS = frozenset(
+    """
+    that this with have from they them their there then than what when where which while
+    your yours will would could should about into just like really some very more most
+    also been were because being does doing going know think thing things want right
+    well okay yeah here other only even much many make made over such these those
+    para como mais isso esse essa este esta aqui muito muita você vocês porque quando
+    onde qual quem então também ainda pode fazer tipo mesmo nosso nossa agora tudo todo
+    toda coisa coisas gente está estão estava assim pela pelo sobre entre depois antes
+    """.split()
+)
+
+
+class Chunk(NamedTuple):
+    index: int
+    start: float  # seconds
+    end: float
+    text: str
+
+
+def tokens_to_chars(tokens: int) -> int:
+    return tokens * CHARS_PER_TOKEN
+
+
+def fmt_ts(seconds: float) -> str:
+    s = int(seconds)
+    if s >= 3600:
+        return f"{s // 3600}:{s // 60 % 60:02d}:{s % 60:02d}"
+    return f"{s // 60:02d}:{s % 60:02d}"
+
+
+def sentences(
+    segments: Iterable[captions.Segment], max_chars: int = SENTENCE_MAX_CHARS, pause: float = PAUSE_SECONDS
+) -> Iterator[captions.Segment]:
+    parts: List[str] = []
+    start = end = 0.0
+    size = 0
+    last_end: Optional[float] = None
+    for seg in segments:
+        if parts and last_end is not None and seg.start - last_end > pause:
+            yield captions.Segment(start, end, " ".join(parts))
+            parts, size = [], 0
+        for piece in _SENT_SPLIT_RE.split(seg.text):
+            if not piece:
+                continue
+            if parts and size + len(piece) > max_chars:
+                yield captions.Segment(start, end, " ".join(parts))
+                parts, size = [], 0
+            if not parts:
+                start = seg.start
+            parts.append(piece)
+            size += len(piece) + 1
+            end = seg.end
+            if _SENT_END_RE.search(piece):
+                yield captions.Segment(start, end, " ".join(parts))
+                parts, size = [], 0
+        last_end = seg.end
+    if parts:
+        yield captions.Segment(start, end, " ".join(parts))
+
+
+def _split_long(s: captions.Segment, chars: int) -> Iterator[captions.Segment]:
+    if len(s.text) <= chars:
+        yield s
+        return
+    words = s.text.split(" ")
+    cur: List[str] = []
+    size = 0
+    for w in words:
+        if cur and size + 1 + len(w) > chars:
+            yield captions.Segment(s.start, s.end, " ".join(cur))
+            cur, size = [], 0
+        cur.append(w[:chars])
+        size += len(w) + (1 if size else 0)
+    if cur:
+        yield captions.Segment(s.start, s.end, " ".join(cur))
+
+
+def iter_chunks(segments: Iterable[captions.Segment], chars: int = 1200) -> Iterator[Chunk]:
+    """Sentence-aligned chunks of at most `chars` characters, in time order."""
+    cur: List[captions.Segment] = []
+    size = 0
+    index = 0
+    for sent in sentences(segments, min(SENTENCE_MAX_CHARS, chars)):
+        for piece in _split_long(sent, chars):
+            if cur and size + 1 + len(piece.text) > chars:
+                yield Chunk(index, cur[0].start, cur[-1].end, " ".join(p.text for p in cur))
+                index += 1
+                cur, size = [], 0
+            cur.append(piece)
+            size += len(piece.text) + (1 if size else 0)
+    if cur:
+        yield Chunk(index, cur[0].start, cur[-1].end, " ".join(p.text for p in cur))
+
+
+def _terms(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.casefold()) if len(t) >= 4 and not t.isdigit() and t not in STOPWORDS]
+
+
+def score_chunks(chunks: Sequence[Chunk], title: str = "") -> List[float]:
+    terms = [_terms(c.text) for c in chunks]
+    n = len(chunks)
+    tf: Counter = Counter()
+    df: Counter = Counter()
+    for ts in terms:
+        tf.update(ts)
+        df.update(set(ts))
+    # Frequent in the video, but not spread evenly over every chunk.
+    keywords = {w for w, count in tf.most_common(KEYWORDS) if count >= 2 and (df[w] < n or n == 1)}
+    title_terms = set(_terms(title))
+
+    density = [sum(t in keywords for t in ts) / max(1, len(c.text.split())) for c, ts in zip(chunks, terms)]
+    top = max(density, default=0) or 1.0
+    scores = []
+    for i, ts in enumerate(terms):
+        overlap = len(title_terms.intersection(ts)) / len(title_terms) if title_terms else 0.0
+        position = 1.0 if i == 0 else 0.5 if i == n - 1 else 0.0
+        scores.append(W_DENSITY * density[i] / top + W_TITLE * overlap + W_POSITION * position)
+    return scores
+
+
+def _rendered_len(c: Chunk) -> int:
+    return len(fmt_ts(c.start)) + 3 + len(c.text) + 1  # "[ts] text\n"
+
+
+def _trimmed(c: Chunk, budget: int) -> Optional[Chunk]:
+    """`c` cut at a word boundary so it renders within `budget`; None if no text fits."""
+    room = budget - (_rendered_len(c) - len(c.text))
+    if room <= 0:
+        return None
+    text = c.text[:room]
+    if len(c.text) > room and " " in text:
+        text = text.rsplit(" ", 1)[0]
+    return c._replace(text=text)
+
+
+def select(chunks: Sequence[Chunk], budget: int, title: str = "", scores: Optional[Sequence[float]] = None) -> List[Chunk]:
+    """Greedy best-scoring subset whose render() fits `budget` chars, in time order.
+
+    A chunk's score is scaled down while it is closer to an already picked one
+    than the spacing the budget allows, so the picks cover the whole video.
+    When no chunk fits, the best-scoring one is returned trimmed to the budget.
+    """
+    if not chunks:
+        return []
+    scores = list(scores) if scores is not None else score_chunks(chunks, title)
+    n = len(chunks)
+    fits = max(1, budget * n // sum(_rendered_len(c) for c in chunks))
+    spacing = max(1.0, n / fits)
+    near = [float(n)] * n  # index distance to the nearest picked chunk
+    picked = set()
+    left = budget
+    while True:
+        best = None
+        best_score = -1.0
+        for i, c in enumerate(chunks):
+            if i in picked or _rendered_len(c) > left:
+                continue
+            s = scores[i] * min(1.0, near[i] / spacing)
+            if s > best_score:
+                best, best_score = i, s
+        if best is None:
+            break
+        picked.add(best)
+        left -= _rendered_len(chunks[best])
+        for i in range(n):
+            near[i] = min(near[i], abs(i - best))
+    if not picked:
+        top = _trimmed(chunks[max(range(n), key=scores.__getitem__)], budget)
+        return [top] if top is not None else []
+    return [chunks[i] for i in sorted(picked)]
+
+
+def render(chunks: Iterable[Chunk]) -> str:
+    return "\n".join(f"[{fmt_ts(c.start)}] {c.text}" for c in chunks)
+
+
+def default_chunk_chars(budget: int) -> int:
+    """About five chunks per budget, so the selection has room to spread."""
+    return max(300, budget // 5)
+
+
+def fit(segments: Iterable[captions.Segment], budget: int, title: str = "", chars: Optional[int] = None) -> str:
+    """Plain transcript if it fits `budget`, else timestamped chunks chosen by select()."""
+    segments = list(segments)
+    text = captions.to_text(segments, dedupe=False)
+    if len(text) <= budget:
+        return text
+    # A chunk renders as "[h:mm:ss] text"; keep every one within the budget.
+    chars = max(1, min(chars or default_chunk_chars(budget), budget - 12))
+    chunks = list(iter_chunks(segments, chars))
+    return render(select(chunks, budget, title))
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="youtube_chunker.py")
+    p.add_argument("file", nargs="?", help="caption file (default: stdin)")
+    size = p.add_mutually_exclusive_group()
+    size.add_argument("--chars", type=int, help="max chars per chunk (default 1200, or BUDGET/5 with --select)")
+    size.add_argument("--tokens", type=int, help="max tokens per chunk (~%d chars each)" % CHARS_PER_TOKEN)
+    p.add_argument("--select", type=int, metavar="BUDGET", help="print the chunks chosen for BUDGET chars")
+    p.add_argument("--title", default="")
+    args = p.parse_args(argv)
+
+    chars = tokens_to_chars(args.tokens) if args.tokens else args.chars
+    if not chars:
+        chars = default_chunk_chars(args.select) if args.select else 1200
+    src = open(args.file, "rb") if args.file else sys.stdin.buffer
+    with src:
+        segments = captions.dedupe_if_rolling(captions.parse(src))
+        if args.select:
+            print(render(select(list(iter_chunks(segments, chars)), args.select, args.title)))
+            return 0
+        for c in iter_chunks(segments, chars):
+            sys.stdout.write(json.dumps(c._asdict(), ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Long-running mode of youtube_monitor.py (--daemon).
+
+One process keeps imports, the HTTP connection pool and the transcript pool
+warm, and schedules each channel's next poll itself:
+
+- interval: the channel's upload cadence (median gap between uploads, kept in
+  its state as "cadence") / CADENCE_POLLS, clamped to [--min-interval,
+  --max-interval]; a poll that found a new video polls again after
+  --min-interval, since uploads tend to come in bursts
+- every interval gets +-JITTER so channels do not poll in lockstep
+
+With --callback-url (a public URL that reaches --listen) each channel also
+subscribes to its feed at the WebSub hub. A push schedules an immediate poll
+of that channel, plus re-checks after PUSH_RECHECKS seconds in case the feed
+lags behind the notification. While a channel's subscription is verified it
+is only polled every --max-interval, as a safety net. Leases are renewed at
+80% of their length.
+
+Only blocks with new videos are printed (same format as a one-shot run,
+always with CHANNEL=); errors go to stderr. SIGINT / SIGTERM stop it.
+"""
+
+import heapq
+import itertools
+import random
+import signal
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+
+import youtube_monitor as ym
+import youtube_state as ystate
+import youtube_websub as websub
+
+CADENCE_POLLS = 48  # polls per typical gap between uploads
+JITTER = 0.2
+PUSH_RECHECKS = (60, 180)
+RETRY_SUBSCRIBE = 600
+
+
+def _report(name: str, e: BaseException) -> None:
+    print(f"{name}: " + "".join(traceback.format_exception_only(type(e), e)).strip(), file=sys.stderr, flush=True)
+
+
+class Daemon:
+    def __init__(
+        self,
+        channels: List[ym.Channel],
+        workers: int = 16,
+        min_interval: float = 300,
+        max_interval: float = 6 * 3600,
+        out=None,
+    ) -> None:
+        self.channels = {c.name: c for c in channels}
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.out = out or sys.stdout
+        self.subscriber: Optional[websub.Subscriber] = None
+        self._pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(channels) or 1)), thread_name_prefix="poll")
+        self._cond = threading.Condition()
+        self._heap: List[tuple] = []  # (due, seq, kind, name)
+        self._seq = itertools.count()
+        self._inflight: Set[str] = set()
+        self._again: Dict[str, str] = {}  # polls that came due while one was running
+        self._topics: Dict[str, Set[str]] = {}  # topic -> channel names
+        self._print_lock = threading.Lock()
+        self._stopping = False
+        self.polls = 0
+
+    # Scheduling
+
+    def schedule(self, name: str, delay: float, kind: str = "poll") -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + max(0.0, delay), next(self._seq), kind, name))
+            self._cond.notify()
+
+    def stop(self, *_args) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+
+    def interval(self, ch: ym.Channel, state: dict, found_new: bool) -> float:
+        if found_new:
+            base = self.min_interval
+        elif self._subscribed(ch):
+            base = self.max_interval
+        else:
+            cadence = state.get("cadence")
+            base = cadence / CADENCE_POLLS if cadence else self.max_interval / 2
+            base = min(self.max_interval, max(self.min_interval, base))
+        return base * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def _subscribed(self, ch: ym.Channel) -> bool:
+        if self.subscriber is None:
+            return False
+        now = time.time()
+        return any(ch.name in names and self.subscriber.expires(t) > now for t, names in self._topics.items())
+
+    def run(self) -> int:
+        for name in self.channels:
+            self.schedule(name, random.uniform(0, 5))  # first round right away, slightly spread
+            if self.subscriber is not None:
+                self.schedule(name, 0, "subscribe")
+        while True:
+            with self._cond:
+                while not self._stopping and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._cond.wait(timeout=self._heap[0][0] - time.monotonic() if self._heap else None)
+                if self._stopping:
+                    break
+                _, _, kind, name = heapq.heappop(self._heap)
+                if kind in ("poll", "push"):
+                    if name in self._inflight:
+                        if self._again.get(name) != "poll":
+                            self._again[name] = kind
+                        continue
+                    self._inflight.add(name)
+            if kind == "subscribe":
+                self._pool.submit(self._subscribe, name)
+            else:
+                self._pool.submit(self._poll, name, kind)
+        self._pool.shutdown(wait=True)
+        if self.subscriber is not None:
+            self.subscriber.close()
+        return 0
+
+    # Jobs
+
+    def _poll(self, name: str, kind: str) -> None:
+        """One poll; a regular ("poll") one schedules the channel's next, a "push" one does not.
+
+        Whatever fails, the channel leaves _inflight and keeps its schedule.
+        """
+        ch = self.channels[name]
+        found_new = False
+        try:
+            blocks, found_new = ym.check_channel(ch)
+            self.polls += 1
+            if found_new:
+                with self._print_lock:
+                    for lines in blocks:
+                        self.out.write(f"CHANNEL={name}\n" + "\n".join(lines) + "\n\n")
+                    self.out.flush()
+        except ystate.Busy:
+            self.polls += 1  # another run (e.g. a cron job) is on it; keep the schedule
+        except Exception as e:  # noqa: BLE001 (keep the channel scheduled)
+            self.polls += 1
+            _report(name, e)
+        finally:
+            with self._cond:
+                self._inflight.discard(name)
+                pending = self._again.pop(name, None)
+            if pending is not None:
+                self.schedule(name, 0, "poll" if "poll" in (kind, pending) else "push")
+            elif kind == "poll":
+                self.schedule(name, self._next_interval(ch, bool(found_new)))
+
+    def _next_interval(self, ch: ym.Channel, found_new: bool) -> float:
+        try:
+            return self.interval(ch, ym.channel_state(ch), found_new)
+        except Exception as e:  # noqa: BLE001 (a state read must not unschedule the channel)
+            _report(ch.name, e)
+            return self.max_interval
+
+    def _subscribe(self, name: str) -> None:
+        ch = self.channels[name]
+        try:
+            topic = websub.topic_url(ym.resolve_channel_id(ch))
+            with self._cond:
+                self._topics.setdefault(topic, set()).add(name)
+            self.subscriber.subscribe(topic)  # type: ignore[union-attr]
+        except Exception as e:  # noqa: BLE001 (polling still covers the channel)
+            print(f"{name}: WebSub subscribe failed: {e}", file=sys.stderr, flush=True)
+            self.schedule(name, RETRY_SUBSCRIBE, "subscribe")
+
+    # WebSub callbacks
+
+    def on_verified(self, topic: str, lease: int) -> None:
+        for name in self._topics.get(topic, ()):
+            self.schedule(name, lease * 0.8, "subscribe")
+
+    def on_notify(self, topic: str, entries: List[dict]) -> None:
+        for name in self._topics.get(topic, ()):
+            for delay in (0,) + PUSH_RECHECKS:
+                self.schedule(name, delay, "push")
+
+
+def run(channels: List[ym.Channel], args) -> int:
+    """Entry point for youtube_monitor.py --daemon."""
+    d = Daemon(channels, args.workers, args.min_interval, args.max_interval)
+    if args.callback_url:
+        d.subscriber = websub.Subscriber(
+            args.callback_url,
+            websub.parse_listen(args.listen),
+            hub=args.hub or websub.HUB_URL,
+            on_notify=d.on_notify,
+            on_verified=d.on_verified,
+        )
+        d.subscriber.start()
+    signal.signal(signal.SIGTERM, d.stop)
+    signal.signal(signal.SIGINT, d.stop)
+    return d.run()
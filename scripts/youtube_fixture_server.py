@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""Offline stand-in for the parts of youtube.com the YouTube scripts use.
+
+Point the scripts at it with YOUTUBE_BASE_URL=http://127.0.0.1:PORT, and
+YOUTUBE_STATE_PATH / YOUTUBE_TRANSCRIPT_CACHE_DIR in a scratch directory:
+youtube_monitor.py will not mix made-up channels into the real state/. Serves:
+  /@<handle>                            channel page with "channelId"
+  /feeds/videos.xml?channel_id=UC...    Atom feed (latest 15 videos), ETag / 304
+  /watch?v=<id>                         watch page with ytInitialPlayerResponse
+  /api/timedtext?v=<id>&lang=<l>&fmt=   caption track: json3 (default), vtt, srv3
+
+Recorded pages are served from --fixtures DIR when present:
+  DIR/channels/<handle>.html  DIR/feeds/<channel_id>.xml  DIR/watch/<video_id>.html
+  DIR/captions/<video_id>.<lang>.<fmt>
+everything else is synthesized deterministically, so any handle or channel id
+works (20 daily videos per channel to start with, English captions whose VTT
+form rolls like YouTube's auto-captions). Bodies are gzipped when the client
+accepts it.
+
+Control endpoints:
+  POST /__publish?channel_id=UC...   add a new video to that channel's feed
+  POST /__fail?kind=K&status=S&count=N[&retry_after=R]
+                                     answer the next N requests of kind K
+                                     (channel, feed, watch, timedtext) with S;
+                                     status 0 closes the connection instead
+  GET  /__stats                      {"requests", "bytes", "by_kind": {...}}
+  POST /__reset                      zero the counters
+
+Injection: --latency MS (+/- --jitter MS) before every answer; --error-rate P
+answers that share of requests with 503 (Retry-After: 0); --drop-rate P closes
+the connection without answering.
+
+Usage:
+  youtube_fixture_server.py [--listen HOST:PORT] [--fixtures DIR] [--latency MS]
+                            [--jitter MS] [--error-rate P] [--drop-rate P]
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+START_VIDEOS = 20
+FEED_SIZE = 15
+EPOCH = 1767225600  # 2026-01-01T00:00:00Z; synthetic video n is published n days later
+CUES = 60
+# Real watch pages are ~1 MB with the player response part way in.
+PAGE_HEAD_BYTES = 150 * 1024
+PAGE_TAIL_BYTES = 450 * 1024
+
+_WORDS = (
+    "today we look at how the compiler checks ownership and why borrowing rules make "
+    "concurrent code safer without a garbage collector so let us walk through an example"
+).split()
+
+
+def _b64id(seed: str, n: int) -> str:
+    return base64.urlsafe_b64encode(hashlib.sha256(seed.encode("utf-8")).digest()).decode("ascii")[:n]
+
+
+def channel_id_for(handle: str) -> str:
+    return "UC" + _b64id("channel:" + handle.lstrip("@").lower(), 22)
+
+
+def video_id_for(channel_id: str, n: int) -> str:
+    return _b64id(f"video:{channel_id}:{n}", 11)
+
+
+def _iso(ts: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(ts))
+
+
+def _ts(seconds: float) -> str:
+    ms = int(round(seconds * 1000))
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+
+
+def _lines(video_id: str):
+    rnd = random.Random(video_id)
+    return [" ".join(rnd.choice(_WORDS) for _ in range(7)) for _ in range(CUES)]
+
+
+def caption_body(video_id: str, lang: str, fmt: str) -> Tuple[bytes, str]:
+    lines = [f"[{lang}] {line}" for line in _lines(video_id)]
+    if fmt == "vtt":
+        # Auto-caption style: each cue repeats the previous line, plus a 10 ms
+        # cue that only holds the line just finished.
+        out = ["WEBVTT", "Kind: captions", f"Language: {lang}", ""]
+        prev = ""
+        for i, line in enumerate(lines):
+            start, end = i * 3.0, i * 3.0 + 2.99
+            out += [f"{_ts(start)} --> {_ts(end)} align:start position:0%", prev or " ", line, ""]
+            out += [f"{_ts(end)} --> {_ts(end + 0.01)} align:start position:0%", line, " ", ""]
+            prev = line
+        return "\n".join(out).encode("utf-8"), "text/vtt"
+    if fmt == "srv3":
+        ps = "".join(f'<p t="{i * 3000}" d="2990">{line}</p>' for i, line in enumerate(lines))
+        return f'<?xml version="1.0" encoding="utf-8" ?><timedtext format="3"><body>{ps}</body></timedtext>'.encode("utf-8"), "text/xml"
+    events = [{"tStartMs": i * 3000, "dDurationMs": 2990, "segs": [{"utf8": line}]} for i, line in enumerate(lines)]
+    return json.dumps({"wireMagic": "pb3", "events": events}).encode("utf-8"), "application/json"
+
+
+class FixtureServer:
+    def __init__(
+        self,
+        listen: Tuple[str, int] = ("127.0.0.1", 0),
+        fixtures: Optional[str] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        drop_rate: float = 0.0,
+    ) -> None:
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self._lock = threading.Lock()
+        self._videos: Dict[str, int] = {}  # channel id -> number of videos
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._failures: Dict[str, list] = {}  # kind -> [status, count, retry_after]
+        self._server = ThreadingHTTPServer(listen, self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        threading.Thread(target=self._server.serve_forever, name="youtube-fixtures", daemon=True).start()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    # Content
+
+    def publish(self, channel_id: str) -> str:
+        with self._lock:
+            n = self._videos.get(channel_id, START_VIDEOS)
+            self._videos[channel_id] = n + 1
+        return video_id_for(channel_id, n)
+
+    def _count(self, channel_id: str) -> int:
+        with self._lock:
+            return self._videos.get(channel_id, START_VIDEOS)
+
+    def _recorded(self, *parts: str) -> Optional[bytes]:
+        if not self.fixtures:
+            return None
+        path = os.path.join(self.fixtures, *parts)
+        if os.path.commonpath([os.path.abspath(path), os.path.abspath(self.fixtures)]) != os.path.abspath(self.fixtures):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def channel_page(self, handle: str) -> bytes:
+        rec = self._recorded("channels", handle + ".html")
+        if rec is not None:
+            return rec
+        cid = channel_id_for(handle)
+        return f'<html><script>var ytInitialData = {{"metadata":{{"channelMetadataRenderer":{{"externalId":"{cid}"}}}},"header":{{"channelId":"{cid}"}}}};</script></html>'.encode("utf-8")
+
+    def feed(self, channel_id: str) -> Tuple[bytes, str]:
+        count = self._count(channel_id)
+        etag = f'"{channel_id}-{count}"'
+        rec = self._recorded("feeds", channel_id + ".xml")
+        if rec is not None:
+            return rec, '"%s"' % hashlib.sha256(rec).hexdigest()[:16]
+        entries = []
+        for n in range(count - 1, max(-1, count - 1 - FEED_SIZE), -1):
+            vid = video_id_for(channel_id, n)
+            entries.append(
+                f"<entry><id>yt:video:{vid}</id><yt:videoId>{vid}</yt:videoId><yt:channelId>{channel_id}</yt:channelId>"
+                f"<title>Video {n}</title><link rel=\"alternate\" href=\"https://www.youtube.com/watch?v={vid}\"/>"
+                f"<published>{_iso(EPOCH + n * 86400)}</published></entry>"
+            )
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?><feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" '
+            'xmlns:media="http://search.yahoo.com/mrss/" xmlns="http://www.w3.org/2005/Atom">'
+            f"<title>Channel {channel_id}</title>" + "".join(entries) + "</feed>"
+        )
+        return body.encode("utf-8"), etag
+
+    def watch_page(self, video_id: str, base: str) -> bytes:
+        rec = self._recorded("watch", video_id + ".html")
+        if rec is not None:
+            return rec
+        tracks = [
+            {"baseUrl": f"{base}/api/timedtext?v={video_id}&lang={lang}", "languageCode": lang, "kind": "asr"}
+            for lang in ("en", "pt")
+        ]
+        player = {
+            "videoDetails": {"videoId": video_id, "title": f"Video {video_id}"},
+            "captions": {"playerCaptionsTracklistRenderer": {"captionTracks": tracks}},
+        }
+        head = "<!-- " + "x" * PAGE_HEAD_BYTES + " -->"
+        tail = "<!-- " + "y" * PAGE_TAIL_BYTES + " -->"
+        return f"<html><head>{head}</head><body><script>var ytInitialPlayerResponse = {json.dumps(player)};</script>{tail}</body></html>".encode("utf-8")
+
+    def fail(self, kind: str, status: int, count: int = 1, retry_after: Optional[str] = None) -> None:
+        """Answer the next `count` requests of `kind` with `status` (0: drop the
+        connection); count 0 cancels."""
+        with self._lock:
+            if count > 0:
+                self._failures[kind] = [status, count, retry_after]
+            else:
+                self._failures.pop(kind, None)
+
+    def _take_failure(self, kind: str) -> Optional[Tuple[int, Optional[str]]]:
+        with self._lock:
+            f = self._failures.get(kind)
+            if not f:
+                return None
+            f[1] -= 1
+            if f[1] <= 0:
+                del self._failures[kind]
+            return f[0], f[2]
+
+    # Stats
+
+    def _record(self, kind: str, nbytes: int) -> None:
+        with self._lock:
+            for key in (kind, "_total"):
+                st = self._stats.setdefault(key, {"requests": 0, "bytes": 0})
+                st["requests"] += 1
+                st["bytes"] += nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._stats.get("_total", {"requests": 0, "bytes": 0})
+            by_kind = {k: dict(v) for k, v in self._stats.items() if k != "_total"}
+        return {"requests": total["requests"], "bytes": total["bytes"], "by_kind": by_kind}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def _handler(self):
+        fx = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; with Nagle on, keep-alive
+            # requests would wait ~40 ms for the client's delayed ACK.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *a):
+                pass
+
+            def _send(self, kind: str, code: int, body: bytes = b"", ctype: str = "text/html; charset=utf-8", headers=()) -> None:
+                gz = len(body) > 512 and "gzip" in (self.headers.get("Accept-Encoding") or "")
+                if gz:
+                    body = gzip.compress(body, compresslevel=6)
+                self.send_response(code)
+                self.send_header("Content-Type", ctype)
+                if gz:
+                    self.send_header("Content-Encoding", "gzip")
+                for k, v in headers:
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                # Counted first, so a client that has the answer also sees it in stats().
+                if kind:
+                    fx._record(kind, len(body))
+                self.wfile.write(body)
+
+            def _drop(self, kind: str) -> None:
+                fx._record(kind, 0)
+                self.close_connection = True
+                self.connection.shutdown(2)
+
+            def _inject(self, kind: str) -> bool:
+                if fx.latency or fx.jitter:
+                    time.sleep(max(0.0, fx.latency + random.uniform(-fx.jitter, fx.jitter)) / 1000.0)
+                failure = fx._take_failure(kind)
+                if failure is not None:
+                    status, retry_after = failure
+                    if not status:
+                        self._drop(kind)
+                    else:
+                        self._send(kind, status, b"injected error", "text/plain", [("Retry-After", retry_after)] if retry_after else ())
+                    return True
+                r = random.random()
+                if r < fx.drop_rate:
+                    self._drop(kind)
+                    return True
+                if r < fx.drop_rate + fx.error_rate:
+                    self._send(kind, 503, b"injected error", "text/plain", [("Retry-After", "0")])
+                    return True
+                return False
+
+            def do_GET(self):
+                parts = urllib.parse.urlsplit(self.path)
+                q = dict(urllib.parse.parse_qsl(parts.query))
+                path = parts.path
+                if path == "/__stats":
+                    self._send("", 200, json.dumps(fx.stats()).encode("utf-8"), "application/json")
+                    return
+                if path.startswith("/@"):
+                    kind = "channel"
+                elif path == "/feeds/videos.xml":
+                    kind = "feed"
+                elif path == "/watch":
+                    kind = "watch"
+                elif path == "/api/timedtext":
+                    kind = "timedtext"
+                else:
+                    self._send("other", 404, b"not found", "text/plain")
+                    return
+                if self._inject(kind):
+                    return
+                if kind == "channel":
+                    self._send(kind, 200, fx.channel_page(path[1:]))
+                elif kind == "feed":
+                    cid = q.get("channel_id", "")
+                    if not cid.startswith("UC"):
+                        self._send(kind, 404, b"", "text/plain")
+                        return
+                    body, etag = fx.feed(cid)
+                    if self.headers.get("If-None-Match") == etag:
+                        self._send(kind, 304, b"", headers=[("ETag", etag)])
+                    else:
+                        self._send(kind, 200, body, "application/atom+xml; charset=UTF-8", [("ETag", etag)])
+                elif kind == "watch":
+                    host = self.headers.get("Host") or "%s:%s" % self.server.server_address[:2]
+                    self._send(kind, 200, fx.watch_page(q.get("v", ""), f"http://{host}"))
+                else:
+                    vid, lang, fmt = q.get("v", ""), q.get("lang", "en"), q.get("fmt") or "json3"
+                    rec = fx._recorded("captions", f"{vid}.{lang}.{fmt}")
+                    if rec is not None:
+                        self._send(kind, 200, rec, "text/plain; charset=utf-8")
+                    else:
+                        body, ctype = caption_body(vid, lang, fmt)
+                        self._send(kind, 200, body, ctype)
+
+            def do_POST(self):
+                parts = urllib.parse.urlsplit(self.path)
+                q = dict(urllib.parse.parse_qsl(parts.query))
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if parts.path == "/__publish" and q.get("channel_id"):
+                    self._send("", 200, fx.publish(q["channel_id"]).encode("ascii"), "text/plain")
+                elif parts.path == "/__fail" and q.get("kind"):
+                    fx.fail(q["kind"], int(q.get("status") or 0), int(q.get("count") or 1), q.get("retry_after"))
+                    self._send("", 204)
+                elif parts.path == "/__reset":
+                    fx.reset()
+                    self._send("", 204)
+                else:
+                    self._send("", 404, b"not found", "text/plain")
+
+        return Handler
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="youtube_fixture_server.py")
+    p.add_argument("--listen", default="127.0.0.1:8090")
+    p.add_argument("--fixtures", help="directory with recorded pages")
+    p.add_argument("--latency", type=float, default=0.0, help="ms before every answer")
+    p.add_argument("--jitter", type=float, default=0.0, help="+/- ms on top of --latency")
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--drop-rate", type=float, default=0.0)
+    args = p.parse_args(argv)
+
+    host, _, port = args.listen.rpartition(":")
+    fx = FixtureServer((host or "127.0.0.1", int(port)), args.fixtures, args.latency, args.jitter, args.error_rate, args.drop_rate)
+    print(
+        f"serving on {fx.url} (YOUTUBE_BASE_URL={fx.url}, with YOUTUBE_STATE_PATH and "
+        "YOUTUBE_TRANSCRIPT_CACHE_DIR in a scratch directory)",
+        flush=True,
+    )
+    try:
+        fx.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Shared HTTP client for the YouTube scripts.
+
+- keep-alive: connections are pooled per (scheme, host, port) and reused
+  across requests and threads (one request per connection at a time)
+- sends Accept-Encoding gzip/deflate (plus br when the brotli module is
+  importable) and decodes bodies transparently, also when streaming
+- retries connection errors, 429 and 5xx with jittered exponential backoff,
+  honouring Retry-After; a request that fails on a reused pooled connection
+  (the server closed it while idle) is retried once, at once, on a new
+  connection; any further failure backs off and counts as a retry
+- follows redirects
+- timing hooks: callables receiving one dict per request (method, url,
+  status, attempts, reused, stale, seconds, bytes, error)
+
+Config:
+  YOUTUBE_BASE_URL       where youtube.com requests go (default
+                         https://www.youtube.com); see youtube_fixture_server.py
+  YOUTUBE_HTTP_RETRIES   extra attempts after the first (default 3)
+  YOUTUBE_HTTP_TRACE=1   print one timing line per request to stderr
+"""
+
+import email.utils
+import http.client
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # optional
+    brotli = None
+
+DEFAULT_BASE_URL = "https://www.youtube.com"
+BASE_URL = (os.environ.get("YOUTUBE_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) OpenClawTranscriptBot/1.0"
+ACCEPT_ENCODING = "gzip, deflate" + (", br" if brotli is not None else "")
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+MAX_REDIRECTS = 5
+
+Hook = Callable[[dict], None]
+
+
+def youtube_url(path: str) -> str:
+    """URL of a youtube.com page (`path` starts with "/") under BASE_URL."""
+    return BASE_URL + path
+
+
+def is_stand_in() -> bool:
+    """True when BASE_URL points somewhere other than youtube.com."""
+    return BASE_URL != DEFAULT_BASE_URL
+
+
+class HTTPError(Exception):
+    """A final status >= 400 (after retries)."""
+
+    def __init__(self, code: int, url: str, headers=None) -> None:
+        super().__init__(f"HTTP {code} for {url}")
+        self.code = code
+        self.url = url
+        self.headers = headers
+
+
+class Response:
+    def __init__(self, status: int, url: str, headers, body: bytes) -> None:
+        self.status = status
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding, errors="ignore")
+
+
+class _Brotli:
+    def __init__(self) -> None:
+        self._d = brotli.Decompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        # brotli has process(), brotlicffi has decompress()
+        fn = getattr(self._d, "process", None) or self._d.decompress
+        return fn(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def _decoder(content_encoding: Optional[str]):
+    enc = (content_encoding or "").strip().lower()
+    if enc in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if enc == "deflate":
+        return zlib.decompressobj()
+    if enc == "br" and brotli is not None:
+        return _Brotli()
+    return None
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def trace_to_stderr(ev: dict) -> None:
+    status = ev.get("status") or ev.get("error")
+    print(
+        f"[http] {ev['method']} {ev['url']} -> {status} {ev['seconds'] * 1000:.0f}ms "
+        f"{ev.get('bytes', 0)}B attempts={ev['attempts']} reused={ev['reused']}",
+        file=sys.stderr,
+    )
+
+
+class StreamResponse:
+    """Decoded body, read incrementally; see HTTPClient.stream()."""
+
+    def __init__(self, resp: http.client.HTTPResponse, url: str) -> None:
+        self.status = resp.status
+        self.url = url
+        self.headers = resp.headers
+        self.bytes = 0
+        self.done = False
+        self._resp = resp
+        self._dec = _decoder(resp.getheader("Content-Encoding"))
+        self._tail = b""  # compressed input zlib has not decoded yet
+
+    def read(self, n: int = -1) -> bytes:
+        """Up to `n` decoded bytes (n <= 0: the rest); b"" at the end."""
+        limit = n if n and n > 0 else 0
+        while not self.done:
+            if self._tail:
+                raw, self._tail = self._tail, b""
+            else:
+                raw = self._resp.read(limit) if limit else self._resp.read()
+            if not raw:
+                self.done = True
+                out = self._dec.flush() if self._dec is not None else b""
+            elif isinstance(self._dec, _Brotli) or self._dec is None:
+                out = self._dec.decompress(raw) if self._dec is not None else raw
+            else:
+                out = self._dec.decompress(raw, limit)
+                self._tail = self._dec.unconsumed_tail
+            if out:
+                self.bytes += len(out)
+                return out
+        return b""
+
+
+class HTTPClient:
+    def __init__(
+        self,
+        timeout: float = 25,
+        retries: Optional[int] = None,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        max_retry_after: float = 120.0,
+        max_idle_per_host: int = 8,
+        user_agent: str = USER_AGENT,
+    ) -> None:
+        self.timeout = timeout
+        self.retries = retries if retries is not None else int(os.environ.get("YOUTUBE_HTTP_RETRIES") or 3)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.max_idle_per_host = max_idle_per_host
+        self.user_agent = user_agent
+        self.hooks: List[Hook] = []
+        if os.environ.get("YOUTUBE_HTTP_TRACE"):
+            self.hooks.append(trace_to_stderr)
+        self._lock = threading.Lock()
+        self._idle: Dict[tuple, List[http.client.HTTPConnection]] = {}
+
+    # Connection pool
+
+    def _acquire(self, key: tuple, timeout: float, fresh: bool = False) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = None if fresh else self._idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.timeout = timeout
+            try:
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+            except OSError:
+                conn.close()
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=timeout), False
+
+    def _release(self, key: tuple, conn: http.client.HTTPConnection, resp: http.client.HTTPResponse) -> None:
+        # Reusable only once the response was read to the end.
+        if resp.isclosed() and not resp.will_close:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle_per_host:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for c in conns:
+            c.close()
+
+    # Requests
+
+    def _emit(self, ev: dict) -> None:
+        for hook in self.hooks:
+            try:
+                hook(ev)
+            except Exception:  # noqa: BLE001 (a broken hook must not fail the request)
+                pass
+
+    def _delay(self, attempt: int, retry_after: Optional[str]) -> Optional[float]:
+        """Seconds to wait before retry number `attempt`; None = do not retry."""
+        secs = _retry_after_seconds(retry_after)
+        if secs is not None:
+            if secs > self.max_retry_after:
+                return None
+            return secs + random.uniform(0, self.backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def _send(self, method: str, url: str, headers: Optional[dict], body: Optional[bytes], timeout: float):
+        """Send with retries and redirects; returns (key, conn, resp, final url, info)."""
+        info = {"method": method, "url": url, "attempts": 0, "reused": False, "stale": 0, "t0": time.perf_counter()}
+        redirects = 0
+        attempt = 0
+        while True:
+            parts = urllib.parse.urlsplit(url)
+            key = (parts.scheme, parts.hostname, parts.port)
+            path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+            hdrs = {"User-Agent": self.user_agent, "Accept-Encoding": ACCEPT_ENCODING, **(headers or {})}
+            conn, reused = self._acquire(key, timeout, fresh=info["stale"] > 0)
+            info["attempts"] += 1
+            info["reused"] = reused
+            try:
+                conn.request(method, path, body=body, headers=hdrs)
+                resp = conn.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if reused and not info["stale"]:
+                    # Most likely the server dropped the idle keep-alive
+                    # connection: once, retry at once on a new one.
+                    info["stale"] += 1
+                    continue
+                if attempt >= self.retries:
+                    self._emit({**info, "url": url, "status": None, "error": repr(e), "seconds": time.perf_counter() - info["t0"]})
+                    raise
+                attempt += 1
+                time.sleep(self._delay(attempt, None) or 0)
+                continue
+
+            if resp.status in REDIRECT_STATUSES and redirects < MAX_REDIRECTS and resp.getheader("Location"):
+                location = resp.getheader("Location")
+                resp.read()
+                self._release(key, conn, resp)
+                url = urllib.parse.urljoin(url, location)
+                if resp.status == 303:
+                    method, body = "GET", None
+                redirects += 1
+                continue
+
+            if resp.status in RETRY_STATUSES and attempt < self.retries:
+                delay = self._delay(attempt + 1, resp.getheader("Retry-After"))
+                if delay is not None:
+                    resp.read()
+                    self._release(key, conn, resp)
+                    attempt += 1
+                    time.sleep(delay)
+                    continue
+
+            return key, conn, resp, url, info
+
+    def request(self, method: str, url: str, headers: Optional[dict] = None, body: Optional[bytes] = None, timeout: Optional[float] = None) -> Response:
+        """Whole decoded response. Raises HTTPError for a final status >= 400 (not for 304)."""
+        key, conn, resp, url, info = self._send(method, url, headers, body, timeout or self.timeout)
+        try:
+            raw = resp.read()
+        except BaseException:
+            conn.close()
+            raise
+        dec = _decoder(resp.getheader("Content-Encoding"))
+        data = dec.decompress(raw) + dec.flush() if dec is not None else raw
+        self._release(key, conn, resp)
+        self._emit({**info, "url": url, "status": resp.status, "bytes": len(data), "seconds": time.perf_counter() - info["t0"]})
+        if resp.status >= 400:
+            raise HTTPError(resp.status, url, resp.headers)
+        return Response(resp.status, url, resp.headers, data)
+
+    def get(self, url: str, headers: Optional[dict] = None, timeout: Optional[float] = None) -> Response:
+        return self.request("GET", url, headers=headers, timeout=timeout)
+
+    @contextmanager
+    def stream(self, url: str, headers: Optional[dict] = None, timeout: Optional[float] = None):
+        """GET whose decoded body is read incrementally from the yielded StreamResponse.
+
+        Leaving the block early closes the connection instead of draining it.
+        """
+        key, conn, resp, url, info = self._send("GET", url, headers, None, timeout or self.timeout)
+        s = StreamResponse(resp, url)
+        try:
+            if resp.status >= 400:
+                s.read()
+                raise HTTPError(resp.status, url, resp.headers)
+            yield s
+        finally:
+            if s.done:
+                self._release(key, conn, resp)
+            else:
+                conn.close()
+            self._emit({**info, "url": url, "status": resp.status, "bytes": s.bytes, "seconds": time.perf_counter() - info["t0"]})
+
+
+_default: Optional[HTTPClient] = None
+_default_lock = threading.Lock()
+
+
+def default_client() -> HTTPClient:
+    """Process-wide client, so every script and thread shares one pool."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = HTTPClient()
+        return _default
@@ -0,0 +1,660 @@
+#!/usr/bin/env python3
+"""Poll YouTube channels for new videos and print a transcript snippet per channel.
+
+Channels come from a config file (config/youtube_channels.json, or
+$YOUTUBE_CHANNELS_CONFIG / --config):
+
+  {"channels": [
+    {"name": "lucasmontano",            # used by --channel and in output
+     "handle": "@lucasmontano",          # or "channel_id": "UC..."
+     "languages": ["pt", "en"],          # transcript preference
+     "fallbacks": ["yt-dlp"],            # any-language | yt-dlp | watch-page, tried in order
+     "state": "state/lucasmontano_last_video.json",  # legacy state, imported once
+     "max_chars": 6000,                  # transcript budget, see get_transcript_text
+     "template": {...}}                  # see DEFAULT_TEMPLATE
+  ]}
+
+Channels are polled concurrently on a bounded thread pool, so a sweep takes
+about as long as the slowest channel. Blocks are printed in config order, each
+in the usual format:
+
+  NEW_VIDEO=true|false
+  VIDEO_ID=...
+  VIDEO_URL=...
+  TITLE=...
+
+  ===TRANSCRIPT_SNIPPET_START===
+  ...
+  ===TRANSCRIPT_SNIPPET_END===
+
+Every feed entry not yet seen gets its own NEW_VIDEO=true block, oldest first
+(transcripts are fetched concurrently on a shared, bounded pool); with nothing
+new a channel prints one NEW_VIDEO=false block for its latest video. Each
+channel remembers the last SEEN_MAX video ids in its record in the shared state
+store (youtube_state.py). With more than one channel selected every block
+starts with CHANNEL=<name>.
+
+A channel is polled by one run at a time: when an earlier run (e.g. a cron tick
+still waiting on yt-dlp, or the daemon) is polling it, the channel is skipped
+with a note on stderr instead of fetching the same transcripts again.
+
+Feeds are fetched conditionally: the ETag, Last-Modified and body hash of the
+last fetch are kept in the channel state ("feed"), so an unchanged feed ends
+the poll after one cheap request, before any XML parsing or transcript work
+(unless the template asks for the transcript on every run).
+
+Usage:
+  youtube_monitor.py [--config PATH] [--channel NAME ...] [--workers N]
+  youtube_monitor.py --daemon [--callback-url URL --listen HOST:PORT --hub URL]
+                     [--min-interval S] [--max-interval S]
+
+--daemon keeps running and schedules polls itself (see youtube_daemon.py).
+
+With YOUTUBE_BASE_URL pointing at a stand-in (youtube_fixture_server.py) the
+state store and transcript cache must live outside state/; the monitor
+refuses to run otherwise.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import traceback
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from youtube_transcript_api import YouTubeTranscriptApi
+from youtube_transcript_api._errors import NoTranscriptFound, TranscriptsDisabled, VideoUnavailable
+
+import youtube_captions as captions
+import youtube_chunker as chunker
+import youtube_http as yhttp
+import youtube_public_captions as ypc
+import youtube_state as ystate
+import youtube_transcript_cache as tcache
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+STATE_DIR = os.path.join(ROOT, "state")
+CONFIG_PATH = os.environ.get("YOUTUBE_CHANNELS_CONFIG") or os.path.join(ROOT, "config", "youtube_channels.json")
+
+# Handle -> channel id never changes in practice; the page it is scraped from
+# is the most expensive request we make, so resolved ids are kept in the state
+# store (entries of the old ids file are imported on first use).
+LEGACY_CHANNEL_IDS_PATH = os.path.join(STATE_DIR, "youtube_channel_ids.json")
+CHANNEL_ID_TTL = int(float(os.environ.get("YOUTUBE_CHANNEL_ID_TTL_DAYS") or 30) * 86400)
+
+# Raised by the transcript API when a video definitely has no usable track;
+# anything else is treated as a transient failure and not cached.
+NO_TRANSCRIPT = (NoTranscriptFound, TranscriptsDisabled, VideoUnavailable)
+
+# One yt-dlp run may take YTDLP_TIMEOUT seconds; all transcript work for one
+# video (API + fallbacks) stops starting new steps after TRANSCRIPT_DEADLINE.
+YTDLP_TIMEOUT = float(os.environ.get("YOUTUBE_YTDLP_TIMEOUT") or 90)
+TRANSCRIPT_DEADLINE = float(os.environ.get("YOUTUBE_TRANSCRIPT_DEADLINE") or 150)
+
+# Transcript fetches for new videos share one pool across all channels.
+TRANSCRIPT_WORKERS = int(os.environ.get("YOUTUBE_TRANSCRIPT_WORKERS") or 4)
+_transcript_pool: Optional[ThreadPoolExecutor] = None
+_transcript_pool_lock = threading.Lock()
+
+# Video ids remembered per channel (a feed lists the latest 15).
+SEEN_MAX = 200
+transcripts = tcache.TranscriptCache()
+store = ystate.StateStore()
+
+DEFAULT_LANGUAGES = ["en", "en-US"]
+FALLBACKS = ("any-language", "yt-dlp", "watch-page")
+
+# header: lines formatted with new, name, channel_id, video_id, url, title, published
+# transcript: "new" (only for a new video) or "always"
+DEFAULT_TEMPLATE = {
+    "header": ["NEW_VIDEO={new}", "VIDEO_ID={video_id}", "VIDEO_URL={url}", "TITLE={title}"],
+    "transcript": "new",
+    "no_new": "No new video since last check.",
+    "no_transcript": "(No transcript available via API; use title/description only.)",
+}
+
+FEED_NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "yt": "http://www.youtube.com/xml/schemas/2015",
+    "media": "http://search.yahoo.com/mrss/",
+}
+
+
+@dataclass
+class Channel:
+    name: str
+    handle: Optional[str] = None
+    channel_id: Optional[str] = None
+    languages: List[str] = field(default_factory=lambda: list(DEFAULT_LANGUAGES))
+    fallbacks: List[str] = field(default_factory=list)
+    state: str = ""
+    template: Dict[str, object] = field(default_factory=lambda: dict(DEFAULT_TEMPLATE))
+    max_chars: int = 6000
+
+
+def load_config(path: str = CONFIG_PATH) -> List[Channel]:
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    channels = []
+    seen = set()
+    for c in raw.get("channels", []):
+        name = c.get("name") or c.get("handle") or c.get("channel_id")
+        if not name:
+            raise ValueError("channel entry needs a name, handle or channel_id")
+        if name in seen:
+            raise ValueError(f"duplicate channel name: {name}")
+        if not (c.get("handle") or c.get("channel_id")):
+            raise ValueError(f"{name}: needs a handle or channel_id")
+        bad = [x for x in c.get("fallbacks", []) if x not in FALLBACKS]
+        if bad:
+            raise ValueError(f"{name}: unknown fallbacks {bad}")
+        seen.add(name)
+        state = c.get("state") or os.path.join("state", f"{name}_last_video.json")
+        channels.append(
+            Channel(
+                name=name,
+                handle=c.get("handle"),
+                channel_id=c.get("channel_id"),
+                languages=list(c.get("languages") or DEFAULT_LANGUAGES),
+                fallbacks=list(c.get("fallbacks") or []),
+                state=state if os.path.isabs(state) else os.path.join(ROOT, state),
+                template={**DEFAULT_TEMPLATE, **(c.get("template") or {})},
+                max_chars=int(c.get("max_chars") or 6000),
+            )
+        )
+    return channels
+
+
+def fetch(url: str, timeout: int = 25) -> bytes:
+    return yhttp.default_client().get(url, timeout=timeout).body
+
+
+def extract_channel_id(html: str) -> str:
+    # YouTube pages include: "channelId":"UC..."
+    m = re.search(r'"channelId"\s*:\s*"(UC[0-9A-Za-z_-]{20,})"', html)
+    if m:
+        return m.group(1)
+    # Alternate: "externalId":"UC..."
+    m = re.search(r'"externalId"\s*:\s*"(UC[0-9A-Za-z_-]{20,})"', html)
+    if m:
+        return m.group(1)
+    raise RuntimeError("Could not extract channelId from channel page")
+
+
+def resolve_channel_id(ch: Channel, refresh: bool = False) -> str:
+    """Channel id for a config entry; handles go through the on-disk cache.
+
+    The channel page is only fetched on a cache miss, after CHANNEL_ID_TTL, or
+    with `refresh` (the cached id's feed returned 404). If that fetch fails, a
+    stale cached id is still better than nothing.
+    """
+    if ch.channel_id:
+        return ch.channel_id
+    handle = ch.handle if ch.handle.startswith("@") else "@" + ch.handle  # type: ignore[union-attr]
+    hit = store.get("channel_ids", handle, LEGACY_CHANNEL_IDS_PATH, handle)
+    now = int(time.time())
+    if hit and not refresh and now - int(hit.get("resolved_unix") or 0) < CHANNEL_ID_TTL:
+        return hit["channel_id"]
+
+    try:
+        html = fetch(yhttp.youtube_url(f"/{handle}")).decode("utf-8", errors="ignore")
+        channel_id = extract_channel_id(html)
+    except Exception:
+        if hit and not refresh:
+            return hit["channel_id"]
+        raise
+    store.put("channel_ids", handle, {"channel_id": channel_id, "resolved_unix": now})
+    return channel_id
+
+
+def feed_url(channel_id: str) -> str:
+    return yhttp.youtube_url(f"/feeds/videos.xml?channel_id={channel_id}")
+
+
+def fetch_feed(channel_id: str, validators: dict, timeout: int = 25) -> Tuple[Optional[bytes], dict]:
+    """Conditional GET of a channel feed.
+
+    `validators` are what the last fetch returned (etag, last_modified, sha256).
+    Returns (None, validators) when the feed is unchanged -- a 304, or a 200 with
+    the same body hash -- else (body, new validators).
+    """
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    r = yhttp.default_client().get(feed_url(channel_id), headers=headers, timeout=timeout)
+    if r.status == 304:
+        return None, validators
+    body = r.body
+    etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+
+    digest = hashlib.sha256(body).hexdigest()
+    new = {"channel_id": channel_id, "etag": etag, "last_modified": last_modified, "sha256": digest}
+    if digest == validators.get("sha256"):
+        return None, new
+    return body, new
+
+
+def parse_feed(xml_bytes: bytes) -> List[dict]:
+    """Every entry of a channel feed, newest first, in one incremental pass."""
+    entries = []
+    entry_tag = "{%s}entry" % FEED_NS["atom"]
+    for _, el in ET.iterparse(io.BytesIO(xml_bytes), events=("end",)):
+        if el.tag != entry_tag:
+            continue
+        vid = el.findtext("yt:videoId", default="", namespaces=FEED_NS).strip()
+        if vid:
+            link_el = el.find("atom:link", FEED_NS)
+            entries.append({
+                "video_id": vid,
+                "title": el.findtext("atom:title", default="", namespaces=FEED_NS).strip(),
+                "published": el.findtext("atom:published", default="", namespaces=FEED_NS).strip(),
+                "link": (link_el.get("href") if link_el is not None else "") or f"https://www.youtube.com/watch?v={vid}",
+            })
+        el.clear()
+    if not entries:
+        raise RuntimeError("No <entry> in feed")
+    return entries
+
+
+def upload_cadence(entries: List[dict]) -> Optional[int]:
+    """Median seconds between the feed's uploads (None with fewer than two dates)."""
+    stamps = []
+    for e in entries:
+        try:
+            stamps.append(datetime.fromisoformat(e.get("published", "")).timestamp())
+        except ValueError:
+            continue
+    stamps.sort()
+    gaps = sorted(b - a for a, b in zip(stamps, stamps[1:]) if b > a)
+    return int(gaps[len(gaps) // 2]) if gaps else None
+
+
+def _bootstrap_seen(state: dict, entries: List[dict]) -> List[str]:
+    """Seen-set for a channel whose state predates it (or is empty)."""
+    ids = [e["video_id"] for e in entries]
+    vid = state.get("video_id")
+    if vid in ids:
+        # The old single-id state: that video and everything older was handled.
+        return ids[ids.index(vid):]
+    cutoff = state.get("published")
+    if vid and cutoff:
+        return [e["video_id"] for e in entries if e["published"] and e["published"] <= cutoff]
+    # First poll of a channel: only its newest video is reported.
+    return ids[1:]
+
+
+def channel_state(ch: Channel) -> dict:
+    """The channel's record in the state store (imported from ch.state on first use)."""
+    return store.get("channels", ch.name, ch.state)
+
+
+def _transcript_api(video_id: str, languages: List[str]) -> Optional[List[captions.Segment]]:
+    try:
+        t = YouTubeTranscriptApi.list_transcripts(video_id).find_transcript(languages)
+        return list(captions.dedupe_if_rolling(captions.from_api(t.fetch()), t.is_generated))
+    except NO_TRANSCRIPT:
+        return []
+    except Exception:
+        return None
+
+
+def _transcript_any_language(video_id: str) -> Optional[List[captions.Segment]]:
+    """Any transcript the video has: a manual one first, else a generated one."""
+    try:
+        tl = YouTubeTranscriptApi.list_transcripts(video_id)
+        t = None
+        for tr in tl:
+            if tr.is_generated is False:
+                t = tr
+                break
+        if t is None:
+            t = tl.find_generated_transcript(tl._TranscriptList__transcripts.keys())  # best-effort
+        return list(captions.dedupe_if_rolling(captions.from_api(t.fetch()), t.is_generated)) if t is not None else []
+    except NO_TRANSCRIPT:
+        return []
+    except Exception:
+        return None
+
+
+def _transcript_via_ytdlp(video_url: str, languages: List[str], timeout: float = YTDLP_TIMEOUT) -> Optional[List[captions.Segment]]:
+    """Best-effort subtitle fetch via yt-dlp, in a single invocation.
+
+    Every wanted language is requested at once, manual and auto captions
+    together (yt-dlp writes a language's manual track when it has one, else
+    the auto one), then the best file is picked by `languages` order. The
+    process group is killed after `timeout` seconds.
+
+    [] when yt-dlp ran cleanly and found nothing; None when it is missing,
+    failed or timed out.
+    """
+    import signal
+    import subprocess
+    import tempfile
+
+    if not shutil.which("yt-dlp") or timeout <= 0:
+        return None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cmd = ["yt-dlp", "--skip-download", "--no-playlist"]
+        cookies = os.environ.get("YT_COOKIES")
+        if cookies and os.path.exists(cookies):
+            cmd += ["--cookies", cookies]
+        cmd += [
+            "--write-subs",
+            "--write-auto-subs",
+            "--sub-langs",
+            ",".join(languages),
+            "--sub-format",
+            "vtt",
+            "-o",
+            os.path.join(tmp, "%(id)s.%(ext)s"),
+            video_url,
+        ]
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            proc.wait()
+            # Whatever it wrote so far may be partial; not a result.
+            print(f"yt-dlp: timed out after {timeout:g}s for {video_url}", file=sys.stderr)
+            return None
+
+        # Files are named <id>.<lang>.vtt
+        found = {}
+        for name in os.listdir(tmp):
+            if name.endswith(".vtt"):
+                found[name[: -len(".vtt")].rsplit(".", 1)[-1].lower()] = name
+        for lang in languages:
+            name = found.get(lang.lower())
+            if name:
+                with open(os.path.join(tmp, name), "rb") as f:
+                    # Manual or auto track, whichever yt-dlp found; the cues tell.
+                    return list(captions.dedupe_if_rolling(captions.parse_vtt(f)))
+
+    # It may exit non-zero after writing some languages, so files come first.
+    return [] if proc.returncode == 0 else None
+
+
+def _transcript_watch_page(video_id: str, languages: List[str]) -> Optional[List[captions.Segment]]:
+    """Caption track listed on the watch page (see youtube_public_captions.py)."""
+    try:
+        tracks = ypc.fetch_caption_tracks(video_id)
+        if tracks is None:
+            return None  # consent or bot-check page, not an answer about the video
+        track = ypc.best_track(tracks, languages)
+        return ypc.download_track_segments(track["baseUrl"], rolling=ypc.is_auto(track)) if track is not None else []
+    except Exception:
+        return None
+
+
+def _cached_segments(video_id: str, language: str, source: str, produce) -> List[captions.Segment]:
+    """`produce()` read through the transcript cache, keeping the timestamped segments.
+
+    None from `produce` (a failure that says nothing about the video) is not cached.
+    """
+    entry = transcripts.get_entry(video_id, language, source)
+    if entry is not None:
+        if "segments" in entry:
+            return [captions.Segment(*seg) for seg in entry["segments"]]
+        return [captions.Segment(0.0, 0.0, entry["text"])] if entry["text"] else []
+    segments = produce()
+    if segments is None:
+        return []
+    transcripts.put(video_id, language, source, captions.to_text(segments, dedupe=False), segments=[list(seg) for seg in segments])
+    return segments
+
+
+def get_transcript_text(ch: Channel, video_id: str, video_url: str, title: str = "") -> str:
+    """Transcript snippet for a video, at most ch.max_chars.
+
+    Sources are read through the transcript cache. A transcript that does not
+    fit is cut into timestamped chunks and the most relevant ones are kept
+    (see youtube_chunker.py), instead of only its beginning.
+    """
+    langs = ",".join(ch.languages)
+    deadline = time.monotonic() + TRANSCRIPT_DEADLINE
+    # The transcript API and yt-dlp always talk to youtube.com; against a
+    # stand-in (YOUTUBE_BASE_URL) only the watch-page source is used.
+    stand_in = yhttp.is_stand_in()
+    # 1) Transcript API in the preferred languages (fast)
+    segments = [] if stand_in else _cached_segments(video_id, langs, "api", lambda: _transcript_api(video_id, ch.languages))
+
+    # 2) Configured fallbacks, in order
+    for fb in ch.fallbacks:
+        left = deadline - time.monotonic()
+        if segments or left <= 0:
+            break
+        if fb == "watch-page":
+            segments = _cached_segments(video_id, langs, ypc.SOURCE, lambda: _transcript_watch_page(video_id, ch.languages))
+        elif stand_in:
+            continue
+        elif fb == "any-language":
+            segments = _cached_segments(video_id, "*", "api", lambda: _transcript_any_language(video_id))
+        elif fb == "yt-dlp":
+            segments = _cached_segments(video_id, langs, "yt-dlp", lambda: _transcript_via_ytdlp(video_url, ch.languages, min(YTDLP_TIMEOUT, left)))
+
+    return chunker.fit(segments, ch.max_chars, title)
+
+
+def _fetch_channel_feed(ch: Channel, state: dict) -> Tuple[str, Optional[bytes], dict]:
+    channel_id = resolve_channel_id(ch)
+    # Validators are only stored together with a processed video, so an
+    # unchanged feed means its latest entry is still state["video_id"].
+    validators = state.get("feed") or {}
+    if validators.get("channel_id") != channel_id or not state.get("video_id"):
+        validators = {}
+    try:
+        body, validators = fetch_feed(channel_id, validators)
+    except yhttp.HTTPError as e:
+        if e.code != 404 or ch.channel_id:
+            raise
+        # The cached id for this handle is gone; resolve it again, once.
+        channel_id = resolve_channel_id(ch, refresh=True)
+        body, validators = fetch_feed(channel_id, {})
+    return channel_id, body, validators
+
+
+def _transcripts() -> ThreadPoolExecutor:
+    global _transcript_pool
+    with _transcript_pool_lock:
+        if _transcript_pool is None:
+            _transcript_pool = ThreadPoolExecutor(max_workers=max(1, TRANSCRIPT_WORKERS), thread_name_prefix="transcript")
+        return _transcript_pool
+
+
+def _block(ch: Channel, channel_id: str, video: dict, is_new: bool, transcript: Optional[str]) -> List[str]:
+    tpl = ch.template
+    fields = {
+        "new": str(is_new).lower(),
+        "name": ch.name,
+        "channel_id": channel_id,
+        "video_id": video["video_id"],
+        "url": video["link"],
+        "title": video.get("title", ""),
+        "published": video.get("published", ""),
+    }
+    lines = [str(h).format(**fields) for h in tpl["header"]]  # type: ignore[union-attr]
+    lines.append("")
+    if transcript is None:
+        lines.append(str(tpl["no_new"]))
+        return lines
+    lines.append("===TRANSCRIPT_SNIPPET_START===")
+    lines.append(transcript or str(tpl["no_transcript"]))
+    lines.append("===TRANSCRIPT_SNIPPET_END===")
+    return lines
+
+
+def poll_channel(ch: Channel) -> List[List[str]]:
+    """Check one channel, update its state file and return one output block per video.
+
+    Every feed entry not in the channel's seen-set gets a NEW_VIDEO=true block
+    (oldest first); with nothing new there is a single NEW_VIDEO=false block
+    for the latest video.
+    """
+    return check_channel(ch)[0]
+
+
+def check_channel(ch: Channel) -> Tuple[List[List[str]], int]:
+    """poll_channel(), plus how many of the blocks are new videos.
+
+    Raises ystate.Busy when another run is polling the channel.
+    """
+    with store.claim(ch.name):
+        return _check_channel(ch)
+
+
+def _check_channel(ch: Channel) -> Tuple[List[List[str]], int]:
+    state = channel_state(ch)
+    channel_id, body, validators = _fetch_channel_feed(ch, state)
+    if body is None:
+        entries = [{
+            "video_id": state["video_id"],
+            "title": state.get("title", ""),
+            "link": state.get("url") or f"https://www.youtube.com/watch?v={state['video_id']}",
+            "published": state.get("published", ""),
+        }]
+        seen = list(state.get("seen") or [state["video_id"]])
+    else:
+        entries = parse_feed(body)
+        seen = state.get("seen")
+        if seen is None:
+            seen = _bootstrap_seen(state, entries)
+        state["cadence"] = upload_cadence(entries)
+    seen_set = set(seen)
+    new = [e for e in reversed(entries) if e["video_id"] not in seen_set]
+    latest = entries[0]
+
+    # Always update "last_seen"; "processed_unix" only when something was processed.
+    now = int(time.time())
+    state["last_seen_unix"] = now
+    state["feed"] = validators
+
+    if not new:
+        always = ch.template["transcript"] == "always"
+        transcript = get_transcript_text(ch, latest["video_id"], latest["link"], latest.get("title", "")) if always else None
+        blocks = [_block(ch, channel_id, latest, False, transcript)]
+    else:
+        store.mark(ch.name, [e["video_id"] for e in new])
+        pool = _transcripts()
+        futures = [pool.submit(get_transcript_text, ch, e["video_id"], e["link"], e.get("title", "")) for e in new]
+        blocks = [_block(ch, channel_id, e, True, f.result()) for e, f in zip(new, futures)]
+        seen = (seen + [e["video_id"] for e in new])[-SEEN_MAX:]
+        state["processed_unix"] = now
+
+    # The legacy fields track the feed's newest entry; with the validators they
+    # let an unchanged feed be answered from the state alone.
+    state.update({
+        "video_id": latest["video_id"],
+        "title": latest.get("title", ""),
+        "url": latest["link"],
+        "published": latest.get("published", ""),
+        "seen": seen,
+    })
+    store.put("channels", ch.name, state)  # also drops the in-progress marker
+    return blocks, len(new)
+
+
+def stand_in_conflicts() -> List[str]:
+    """Settings that would mix a stand-in's (YOUTUBE_BASE_URL) made-up channel
+    ids and transcripts into the real state/ dir; empty when all is well."""
+    if not yhttp.is_stand_in():
+        return []
+    real = os.path.realpath(STATE_DIR)
+
+    def inside(path: str) -> bool:
+        p = os.path.realpath(path)
+        return p == real or p.startswith(real + os.sep)
+
+    paths = (("YOUTUBE_STATE_PATH", store.path), ("YOUTUBE_TRANSCRIPT_CACHE_DIR", transcripts.root))
+    return [name for name, path in paths if inside(path)]
+
+
+def _poll_safe(ch: Channel):
+    try:
+        return poll_channel(ch), None
+    except ystate.Busy as e:
+        return [], f"skipped, {e}"
+    except Exception as e:  # noqa: BLE001 (one channel must not stop the sweep)
+        return None, "".join(traceback.format_exception_only(type(e), e)).strip()
+
+
+def sweep(channels: List[Channel], workers: int = 16):
+    """Poll channels concurrently; yields (channel, blocks, error) in config order.
+
+    A channel another run is polling comes back with no blocks and a "skipped"
+    note as its error.
+    """
+    if not channels:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(channels)))) as pool:
+        for ch, (blocks, err) in zip(channels, pool.map(_poll_safe, channels)):
+            yield ch, blocks, err
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Poll YouTube channels for new videos.")
+    p.add_argument("--config", default=CONFIG_PATH)
+    p.add_argument("--channel", action="append", default=[], help="only this channel (repeatable)")
+    p.add_argument("--workers", type=int, default=16)
+    d = p.add_argument_group("daemon")
+    d.add_argument("--daemon", action="store_true", help="keep running; poll on a schedule and take WebSub pushes")
+    d.add_argument("--min-interval", type=float, default=300, help="seconds (default 300)")
+    d.add_argument("--max-interval", type=float, default=6 * 3600, help="seconds (default 21600)")
+    d.add_argument("--callback-url", help="public URL of the WebSub callback (enables push)")
+    d.add_argument("--listen", default="127.0.0.1:8765", help="callback server address (default 127.0.0.1:8765)")
+    d.add_argument("--hub", help="WebSub hub (default $YOUTUBE_WEBSUB_HUB, else YouTube's hub)")
+    args = p.parse_args(argv)
+
+    conflicts = stand_in_conflicts()
+    if conflicts:
+        p.error(f"YOUTUBE_BASE_URL is a stand-in ({yhttp.BASE_URL}); point {' and '.join(conflicts)} outside {STATE_DIR}")
+
+    channels = load_config(args.config)
+    if args.channel:
+        by_name = {c.name: c for c in channels}
+        missing = [n for n in args.channel if n not in by_name]
+        if missing:
+            p.error(f"unknown channel(s): {', '.join(missing)}")
+        channels = [by_name[n] for n in args.channel]
+
+    if args.daemon:
+        import youtube_daemon
+
+        return youtube_daemon.run(channels, args)
+
+    labelled = len(channels) > 1
+    failed = printed = 0
+    for ch, blocks, err in sweep(channels, args.workers):
+        if err is not None:
+            print(f"{ch.name}: {err}", file=sys.stderr)
+            if blocks is None:
+                failed += 1
+                continue
+        for lines in blocks:
+            if printed:
+                print("")
+            if labelled:
+                print(f"CHANNEL={ch.name}")
+            printed += 1
+            print("\n".join(lines), flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,105 +6,196 @@ It avoids yt-dlp (which may trigger bot checks).
 
 Usage:
   youtube_public_captions.py <video_id> [preferred_langs_csv]
+  youtube_public_captions.py --batch [--langs CSV] [--workers N] [--per-host N] [ids...]
 
 Outputs caption text (no timestamps) to stdout.
 Exit 0 even if no captions; prints empty string.
+
+--batch takes video ids (or watch URLs) from the arguments, or from stdin
+(one per line) when none are given, fetches them concurrently with at most
+--per-host requests in flight per host, and prints one JSON line per video,
+in input order (duplicates once):
+  {"id": ..., "language": ..., "source": "watch-page", "text": ...}
+  {"id": ..., "error": ...}
+
+Results (including "no captions") are kept in the shared transcript cache, see
+youtube_transcript_cache.py; a page without a player response (consent or
+bot-check page) is not cached.
 """
 
-import html
+import argparse
+import codecs
 import json
 import re
 import sys
+import threading
+import time
 import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+import youtube_captions as captions
+import youtube_http as yhttp
+import youtube_transcript_cache as tcache
+
+
+# `var ytInitialPlayerResponse = {...};` -- the match ends at the opening brace.
+PLAYER_RESPONSE_RE = re.compile(r"ytInitialPlayerResponse\s*=\s*(?=\{)")
+# Older/embedded pages may only carry the track list itself.
+CAPTION_TRACKS_RE = re.compile(r'"captionTracks"\s*:\s*(?=\[)')
+# The player response object can only be complete once a "};" has arrived.
+_STATEMENT_END_RE = re.compile(r"\}\s*;")
+_decoder = json.JSONDecoder()
+
+
+class HostLimiter:
+    """Politeness limits per host: at most `per_host` requests in flight, and
+    request starts at least `min_interval` seconds apart."""
+
+    def __init__(self, per_host: int = 4, min_interval: float = 0.0) -> None:
+        self.per_host = max(1, per_host)
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._next = {}
+
+    @contextmanager
+    def slot(self, url: str):
+        host = urllib.parse.urlparse(url).netloc
+        with self._lock:
+            sem = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with sem:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next.get(host, 0.0))
+                self._next[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+# Set by --batch; single-video runs make two requests and need no limits.
+_limiter: Optional[HostLimiter] = None
+
+
+@contextmanager
+def _open(url: str, timeout: int):
+    client = yhttp.default_client()
+    if _limiter is None:
+        with client.stream(url, timeout=timeout) as r:
+            yield r
+        return
+    with _limiter.slot(url):
+        with client.stream(url, timeout=timeout) as r:
+            yield r
 
 
 def fetch(url: str, timeout: int = 25) -> str:
-    req = urllib.request.Request(
-        url,
-        headers={
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) OpenClawTranscriptBot/1.0"
-        },
-    )
-    with urllib.request.urlopen(req, timeout=timeout) as r:
+    with _open(url, timeout) as r:
         return r.read().decode("utf-8", errors="ignore")
 
 
-def extract_caption_tracks(watch_html: str):
-    # captionTracks appears inside ytInitialPlayerResponse JSON.
-    # We'll regex the JSON blob conservatively.
-    m = re.search(r"ytInitialPlayerResponse\s*=\s*(\{.*?\})\s*;\s*", watch_html, flags=re.DOTALL)
+def _decode_at(text: str, regex):
+    """The JSON value right after the first `regex` match, or None."""
+    m = regex.search(text)
     if not m:
-        # Sometimes it's inside a script tag as JSON in quotes.
-        m = re.search(r"\"captionTracks\"\s*:\s*\[(.*?)\]", watch_html, flags=re.DOTALL)
-        if not m:
-            return []
-        # Not enough context to parse reliably
-        return []
-
+        return None
     try:
-        data = json.loads(m.group(1))
-    except Exception:
-        return []
+        return _decoder.raw_decode(text, m.end())[0]
+    except ValueError:
+        return None
 
-    try:
-        tracks = (
-            data.get("captions", {})
-            .get("playerCaptionsTracklistRenderer", {})
-            .get("captionTracks", [])
-        )
-        return tracks or []
-    except Exception:
+
+def _tracks_of(player_response) -> list:
+    if not isinstance(player_response, dict):
         return []
+    tracks = (
+        (player_response.get("captions") or {})
+        .get("playerCaptionsTracklistRenderer", {})
+        .get("captionTracks", [])
+    )
+    return tracks if isinstance(tracks, list) else []
+
+
+def extract_caption_tracks(watch_html: str):
+    # captionTracks appears inside ytInitialPlayerResponse; decode exactly that
+    # one object starting at the assignment instead of guessing where it ends.
+    tracks = _tracks_of(_decode_at(watch_html, PLAYER_RESPONSE_RE))
+    if tracks:
+        return tracks
+    tracks = _decode_at(watch_html, CAPTION_TRACKS_RE)
+    return tracks if isinstance(tracks, list) else []
+
 
+def read_player_response(stream, chunk_size: int = 64 * 1024):
+    """Read a watch page until ytInitialPlayerResponse is complete.
 
-def download_track_text(track_url: str, timeout: int = 25) -> str:
-    # Request as JSON3 (more compact/easier).
+    Returns (player_response or None, text read so far). Reading stops as soon
+    as the object decodes, so the rest of the page is never downloaded; the
+    text is only the whole page when no player response was found.
+    """
+    dec = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    buf = ""
+    start = None
+    while True:
+        chunk = stream.read(chunk_size)
+        prev = len(buf)
+        buf += dec.decode(chunk, final=not chunk)
+        if start is None:
+            m = PLAYER_RESPONSE_RE.search(buf, max(0, prev - 64))
+            if m:
+                start = m.end()
+                prev = start
+        if start is not None and (not chunk or _STATEMENT_END_RE.search(buf, max(start, prev - 16))):
+            try:
+                return _decoder.raw_decode(buf, start)[0], buf
+            except ValueError:
+                pass  # that "};" was inside a string; wait for more
+        if not chunk:
+            return None, buf
+
+
+def fetch_caption_tracks(video_id: str, timeout: int = 25) -> Optional[list]:
+    """Caption tracks listed on the watch page; None when the page has no
+    player response at all (consent or bot-check page, truncated body)."""
+    with _open(yhttp.youtube_url(f"/watch?v={video_id}"), timeout) as r:
+        player_response, text = read_player_response(r)
+    if player_response is not None:
+        return _tracks_of(player_response)
+    tracks = _decode_at(text, CAPTION_TRACKS_RE)
+    return tracks if isinstance(tracks, list) else None
+
+
+def is_auto(track: dict) -> bool:
+    return track.get("kind") == "asr"
+
+
+def download_track_segments(track_url: str, timeout: int = 25, rolling: Optional[bool] = None) -> list:
+    """Timestamped segments of a caption track; auto-captions (`rolling`) de-duplicated."""
+    # Request as JSON3 (more compact/easier); an XML body is parsed too.
     parsed = urllib.parse.urlparse(track_url)
     q = dict(urllib.parse.parse_qsl(parsed.query))
     q["fmt"] = "json3"
     new_url = urllib.parse.urlunparse(parsed._replace(query=urllib.parse.urlencode(q)))
 
-    raw = fetch(new_url, timeout=timeout)
-    try:
-        data = json.loads(raw)
-    except Exception:
-        # fallback: xml timedtext
-        xml = raw
-        # strip tags
-        text = re.sub(r"<[^>]+>", " ", xml)
-        text = html.unescape(text)
-        text = re.sub(r"\s+", " ", text).strip()
-        return text
-
-    events = data.get("events", [])
-    parts = []
-    for ev in events:
-        for seg in ev.get("segs", []) or []:
-            t = seg.get("utf8")
-            if t:
-                parts.append(t.replace("\n", " "))
-    text = " ".join(parts)
-    text = html.unescape(text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    with _open(new_url, timeout) as r:
+        return list(captions.dedupe_if_rolling(captions.parse(r), rolling))
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("", end="")
-        return 0
+def download_track_text(track_url: str, timeout: int = 25, rolling: Optional[bool] = None) -> str:
+    return captions.to_text(download_track_segments(track_url, timeout, rolling), dedupe=False)
 
-    video_id = sys.argv[1].strip()
-    langs = ["pt", "pt-BR", "en", "en-US"]
-    if len(sys.argv) >= 3 and sys.argv[2].strip():
-        langs = [x.strip() for x in sys.argv[2].split(",") if x.strip()]
 
-    watch_html = fetch(f"https://www.youtube.com/watch?v={video_id}")
-    tracks = extract_caption_tracks(watch_html)
+DEFAULT_LANGS = ["pt", "pt-BR", "en", "en-US"]
+SOURCE = "watch-page"
+_VIDEO_ID_RE = re.compile(r"(?:v=|youtu\.be/|shorts/|^)([0-9A-Za-z_-]{11})(?:[&?#/]|$)")
+
+
+def best_track(tracks: list, langs) -> Optional[dict]:
+    """The track whose languageCode comes first in `langs` (else the first one); None if none has a URL."""
     if not tracks:
-        print("", end="")
-        return 0
+        return None
 
     # Choose best match by languageCode
     def score(tr):
@@ -115,15 +206,91 @@ def main():
         except ValueError:
             return 999
 
-    tracks_sorted = sorted(tracks, key=score)
-    best = tracks_sorted[0]
-    url = best.get("baseUrl")
-    if not url:
+    best = sorted(tracks, key=score)[0]
+    return best if best.get("baseUrl") else None
+
+
+def _track_text(tracks: Optional[list], langs) -> Tuple[str, Optional[str]]:
+    best = best_track(tracks or [], langs)
+    if best is None:
+        return "", None
+    return download_track_text(best["baseUrl"], rolling=is_auto(best)), best.get("languageCode")
+
+
+def captions_track(video_id: str, langs) -> Tuple[str, Optional[str]]:
+    """(text, languageCode) of the best caption track by `langs` preference; ("", None) if none."""
+    return _track_text(fetch_caption_tracks(video_id), langs)
+
+
+def cached_captions(cache: tcache.TranscriptCache, video_id: str, langs) -> Tuple[str, Optional[str]]:
+    """captions_track() read through the shared transcript cache.
+
+    A page without a player response says nothing about the video, so its
+    empty result is not cached.
+    """
+    key = ",".join(langs)
+    entry = cache.get_entry(video_id, key, SOURCE)
+    if entry is not None:
+        return entry["text"], entry.get("track_language")
+    tracks = fetch_caption_tracks(video_id)
+    text, lang = _track_text(tracks, langs)
+    if tracks is not None:
+        cache.put(video_id, key, SOURCE, text, track_language=lang)
+    return text, lang
+
+
+def _batch_record(cache: tcache.TranscriptCache, raw: str, langs) -> dict:
+    m = _VIDEO_ID_RE.search(raw)
+    if not m:
+        return {"id": raw, "error": "invalid video id"}
+    video_id = m.group(1)
+    try:
+        text, lang = cached_captions(cache, video_id, langs)
+    except Exception as e:  # noqa: BLE001 (reported per video)
+        return {"id": video_id, "error": f"{type(e).__name__}: {e}"}
+    return {"id": video_id, "language": lang, "source": SOURCE, "text": text}
+
+
+def batch_main(argv) -> int:
+    global _limiter
+    p = argparse.ArgumentParser(prog="youtube_public_captions.py --batch")
+    p.add_argument("ids", nargs="*", help="video ids or watch URLs (default: stdin, one per line)")
+    p.add_argument("--langs", default=",".join(DEFAULT_LANGS))
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--per-host", type=int, default=4, help="concurrent requests per host")
+    p.add_argument("--interval", type=float, default=0.05, help="min seconds between request starts per host")
+    args = p.parse_args(argv)
+
+    langs = [x.strip() for x in args.langs.split(",") if x.strip()]
+    ids = args.ids if args.ids and args.ids != ["-"] else (line.strip() for line in sys.stdin)
+    ids = [x for x in ids if x and not x.startswith("#")]
+    _limiter = HostLimiter(args.per_host, args.interval)
+    cache = tcache.TranscriptCache()
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        # map() yields in input order, each line as soon as it and all before it are done.
+        for rec in pool.map(lambda raw: _batch_record(cache, raw, langs), dict.fromkeys(ids)):
+            failed += "error" in rec
+            sys.stdout.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+    return 1 if failed else 0
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == "--batch":
+        return batch_main(sys.argv[2:])
+    if len(sys.argv) < 2:
         print("", end="")
         return 0
 
-    text = download_track_text(url)
-    print(text, end="")
+    video_id = sys.argv[1].strip()
+    langs = list(DEFAULT_LANGS)
+    if len(sys.argv) >= 3 and sys.argv[2].strip():
+        langs = [x.strip() for x in sys.argv[2].split(",") if x.strip()]
+
+    text, _ = cached_captions(tcache.TranscriptCache(), video_id, langs)
+    print(text or "", end="")
     return 0
 
 
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Shared state store for the YouTube monitors.
+
+One JSON document per deployment (state/youtube_state.json, or
+$YOUTUBE_STATE_PATH) holds a record per channel and the handle -> channel id
+cache:
+
+  {"version": 1,
+   "channels": {"<name>": {"video_id": ..., "seen": [...], "feed": {...}, ...}},
+   "channel_ids": {"@handle": {"channel_id": "UC...", "resolved_unix": ...}}}
+
+Every write is a read-modify-write of one record under an exclusive fcntl lock
+on <path>.lock, followed by an atomic replace, so runs never drop each other's
+updates. Reads need no lock; the parsed document is reused until the file
+changes.
+
+Polls are single-flight per channel: claim(name) takes a non-blocking flock on
+<path>.locks/<name>.lock for the length of the poll, and raises Busy when
+another run (another process, or a thread of this one) holds it. While a poll
+works on new videos, mark() leaves an "in_progress" marker (pid, host, since,
+videos) in the channel record, which Busy reports. The kernel drops the lock
+when a process dies, so a marker without a lock is a crashed run; the next
+claim clears it and the videos are processed again (they were never marked
+seen).
+
+Records missing from the store are imported from the legacy files -- a
+channel's "state" file (state/<name>_last_video.json) and
+state/youtube_channel_ids.json -- on first read. The old files are left as
+they are.
+"""
+
+import fcntl
+import itertools
+import json
+import os
+import re
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Tuple
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+STATE_PATH = os.environ.get("YOUTUBE_STATE_PATH") or os.path.join(ROOT, "state", "youtube_state.json")
+VERSION = 1
+
+_NAME_RE = re.compile(r"[^0-9A-Za-z_.@-]")
+
+
+class Busy(Exception):
+    """Another run is polling this channel."""
+
+    def __init__(self, name: str, marker: Optional[dict]) -> None:
+        self.name = name
+        self.marker = marker
+        what = "poll already in progress"
+        if marker:
+            since = time.strftime("%H:%M:%S", time.localtime(marker.get("since") or 0))
+            what += f" (pid {marker.get('pid')} on {marker.get('host')} since {since}"
+            videos = marker.get("videos") or []
+            what += f", {len(videos)} new video(s))" if videos else ")"
+        super().__init__(what)
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        s = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (s.st_ino, s.st_size, s.st_mtime_ns)
+
+
+def _load_json(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+class StateStore:
+    def __init__(self, path: str = STATE_PATH) -> None:
+        self.path = path
+        self.lock_dir = path + ".locks"
+        self._tmp_seq = itertools.count()
+        self._cache_lock = threading.Lock()
+        self._cached: Tuple[Optional[tuple], dict] = (None, {})
+
+    # Document
+
+    def _load(self) -> dict:
+        doc = _load_json(self.path)
+        doc.setdefault("version", VERSION)
+        return doc
+
+    def _read(self) -> dict:
+        """The current document, shared: do not modify it."""
+        stamp = _stamp(self.path)
+        with self._cache_lock:
+            if stamp is not None and stamp == self._cached[0]:
+                return self._cached[1]
+        doc = self._load()
+        with self._cache_lock:
+            self._cached = (stamp, doc)
+        return doc
+
+    def _write(self, doc: dict) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{next(self._tmp_seq)}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps(doc, ensure_ascii=False, separators=(",", ":")))
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    @contextmanager
+    def _locked(self) -> Iterator[dict]:
+        """The current document, held under the store lock; written back on exit."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".lock", "a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                doc = self._load()
+                yield doc
+                self._write(doc)
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+    # Records
+
+    def get(self, section: str, key: str, legacy: Optional[str] = None, legacy_key: Optional[str] = None) -> dict:
+        """A copy of one record ({} if none).
+
+        A record missing from the store is imported from the JSON file `legacy`
+        (its `legacy_key` entry when given, else the whole file) and saved.
+        """
+        rec = self._read().get(section, {}).get(key)
+        if rec is not None or not legacy:
+            return dict(rec or {})
+        old = _load_json(legacy)
+        old = old.get(legacy_key) if legacy_key else old
+        if not isinstance(old, dict) or not old:
+            return {}
+        with self._locked() as doc:
+            rec = doc.setdefault(section, {}).setdefault(key, old)
+        return dict(rec)
+
+    def put(self, section: str, key: str, record: dict) -> None:
+        with self._locked() as doc:
+            doc.setdefault(section, {})[key] = record
+
+    def update(self, section: str, key: str, fn: Callable[[dict], None]) -> dict:
+        """Apply `fn` to a record in place, under the store lock; returns the result."""
+        with self._locked() as doc:
+            rec = doc.setdefault(section, {}).setdefault(key, {})
+            fn(rec)
+        return dict(rec)
+
+    # Single-flight polls
+
+    def _channel(self, name: str) -> dict:
+        return self._read().get("channels", {}).get(name) or {}
+
+    @contextmanager
+    def claim(self, name: str) -> Iterator[None]:
+        """Hold the channel's poll lock, or raise Busy."""
+        os.makedirs(self.lock_dir, exist_ok=True)
+        with open(os.path.join(self.lock_dir, _NAME_RE.sub("_", name) + ".lock"), "a") as lf:
+            try:
+                fcntl.flock(lf, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise Busy(name, self._channel(name).get("in_progress")) from None
+            try:
+                if "in_progress" in self._channel(name):
+                    self.clear(name)  # left by a run that died
+                yield
+            finally:
+                try:
+                    if "in_progress" in self._channel(name):
+                        self.clear(name)
+                finally:
+                    fcntl.flock(lf, fcntl.LOCK_UN)
+
+    def mark(self, name: str, videos) -> None:
+        """Record that this run is working on `videos` of a claimed channel."""
+        marker = {"pid": os.getpid(), "host": socket.gethostname(), "since": int(time.time()), "videos": list(videos)}
+        self.update("channels", name, lambda rec: rec.__setitem__("in_progress", marker))
+
+    def clear(self, name: str) -> None:
+        self.update("channels", name, lambda rec: rec.pop("in_progress", None))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""On-disk transcript cache shared by the YouTube scripts.
+
+Entries are keyed by (video_id, language, source) -- `language` is whatever
+identifies the request (e.g. the preference list "pt,pt-BR,en"), `source` the
+way the text was obtained ("api", "yt-dlp", "watch-page", ...). Each entry is a
+gzipped JSON file named after the sha256 of its key, under
+state/transcripts/<2 hex>/.
+
+An empty text is a negative entry ("this video has no captions here"); it
+expires after a much shorter TTL, since captions often show up hours after an
+upload. The cache is bounded by total size: hits refresh the file mtime and the
+least recently used files are deleted first.
+
+Config:
+  YOUTUBE_TRANSCRIPT_CACHE_DIR        default state/transcripts
+  YOUTUBE_TRANSCRIPT_CACHE_MB         size bound (default 200)
+  YOUTUBE_TRANSCRIPT_TTL_DAYS         positive entries (default 30)
+  YOUTUBE_TRANSCRIPT_NEGATIVE_TTL     negative entries, seconds (default 21600)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+CACHE_DIR = os.environ.get("YOUTUBE_TRANSCRIPT_CACHE_DIR") or os.path.join(
+    os.path.dirname(__file__), "..", "state", "transcripts"
+)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+class TranscriptCache:
+    def __init__(
+        self,
+        root: str = CACHE_DIR,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes if max_bytes is not None else int(_env_float("YOUTUBE_TRANSCRIPT_CACHE_MB", 200) * 1024 * 1024)
+        self.ttl = ttl if ttl is not None else _env_float("YOUTUBE_TRANSCRIPT_TTL_DAYS", 30) * 86400
+        self.negative_ttl = negative_ttl if negative_ttl is not None else _env_float("YOUTUBE_TRANSCRIPT_NEGATIVE_TTL", 6 * 3600)
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # running total, scanned on first put
+
+    def _path(self, video_id: str, language: str, source: str) -> str:
+        digest = hashlib.sha256(f"{video_id}\0{language}\0{source}".encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], digest + ".json.gz")
+
+    def get_entry(self, video_id: str, language: str, source: str) -> Optional[dict]:
+        """The entry (text -- "" = known to have none --, at, and any extras
+        given to put), or None on a miss or expired entry."""
+        path = self._path(video_id, language, source)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, OSError, ValueError, EOFError):
+            return None
+        text = entry["text"] = entry.get("text") or ""
+        ttl = self.ttl if text else self.negative_ttl
+        if time.time() - float(entry.get("at") or 0) > ttl:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, video_id: str, language: str, source: str, text: str, **extra) -> None:
+        path = self._path(video_id, language, source)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {**extra, "video_id": video_id, "language": language, "source": source, "text": text, "at": int(time.time())}
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        size = os.path.getsize(tmp)
+        try:
+            size -= os.path.getsize(path)  # overwriting an entry
+        except FileNotFoundError:
+            pass
+        os.replace(tmp, path)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _files(self):
+        try:
+            shards = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            for e in os.scandir(shard.path):
+                if e.name.endswith(".json.gz"):
+                    try:
+                        st = e.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield e.path, st.st_size, st.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._files())
+
+    def _evict(self) -> None:
+        # Down to 90% so a full cache does not rescan on every put.
+        files = sorted(self._files(), key=lambda x: x[2])
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_bytes * 0.9)
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
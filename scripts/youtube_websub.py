@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""WebSub (PubSubHubbub) push for YouTube channel feeds.
+
+YouTube publishes every channel feed through a hub: a subscriber registers a
+callback URL for a topic, the hub verifies it (GET with hub.challenge) and then
+POSTs the Atom entry of each new or updated video to the callback.
+
+  Subscriber   callback HTTP server + subscribe/unsubscribe requests; verifies
+               X-Hub-Signature (HMAC with a per-topic secret) and calls
+               on_notify(topic, entries) for each accepted notification
+  LocalHub     a minimal hub stand-in (subscribe with intent verification,
+               publish, signed fan-out) so the push path can be exercised
+               without YouTube
+
+Usage:
+  youtube_websub.py hub [--listen HOST:PORT]
+  youtube_websub.py publish --hub URL --topic URL [FILE]   # FILE: Atom body (default: hub fetches the topic)
+
+Config:
+  YOUTUBE_WEBSUB_HUB   hub to subscribe at (default Google's public hub)
+"""
+
+import argparse
+import hashlib
+import hmac
+import io
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+import urllib.parse
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+import youtube_http as yhttp
+
+HUB_URL = os.environ.get("YOUTUBE_WEBSUB_HUB") or "https://pubsubhubbub.appspot.com/subscribe"
+LEASE_SECONDS = 5 * 86400
+
+NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "yt": "http://www.youtube.com/xml/schemas/2015",
+}
+
+
+def topic_url(channel_id: str) -> str:
+    return f"https://www.youtube.com/xml/feeds/videos.xml?channel_id={channel_id}"
+
+
+def parse_listen(value: str) -> Tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def parse_notification(body: bytes) -> List[dict]:
+    """Video entries of a push body; deleted-entry tombstones are skipped."""
+    entries = []
+    for _, el in ET.iterparse(io.BytesIO(body), events=("end",)):
+        if el.tag != "{%s}entry" % NS["atom"]:
+            continue
+        vid = el.findtext("yt:videoId", default="", namespaces=NS).strip()
+        if vid:
+            link_el = el.find("atom:link", NS)
+            entries.append({
+                "video_id": vid,
+                "channel_id": el.findtext("yt:channelId", default="", namespaces=NS).strip(),
+                "title": el.findtext("atom:title", default="", namespaces=NS).strip(),
+                "link": link_el.get("href") if link_el is not None else f"https://www.youtube.com/watch?v={vid}",
+                "published": el.findtext("atom:published", default="", namespaces=NS).strip(),
+            })
+        el.clear()
+    return entries
+
+
+def sign(secret: str, body: bytes) -> str:
+    return "sha1=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha1).hexdigest()
+
+
+def _link_self(header: Optional[str]) -> Optional[str]:
+    for part in (header or "").split(","):
+        url, _, params = part.partition(";")
+        if 'rel="self"' in params.replace(" ", "") or "rel=self" in params.replace(" ", ""):
+            return url.strip().strip("<>")
+    return None
+
+
+def _post_form(url: str, form: dict, timeout: float = 15) -> yhttp.Response:
+    body = urllib.parse.urlencode(form).encode("ascii")
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    return yhttp.default_client().request("POST", url, headers=headers, body=body, timeout=timeout)
+
+
+class Subscriber:
+    """Callback endpoint plus the topics it wants.
+
+    A topic is "wanted" from subscribe() until unsubscribe(); the hub's
+    verification GET is only confirmed for wanted topics, and its lease is
+    recorded so callers can renew (see expires / on_verified).
+    """
+
+    def __init__(
+        self,
+        callback_url: str,
+        listen: Tuple[str, int],
+        hub: str = HUB_URL,
+        on_notify: Optional[Callable[[str, List[dict]], None]] = None,
+        on_verified: Optional[Callable[[str, int], None]] = None,
+    ) -> None:
+        self.callback_url = callback_url
+        self.hub = hub
+        self.on_notify = on_notify
+        self.on_verified = on_verified
+        self._lock = threading.Lock()
+        self._topics: Dict[str, dict] = {}  # topic -> {"secret", "expires"}
+        self._server = ThreadingHTTPServer(listen, self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="websub-callback", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def subscribe(self, topic: str, lease_seconds: int = LEASE_SECONDS) -> None:
+        """Ask the hub for `topic`; raises yhttp.HTTPError if the hub refuses."""
+        with self._lock:
+            sub = self._topics.setdefault(topic, {"secret": secrets.token_hex(16), "expires": 0})
+        _post_form(self.hub, {
+            "hub.mode": "subscribe",
+            "hub.topic": topic,
+            "hub.callback": self.callback_url,
+            "hub.verify": "async",
+            "hub.secret": sub["secret"],
+            "hub.lease_seconds": str(lease_seconds),
+        })
+
+    def unsubscribe(self, topic: str) -> None:
+        with self._lock:
+            self._topics.pop(topic, None)
+        _post_form(self.hub, {"hub.mode": "unsubscribe", "hub.topic": topic, "hub.callback": self.callback_url})
+
+    def expires(self, topic: str) -> float:
+        """Unix time the verified lease for `topic` runs out (0: not verified)."""
+        with self._lock:
+            return float((self._topics.get(topic) or {}).get("expires") or 0)
+
+    # Callback requests
+
+    def _verify(self, q: dict) -> Optional[str]:
+        mode, topic, challenge = q.get("hub.mode"), q.get("hub.topic"), q.get("hub.challenge")
+        if not topic or challenge is None:
+            return None
+        with self._lock:
+            sub = self._topics.get(topic)
+            if mode == "subscribe" and sub is not None:
+                lease = int(q.get("hub.lease_seconds") or LEASE_SECONDS)
+                sub["expires"] = time.time() + lease
+            elif mode == "unsubscribe" and sub is None:
+                lease = 0
+            else:
+                return None
+        if mode == "subscribe" and self.on_verified is not None:
+            self.on_verified(topic, lease)
+        return challenge
+
+    def _notify(self, topic: Optional[str], signature: Optional[str], body: bytes) -> None:
+        with self._lock:
+            sub = self._topics.get(topic or "")
+        if sub is None:
+            return
+        if not signature or not hmac.compare_digest(signature, sign(sub["secret"], body)):
+            print(f"[websub] dropped notification with a bad signature for {topic}", file=sys.stderr)
+            return
+        try:
+            entries = parse_notification(body)
+        except ET.ParseError:
+            return
+        if entries and self.on_notify is not None:
+            self.on_notify(topic, entries)
+
+    def _handler(self):
+        sub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *a):
+                pass
+
+            def _reply(self, code: int, body: bytes = b"") -> None:
+                self.send_response(code)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                q = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+                challenge = sub._verify(q)
+                if challenge is None:
+                    self._reply(404)
+                else:
+                    self._reply(200, challenge.encode("utf-8"))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                # Always 2xx, even for a bad signature (WebSub 8): the hub must not retry.
+                self._reply(204)
+                topic = _link_self(self.headers.get("Link"))
+                sub._notify(topic, self.headers.get("X-Hub-Signature"), body)
+
+        return Handler
+
+
+class LocalHub:
+    """Hub stand-in: POST / (subscribe, unsubscribe, publish), GET /subscriptions.
+
+    publish with hub.url fetches that topic and delivers it; a POST to
+    /publish?hub.topic=... with an Atom body delivers that body as is.
+    """
+
+    def __init__(self, listen: Tuple[str, int] = ("127.0.0.1", 0)) -> None:
+        self._lock = threading.Lock()
+        self.subscriptions: Dict[Tuple[str, str], dict] = {}  # (topic, callback) -> {"secret", "expires"}
+        self._server = ThreadingHTTPServer(listen, self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> None:
+        threading.Thread(target=self._server.serve_forever, name="websub-hub", daemon=True).start()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _verify_intent(self, form: dict) -> None:
+        mode, topic, callback = form["hub.mode"], form["hub.topic"], form["hub.callback"]
+        lease = int(form.get("hub.lease_seconds") or LEASE_SECONDS)
+        challenge = secrets.token_urlsafe(16)
+        q = {"hub.mode": mode, "hub.topic": topic, "hub.challenge": challenge}
+        if mode == "subscribe":
+            q["hub.lease_seconds"] = str(lease)
+        sep = "&" if urllib.parse.urlsplit(callback).query else "?"
+        try:
+            ok = yhttp.default_client().get(callback + sep + urllib.parse.urlencode(q)).text() == challenge
+        except (OSError, yhttp.HTTPError):
+            ok = False
+        if not ok:
+            return
+        with self._lock:
+            if mode == "subscribe":
+                self.subscriptions[(topic, callback)] = {"secret": form.get("hub.secret"), "expires": time.time() + lease}
+            else:
+                self.subscriptions.pop((topic, callback), None)
+
+    def publish(self, topic: str, body: bytes) -> int:
+        """Deliver `body` to every live subscriber of `topic`; returns how many took it."""
+        now = time.time()
+        with self._lock:
+            targets = [(cb, s["secret"]) for (t, cb), s in self.subscriptions.items() if t == topic and s["expires"] > now]
+        delivered = 0
+        for callback, secret in targets:
+            headers = {
+                "Content-Type": "application/atom+xml",
+                "Link": f'<{self.url}>; rel="hub", <{topic}>; rel="self"',
+            }
+            if secret:
+                headers["X-Hub-Signature"] = sign(secret, body)
+            try:
+                yhttp.default_client().request("POST", callback, headers=headers, body=body)
+                delivered += 1
+            except (OSError, yhttp.HTTPError):
+                pass
+        return delivered
+
+    def _handler(self):
+        hub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *a):
+                pass
+
+            def _reply(self, code: int, body: bytes = b"", ctype: str = "text/plain") -> None:
+                self.send_response(code)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if urllib.parse.urlsplit(self.path).path != "/subscriptions":
+                    self._reply(404)
+                    return
+                with hub._lock:
+                    subs = [{"topic": t, "callback": cb, "expires": int(s["expires"])} for (t, cb), s in hub.subscriptions.items()]
+                self._reply(200, json.dumps(subs).encode("utf-8"), "application/json")
+
+            def do_POST(self):
+                parts = urllib.parse.urlsplit(self.path)
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if parts.path == "/publish":
+                    topic = dict(urllib.parse.parse_qsl(parts.query)).get("hub.topic")
+                    if not topic:
+                        self._reply(400, b"hub.topic required")
+                        return
+                    self._reply(200, str(hub.publish(topic, body)).encode("ascii"))
+                    return
+                form = dict(urllib.parse.parse_qsl(body.decode("utf-8", errors="ignore")))
+                mode = form.get("hub.mode")
+                if mode in ("subscribe", "unsubscribe") and form.get("hub.topic") and form.get("hub.callback"):
+                    self._reply(202)
+                    threading.Thread(target=hub._verify_intent, args=(form,), daemon=True).start()
+                elif mode == "publish" and form.get("hub.url"):
+                    topic = form["hub.url"]
+                    self._reply(204)
+                    threading.Thread(target=lambda: hub.publish(topic, yhttp.default_client().get(topic).body), daemon=True).start()
+                else:
+                    self._reply(400, b"bad hub.mode / hub.topic / hub.callback")
+
+        return Handler
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="youtube_websub.py")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    h = sub.add_parser("hub", help="run the local hub stand-in")
+    h.add_argument("--listen", default="127.0.0.1:8081")
+    pub = sub.add_parser("publish", help="push a notification through a hub")
+    pub.add_argument("--hub", required=True)
+    pub.add_argument("--topic", required=True)
+    pub.add_argument("file", nargs="?", help="Atom body to deliver (default: the hub fetches the topic)")
+    args = p.parse_args(argv)
+
+    if args.cmd == "hub":
+        hub = LocalHub(parse_listen(args.listen))
+        print(f"hub listening on {hub.url}", file=sys.stderr)
+        try:
+            hub.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            body = f.read()
+        url = urllib.parse.urljoin(args.hub, "/publish?" + urllib.parse.urlencode({"hub.topic": args.topic}))
+        r = yhttp.default_client().request("POST", url, headers={"Content-Type": "application/atom+xml"}, body=body)
+        print(f"delivered to {r.text()} subscriber(s)")
+    else:
+        _post_form(args.hub, {"hub.mode": "publish", "hub.url": args.topic})
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -10,11 +10,18 @@ This is intentionally minimal. Add auth/rate limits before going truly public.
 
 from __future__ import annotations
 
+import asyncio
+import itertools
+import json
+import logging
 import os
+import threading
 import time
-from typing import Any, Dict, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
 
 # Reuse the CLI state machine implementation.
@@ -23,8 +30,166 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scripts"))
 
 import clawmarket as cm  # type: ignore
+import clawmarket_expiry as expiry  # type: ignore
+import clawmarket_profile as prof  # type: ignore
+import clawmarket_views as views  # type: ignore
 
-app = FastAPI(title="ClawMarket API", version="0.1.0")
+# All handlers are async and run on the event loop: they read and mutate one
+# resident state in memory, and every disk write goes through a single writer
+# task (cm._save only marks the state dirty). A mutating handler awaits
+# _flushed() so "ok" still means "on disk". POST requests run under
+# _writer.exclusive(), the state lock shared with the CLI, so a change made by
+# the CLI is loaded before the handler sees the state.
+_writer: Optional[cm.store.AsyncWriter] = None
+_maintenance_task: Optional[asyncio.Task] = None
+_ready = asyncio.Event()
+_warm_info: Dict[str, Any] = {}
+
+_expiry = expiry.ExpiryIndex()
+_views = views.ViewCache()
+MAINTENANCE_SECONDS = float(os.environ.get("CLAWMARKET_MAINTENANCE_SECONDS") or 60)
+
+log = logging.getLogger("clawmarket")
+
+# Statuses worth having parsed before the first request: what workers browse
+# and what the nudge job scans.
+HOT_STATUSES = ("open", "awarded")
+
+
+def _adopt(st: Dict[str, Any]) -> None:
+    cm.use_resident_state(st, _writer.mark_dirty)  # type: ignore[union-attr]
+    _expiry.rebuild(st, cm._parse_deadline)  # noqa: SLF001
+
+
+async def _maintenance() -> None:
+    """Background job: expire overdue tasks and archive old expired ones.
+
+    Only due heap entries are touched; a bounded batch per pass keeps the loop
+    responsive when a large backlog becomes due at once. A failed pass is
+    logged and the next one waits longer (up to 16 periods).
+    """
+    failures = 0
+    while True:
+        await asyncio.sleep(MAINTENANCE_SECONDS * min(2**failures, 16))
+        try:
+            await _maintain_once()
+            failures = 0
+        except Exception:  # noqa: BLE001 (retried next pass)
+            failures += 1
+            log.exception("maintenance: pass failed (%d in a row)", failures)
+
+
+async def _maintain_once() -> None:
+    while True:
+        async with _writer.exclusive():  # type: ignore[union-attr]
+            st = _state()
+            res = _expiry.run_due(st, budget=500)
+            if not (res["expired"] or res["overdue"] or res["removed"]):
+                return
+            if res["removed"]:
+                await asyncio.to_thread(expiry.append_archive, cm.STATE_PATH, res["removed"], _expiry.mode)
+            _save(st)
+            await _flushed()
+
+
+async def _warm_up(fresh: bool) -> None:
+    t0 = time.perf_counter()
+    tasks = _state().get("tasks", {})
+    warm = getattr(tasks, "warm", None)
+    hot = await asyncio.to_thread(warm, HOT_STATUSES) if warm else len(tasks)
+    if not fresh and os.path.exists(cm.STATE_PATH):
+        # Older layout or stale index: rewrite once so the next start is lazy.
+        async with _writer.exclusive():  # type: ignore[union-attr]
+            _writer.mark_dirty()  # type: ignore[union-attr]
+            await _flushed()
+    _warm_info.update({"hotTasks": hot, "indexed": fresh, "seconds": round(time.perf_counter() - t0, 3)})
+    _ready.set()
+
+
+@asynccontextmanager
+async def _lifespan(_: FastAPI):
+    global _writer, _maintenance_task
+    fresh = await asyncio.to_thread(cm.store.index_is_fresh, cm.STATE_PATH)
+    st = await asyncio.to_thread(cm.store.load_state, cm.STATE_PATH, True) or cm._empty_state()  # noqa: SLF001
+    stamp = await asyncio.to_thread(cm.store.file_stamp, cm.STATE_PATH)
+    _writer = cm.store.AsyncWriter(cm.STATE_PATH, st, stamp, on_reload=_adopt)
+    _adopt(st)
+    _writer.start()
+    warm = asyncio.create_task(_warm_up(fresh))
+    _maintenance_task = asyncio.create_task(_maintenance())
+    try:
+        yield
+    finally:
+        warm.cancel()
+        _maintenance_task.cancel()
+        await _writer.close()
+
+
+app = FastAPI(title="ClawMarket API", version="0.1.0", lifespan=_lifespan)
+
+
+class _ProfileRequests:
+    """Profiles sampled requests (see clawmarket_profile.py).
+
+    A plain ASGI middleware rather than @app.middleware, so the handler runs in
+    the request's own task and the session can be tied to it: the loop thread
+    is shared by every request in flight.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        session = prof.maybe_start(
+            f"{scope['method']} {scope['path']}", threads={threading.get_ident()}, task=asyncio.current_task()
+        )
+        if session is None:
+            return await self.app(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await asyncio.to_thread(prof.finish, session)
+
+
+# POST routes that read-modify-write the state; a new one must be added here
+# (tests/test_clawmarket_api.py checks every POST route is accounted for).
+STATE_WRITES = frozenset({
+    "/users/register",
+    "/users/availability",
+    "/tasks",
+    "/tasks/bulk",
+    "/tasks/propose",
+    "/tasks/accept",
+    "/tasks/award",
+    "/tasks/update",
+    "/tasks/submit",
+    "/tasks/approve",
+    "/admin/mark-nudged",
+})
+
+
+class _SerializeWrites:
+    """Runs state-mutating requests (STATE_WRITES) under the state lock (see _writer.exclusive)."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in STATE_WRITES
+            or _writer is None
+        ):
+            return await self.app(scope, receive, send)
+        async with _writer.exclusive():
+            await self.app(scope, receive, send)
+
+
+app.add_middleware(_SerializeWrites)
+app.add_middleware(_ProfileRequests)
 
 
 class RegisterIn(BaseModel):
@@ -91,12 +256,68 @@ def _save(st: Dict[str, Any]) -> None:
     cm._save(st)  # noqa: SLF001
 
 
+async def _flushed() -> None:
+    if _writer is not None:
+        await _writer.flushed()
+
+
+NDJSON = "application/x-ndjson"
+
+
+# Page size of the list endpoints, in JSON and NDJSON alike.
+DEFAULT_LIMIT = 50
+
+
+def _wants_ndjson(request: Request) -> bool:
+    return NDJSON in request.headers.get("accept", "")
+
+
+async def _ndjson_lines(records: Iterable[Any], batch: int = 256) -> AsyncIterator[bytes]:
+    # The first record goes out on its own so clients see a byte immediately;
+    # after that, lines are grouped to keep per-chunk overhead low. Records are
+    # read on the loop (the state is only touched there), and other requests run
+    # between chunks, so callers pass a snapshot (a list, or an iterator over
+    # keys listed up front) rather than a walk over live state. Records may be
+    # dicts or pre-encoded bytes.
+    buf = []
+    first = True
+    for r in records:
+        buf.append(r if isinstance(r, bytes) else json.dumps(r, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        if first or len(buf) >= batch:
+            yield b"\n".join(buf) + b"\n"
+            buf = []
+            first = False
+    if buf:
+        yield b"\n".join(buf) + b"\n"
+
+
+def _ndjson(records: Iterable[Any]) -> StreamingResponse:
+    return StreamingResponse(_ndjson_lines(records), media_type=NDJSON)
+
+
+def _json_bytes(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until the state is loaded and open/awarded tasks are warm,
+    and again if the writer or maintenance task has stopped."""
+    if not _ready.is_set():
+        raise HTTPException(status_code=503, detail="warming_up")
+    if _writer is None or not _writer.alive:
+        raise HTTPException(status_code=503, detail="writer_stopped")
+    if _maintenance_task is None or _maintenance_task.done():
+        raise HTTPException(status_code=503, detail="maintenance_stopped")
+    return {"ok": True, "ready": True, **_warm_info}
+
+
 @app.get("/status")
-def status():
+async def status():
     st = _state()
     users = st.get("users", {})
     tasks = st.get("tasks", {})
-    open_tasks = sum(1 for t in tasks.values() if t.get("status") == "open")
+    open_tasks = sum(1 for _ in cm.store.iter_task_ids(tasks, ("open",)))
     return {
         "ok": True,
         "time": int(time.time()),
@@ -109,16 +330,18 @@ def status():
 
 
 @app.post("/users/register")
-def register(inp: RegisterIn):
+async def register(inp: RegisterIn):
     class A:  # argparse-like
         phone = inp.phone
         role = inp.role
 
-    return cm.register_cmd(A())
+    out = cm.register_cmd(A())
+    await _flushed()
+    return out
 
 
 @app.post("/users/availability")
-def set_availability(inp: AvailabilityIn):
+async def set_availability(inp: AvailabilityIn):
     st = _state()
     phone = cm._norm_phone(inp.phone)  # noqa
 
@@ -138,31 +361,46 @@ def set_availability(inp: AvailabilityIn):
     u["updatedAt"] = int(time.time())
     st["users"][phone] = u
     _save(st)
+    await _flushed()
     return {"ok": True, "user": u}
 
 
 @app.get("/tasks/open")
-def open_tasks(limit: int = 50, viewer: Optional[str] = None):
-    out = cm.open_tasks_cmd(None)  # type: ignore
-    tasks = out.get("tasks", [])
+async def open_tasks(
+    request: Request,
+    limit: Optional[int] = None,
+    viewer: Optional[str] = None,
+    view: str = Query(default="full", pattern="^(full|summary)$"),
+):
+    """List open tasks, most recent first, at most `limit` (default 50).
+
+    With `Accept: application/x-ndjson` the tasks are streamed one per line.
+    `view=summary` returns small listing cards instead of full tasks.
+    """
+    st = _state()
+    tasks = st.get("tasks", {})
+    # Do not show the viewer their own requested tasks when browsing as a worker.
+    v = cm._norm_phone(viewer) if viewer else None  # noqa
+    ids = (t["id"] for t in cm.iter_open_tasks(st, viewer=v))
+    ids = list(itertools.islice(ids, DEFAULT_LIMIT if limit is None else limit))
 
-    if viewer:
-        v = cm._norm_phone(viewer)  # noqa
-        # Do not show the viewer their own requested tasks when browsing as a worker.
-        tasks = [t for t in tasks if t.get("requester") != v]
+    if _wants_ndjson(request):
+        # Encoded up front: the stream must not read tasks a later request changed.
+        return _ndjson([b for b in (_views.get(tasks, tid, view) for tid in ids) if b is not None])
 
-    return {"ok": True, "tasks": tasks[:limit]}
+    return _json_bytes(b'{"ok":true,"tasks":' + _views.join(tasks, ids, view) + b"}")
 
 
 @app.get("/tasks/{task_id}")
-def get_task(task_id: str, viewer: Optional[str] = None):
+async def get_task(task_id: str, viewer: Optional[str] = None):
     """Return a task.
 
     Privacy: if `viewer` is provided and is not the requester or the awarded worker,
     redact private fields once the task is awarded.
     """
     st = _state()
-    t = st.get("tasks", {}).get(task_id)
+    tasks = st.get("tasks", {})
+    t = tasks.get(task_id)
     if not t:
         raise HTTPException(status_code=404, detail="task_not_found")
 
@@ -171,16 +409,14 @@ def get_task(task_id: str, viewer: Optional[str] = None):
         is_requester = v == t.get("requester")
         is_awarded = v == t.get("awardedTo")
         if t.get("status") in ("awarded", "submitted", "approved") and not (is_requester or is_awarded):
-            redacted = dict(t)
-            for k in ("requester", "awardedTo", "submission", "updates", "proposals", "acceptedBy"):
-                redacted.pop(k, None)
-            return {"ok": True, "task": redacted, "redacted": True}
+            body = _views.get(tasks, task_id, "redacted")
+            return _json_bytes(b'{"ok":true,"task":' + body + b',"redacted":true}')  # type: ignore[operator]
 
-    return {"ok": True, "task": t}
+    return _json_bytes(b'{"ok":true,"task":' + _views.get(tasks, task_id) + b"}")  # type: ignore[operator]
 
 
 @app.post("/tasks")
-def create_task(inp: CreateTaskIn):
+async def create_task(inp: CreateTaskIn):
     class A:
         requester = inp.requester
         title = inp.title
@@ -189,11 +425,78 @@ def create_task(inp: CreateTaskIn):
         category = inp.category
         deadline = inp.deadline
 
-    return cm.create_task_cmd(A())
+    out = cm.create_task_cmd(A())
+    _expiry.track(out["task"])
+    await _flushed()
+    return out
+
+
+BULK_CHUNK = 1000
+
+
+async def _body_lines(request: Request) -> AsyncIterator[Any]:
+    """Parse an NDJSON request body line by line as it arrives: (line number, record|None)."""
+    buf = b""
+    n = 0
+    async for piece in request.stream():
+        buf += piece
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            n += 1
+            if line.strip():
+                yield n, _parse_line(line)
+    if buf.strip():
+        yield n + 1, _parse_line(buf)
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+@app.post("/tasks/bulk")
+async def create_tasks_bulk(request: Request, chunk: int = BULK_CHUNK):
+    """Create many tasks from an NDJSON body, one create-task object per line.
+
+    Records are validated as they stream in; ids are allocated per chunk in one
+    step and each chunk is committed with a single write. Invalid lines are
+    reported and skipped. (Restoring exported records is CLI-only: `import`.)
+    """
+    chunk = max(1, min(chunk, 50_000))
+    created = 0
+    first_id = last_id = None
+    errors = []
+    batch = []
+
+    async def commit() -> None:
+        nonlocal created, first_id, last_id
+        st = _state()
+        res = cm.import_chunk(st, batch, allow_restore=False)
+        if res["created"]:
+            for tid in res["created"]:
+                _expiry.track(st["tasks"][tid])
+            _save(st)
+            await _flushed()
+            created += len(res["created"])
+            first_id = first_id or res["created"][0]
+            last_id = res["created"][-1]
+        errors.extend(res["errors"][: max(0, 100 - len(errors))])
+        batch.clear()
+
+    async for n, rec in _body_lines(request):
+        batch.append((n, rec))
+        if len(batch) >= chunk:
+            await commit()
+    if batch:
+        await commit()
+
+    return {"ok": True, "created": created, "firstId": first_id, "lastId": last_id, "errors": errors}
 
 
 @app.post("/tasks/propose")
-def propose(inp: ProposeIn):
+async def propose(inp: ProposeIn):
     class A:
         task = inp.task
         worker = inp.worker
@@ -201,81 +504,90 @@ def propose(inp: ProposeIn):
         eta = inp.eta
         note = inp.note
 
-    return cm.propose_cmd(A())
+    out = cm.propose_cmd(A())
+    await _flushed()
+    return out
 
 
 @app.post("/tasks/accept")
-def accept(inp: AcceptIn):
+async def accept(inp: AcceptIn):
     class A:
         task = inp.task
         worker = inp.worker
 
-    return cm.accept_cmd(A())
+    out = cm.accept_cmd(A())
+    await _flushed()
+    return out
 
 
 @app.post("/tasks/award")
-def award(inp: AwardIn):
+async def award(inp: AwardIn):
     class A:
         task = inp.task
         requester = inp.requester
         worker = inp.worker
 
-    return cm.award_cmd(A())
+    out = cm.award_cmd(A())
+    await _flushed()
+    return out
 
 
 @app.post("/tasks/update")
-def update(inp: UpdateIn):
+async def update(inp: UpdateIn):
     class A:
         task = inp.task
         worker = inp.worker
         message = inp.message
         eta = inp.eta
 
-    return cm.update_cmd(A())
+    out = cm.update_cmd(A())
+    await _flushed()
+    return out
 
 
 @app.post("/tasks/submit")
-def submit(inp: SubmitIn):
+async def submit(inp: SubmitIn):
     class A:
         task = inp.task
         worker = inp.worker
         result = inp.result
 
-    return cm.submit_cmd(A())
+    out = cm.submit_cmd(A())
+    await _flushed()
+    return out
 
 
 @app.post("/tasks/approve")
-def approve(inp: ApproveIn):
+async def approve(inp: ApproveIn):
     class A:
         task = inp.task
         requester = inp.requester
 
-    return cm.approve_cmd(A())
+    out = cm.approve_cmd(A())
+    await _flushed()
+    return out
 
 
 @app.get("/admin/needs-nudge")
-def needs_nudge(silenceSeconds: int = 1800, limit: int = 50):
-    """Return awarded tasks with no update for >silenceSeconds and not yet nudged."""
+async def needs_nudge(request: Request, silenceSeconds: int = 1800, limit: Optional[int] = None):
+    """Return awarded tasks with no update for >silenceSeconds and not yet nudged,
+    at most `limit` (default 50).
+
+    Streams NDJSON when requested via the Accept header (see /tasks/open).
+    """
     st = _state()
-    now = int(time.time())
-    out = []
-    for t in st.get("tasks", {}).values():
-        if t.get("status") != "awarded":
-            continue
-        last = t.get("lastUpdateAt") or t.get("updatedAt") or t.get("createdAt")
-        if not last:
-            continue
-        if now - int(last) <= int(silenceSeconds):
-            continue
-        if t.get("lastNudgedAt"):
-            # one-time auto nudge
-            continue
-        worker = t.get("awardedTo")
-        requester = t.get("requester")
-        if not worker or not requester:
-            continue
-        out.append({"task": t.get("id"), "worker": worker, "requester": requester})
-    return {"ok": True, "tasks": out[:limit]}
+    out = list(itertools.islice(cm.iter_needs_nudge(st, silenceSeconds), DEFAULT_LIMIT if limit is None else limit))
+
+    if _wants_ndjson(request):
+        return _ndjson(out)
+
+    return {"ok": True, "tasks": out}
+
+
+@app.get("/admin/export")
+async def export():
+    """Stream the full state as NDJSON: a meta record, then users, then tasks."""
+    return _ndjson(cm.iter_export_records(_state()))
 
 
 class MarkNudgedIn(BaseModel):
@@ -283,7 +595,7 @@ class MarkNudgedIn(BaseModel):
 
 
 @app.post("/admin/mark-nudged")
-def mark_nudged(inp: MarkNudgedIn):
+async def mark_nudged(inp: MarkNudgedIn):
     st = _state()
     t = st.get("tasks", {}).get(inp.task)
     if not t:
@@ -292,4 +604,31 @@ def mark_nudged(inp: MarkNudgedIn):
     t["updatedAt"] = int(time.time())
     st["tasks"][inp.task] = t
     _save(st)
+    await _flushed()
     return {"ok": True, "task": inp.task, "lastNudgedAt": t["lastNudgedAt"]}
+
+
+class ProfileIn(BaseModel):
+    sampleEvery: Optional[int] = Field(default=None, ge=0)
+    slowMs: Optional[float] = Field(default=None, ge=0)
+    intervalMs: Optional[float] = Field(default=None, gt=0)
+    keep: Optional[int] = Field(default=None, ge=1)
+    format: Optional[str] = Field(default=None, pattern="^(collapsed|speedscope)$")
+
+
+@app.get("/admin/profile")
+async def get_profile():
+    return {"ok": True, "profile": prof.config.as_dict()}
+
+
+@app.post("/admin/profile")
+async def set_profile(inp: ProfileIn):
+    """Turn request profiling on/off at runtime (1-in-N and/or slower-than-threshold)."""
+    cfg = prof.configure(
+        sample_every=inp.sampleEvery,
+        slow_ms=inp.slowMs,
+        interval_ms=inp.intervalMs,
+        keep=inp.keep,
+        fmt=inp.format,
+    )
+    return {"ok": True, "profile": cfg.as_dict()}
@@ -0,0 +1,5 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [os.path.join(ROOT, "scripts"), os.path.join(ROOT, "services")]
@@ -0,0 +1,42 @@
+import clawmarket as cm
+import clawmarket_store as store
+
+
+def _task(tid, created, status="open", requester="+1"):
+    return {"id": tid, "status": status, "requester": requester, "createdAt": created, "updatedAt": created}
+
+
+def _state(tasks):
+    st = cm._empty_state()
+    st["tasks"] = {t["id"]: t for t in tasks}
+    return st
+
+
+def test_open_tasks_newest_first_by_created_at(tmp_path):
+    # Inserted out of creation order, as a restore or merge would.
+    st = _state([_task("T000003", 300), _task("T000001", 100), _task("T000004", 300), _task("T000002", 200, "awarded")])
+    expected = ["T000004", "T000003", "T000001"]
+    assert [t["id"] for t in cm.iter_open_tasks(st)] == expected
+
+    path = str(tmp_path / "clawmarket.json")
+    store.write_state(path, st)
+    lazy = store.load_state(path, lazy=True)
+    assert isinstance(lazy["tasks"], store.LazyRecords)
+    assert [t["id"] for t in cm.iter_open_tasks(lazy)] == expected
+    assert [t["id"] for t in cm.iter_open_tasks(lazy, viewer="+1")] == []
+
+
+def test_restored_tasks_are_not_overwritten_by_new_ids():
+    st = cm._empty_state()
+    records = [(1, {"type": "task", "task": _task("T000001", 1)}), (2, {"type": "task", "task": _task("T000003", 3)})]
+    res = cm.import_chunk(st, records)
+    assert res["restored"] == 2 and st["seq"] == 3
+
+    # A sequence that lags behind the tasks (e.g. merged by hand) skips taken ids.
+    st["seq"] = 0
+    st["tasks"]["T000002"] = _task("T000002", 2)
+    new = {"requester": "+2", "title": "t", "instructions": "i", "budget": 1}
+    res = cm.import_chunk(st, [(1, new), (2, new)])
+    assert res["created"] == ["T000004", "T000005"]
+    assert cm._new_task_id(st) == "T000006"
+    assert st["tasks"]["T000001"]["createdAt"] == 1
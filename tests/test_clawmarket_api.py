@@ -0,0 +1,136 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import clawmarket as cm
+import clawmarket_api as api
+import clawmarket_store as store
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+TASK = {"requester": "+15550001", "title": "t", "instructions": "i", "budget": 5}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = str(tmp_path / "clawmarket.json")
+    monkeypatch.setattr(cm, "STATE_PATH", path)
+    monkeypatch.setattr(cm, "_resident", None)
+    monkeypatch.setattr(cm, "_persist", None)
+    monkeypatch.setattr(api, "_ready", api.asyncio.Event())
+    with TestClient(api.app) as c:
+        yield c
+
+
+@pytest.fixture
+def fast_maintenance(monkeypatch):
+    monkeypatch.setattr(api, "MAINTENANCE_SECONDS", 0.02)
+
+
+def _cli(*args):
+    env = dict(os.environ, CLAWMARKET_STATE=cm.STATE_PATH)
+    out = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "scripts", "clawmarket.py"), *args],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout)
+
+
+def test_cli_writes_are_not_lost_while_the_api_runs(client):
+    a = client.post("/tasks", json=TASK).json()["task"]["id"]
+    b = _cli("create-task", "--requester", "+15550002", "--title", "cli", "--instructions", "i", "--budget", "3")
+    c = client.post("/tasks", json=TASK).json()["task"]["id"]
+
+    assert [a, b["task"]["id"], c] == ["T000001", "T000002", "T000003"]
+    with open(cm.STATE_PATH, encoding="utf-8") as f:
+        tasks = json.load(f)["tasks"]
+    assert sorted(tasks) == ["T000001", "T000002", "T000003"]
+    assert tasks["T000002"]["title"] == "cli"
+    assert client.get("/tasks/T000002").json()["task"]["title"] == "cli"
+
+
+def test_bulk_create_streams_chunks_and_reports_bad_lines(client):
+    lines = [json.dumps(dict(TASK, title=f"t{i}")) for i in range(5)]
+    lines.insert(2, "{not json")
+    lines.insert(4, json.dumps({"type": "task", "task": {"id": "T000099"}}))
+    r = client.post("/tasks/bulk?chunk=2", content="\n".join(lines) + "\n").json()
+
+    assert r["created"] == 5 and (r["firstId"], r["lastId"]) == ("T000001", "T000005")
+    assert [e["error"] for e in r["errors"]] == ["invalid_json", "restore_not_allowed"]
+    assert [e["line"] for e in r["errors"]] == [3, 5]
+    with open(cm.STATE_PATH, encoding="utf-8") as f:
+        assert sorted(json.load(f)["tasks"]) == [f"T00000{i}" for i in range(1, 6)]
+
+
+def test_maintenance_survives_a_failed_pass_and_expires(fast_maintenance, client, monkeypatch):
+    real = api._expiry.run_due
+    calls = []
+
+    def flaky(*a, **kw):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return real(*a, **kw)
+
+    monkeypatch.setattr(api._expiry, "run_due", flaky)
+    tid = client.post("/tasks", json=dict(TASK, deadline="2000-01-01")).json()["task"]["id"]
+    for _ in range(100):
+        if client.get(f"/tasks/{tid}").json()["task"]["status"] == "expired":
+            break
+        time.sleep(0.02)
+    assert client.get(f"/tasks/{tid}").json()["task"]["status"] == "expired"
+    assert len(calls) >= 2
+    with open(cm.STATE_PATH, encoding="utf-8") as f:
+        assert json.load(f)["tasks"][tid]["status"] == "expired"
+    assert client.get("/ready").status_code == 200
+
+
+def test_ready_reports_a_stopped_writer(client):
+    for _ in range(100):
+        if client.get("/ready").status_code == 200:
+            break
+        time.sleep(0.01)
+    client.portal.call(api._writer.close)
+    r = client.get("/ready")
+    assert r.status_code == 503 and r.json()["detail"] == "writer_stopped"
+
+
+def test_task_view_follows_mutations(client):
+    tid = client.post("/tasks", json=TASK).json()["task"]["id"]
+    client.post("/users/register", json={"phone": "+15550009", "role": "worker"})
+    assert client.get(f"/tasks/{tid}").json()["task"]["status"] == "open"
+
+    assert client.post("/tasks/propose", json={"task": tid, "worker": "+15550009", "price": 4}).json()["ok"]
+    assert client.post("/tasks/award", json={"task": tid, "requester": TASK["requester"], "worker": "+15550009"}).json()["ok"]
+    task = client.get(f"/tasks/{tid}").json()["task"]
+    assert task["status"] == "awarded" and task["awardedTo"] == "+15550009"
+    other = client.get(f"/tasks/{tid}?viewer=%2B15550123").json()
+    assert other["redacted"] and other["task"]["status"] == "awarded" and "awardedTo" not in other["task"]
+
+
+def test_only_state_writes_take_the_state_lock(client):
+    posts = {r.path for r in api.app.routes if "POST" in getattr(r, "methods", ())}
+    assert posts == api.STATE_WRITES | {"/admin/profile"}
+
+    out = []
+    with store.state_lock(cm.STATE_PATH):  # e.g. a long CLI command
+        t = threading.Thread(target=lambda: out.append(client.post("/admin/profile", json={"sampleEvery": 0})))
+        t.start()
+        t.join(5)
+        assert out and out[0].status_code == 200
+    t.join()
+
+
+def test_open_tasks_has_the_same_default_limit_in_both_formats(client):
+    client.post("/tasks/bulk", content="".join(json.dumps(dict(TASK, title=f"t{i}")) + "\n" for i in range(60)))
+    nd = {"Accept": "application/x-ndjson"}
+
+    listed = [t["id"] for t in client.get("/tasks/open").json()["tasks"]]
+    streamed = [json.loads(line)["id"] for line in client.get("/tasks/open", headers=nd).text.splitlines()]
+    assert len(listed) == api.DEFAULT_LIMIT and streamed == listed
+    assert len(client.get("/tasks/open?limit=55", headers=nd).text.splitlines()) == 55
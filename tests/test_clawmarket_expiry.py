@@ -0,0 +1,66 @@
+import json
+from datetime import datetime, timezone
+
+import clawmarket as cm
+import clawmarket_expiry as expiry
+import clawmarket_store as store
+from test_clawmarket import _state, _task
+
+DAY = 86400
+NOW = 1_800_000_000
+
+
+def test_parse_deadline_forms():
+    assert cm._parse_deadline("1800000000", NOW) == 1_800_000_000
+    end_of_day = int(datetime(2026, 10, 19, 23, 59, 59, tzinfo=timezone.utc).timestamp())
+    assert cm._parse_deadline("20261019", NOW) == end_of_day
+    assert cm._parse_deadline("2026-10-19", NOW) == end_of_day
+    assert cm._parse_deadline("2h", NOW) == NOW + 7200
+    assert cm._parse_deadline("12345", NOW) is None
+    assert cm._parse_deadline("when you can", NOW) is None
+
+
+def test_legacy_deadlines_are_backfilled_and_persisted(tmp_path):
+    old = dict(_task("T000001", NOW - 10 * DAY), deadline="2d")  # written before deadlineAt existed
+    free = dict(_task("T000002", NOW - DAY), deadline="asap")
+    path = str(tmp_path / "clawmarket.json")
+    store.write_state(path, _state([old, free]))
+    st = store.load_state(path, lazy=True)
+
+    idx = expiry.ExpiryIndex(stale_seconds=0)
+    assert idx.rebuild(st, cm._parse_deadline) == 1
+    assert st["tasks"].meta_of("T000001")["deadlineAt"] == NOW - 8 * DAY
+    assert idx.run_due(st, now=NOW)["expired"] == ["T000001"]
+    store.write_state(path, st)
+    with open(path, encoding="utf-8") as f:
+        tasks = json.load(f)["tasks"]
+    assert tasks["T000001"]["status"] == "expired" and tasks["T000001"]["deadlineAt"] == NOW - 8 * DAY
+    assert "deadlineAt" not in tasks["T000002"] and tasks["T000002"]["status"] == "open"
+
+
+def test_deadline_less_open_tasks_go_stale_then_get_archived(tmp_path):
+    st = _state([_task("T000001", NOW - 100 * DAY), _task("T000002", NOW - 10 * DAY), _task("T000003", NOW - 100 * DAY, "awarded")])
+    idx = expiry.ExpiryIndex(retention_seconds=30 * DAY, stale_seconds=90 * DAY)
+    idx.rebuild(st)
+    res = idx.run_due(st, now=NOW)
+    assert res["expired"] == ["T000001"]
+    assert st["tasks"]["T000001"]["history"][-1]["reason"] == "stale"
+    assert st["tasks"]["T000003"]["status"] == "awarded"
+
+    res = idx.run_due(st, now=NOW + 31 * DAY)
+    assert [t["id"] for t in res["removed"]] == ["T000001"] and "T000001" not in st["tasks"]
+    assert res["expired"] == []  # T000002 was still updated less than 90 days before
+
+
+def test_archive_is_idempotent(tmp_path):
+    path = str(tmp_path / "clawmarket.json")
+    a, b = _task("T000001", 1, "expired"), _task("T000002", 2, "expired")
+    expiry.append_archive(path, [a])
+    with open(expiry.archive_path(path), "a", encoding="utf-8") as f:
+        f.write('{"id": "T0000')  # torn by a crash
+    # A rerun after dying between archive and save archives the same tasks again.
+    expiry.append_archive(path, [a, b])
+    expiry.append_archive(path, [a, b])
+    with open(expiry.archive_path(path), encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line)["id"] for line in lines if line.endswith("}")] == ["T000001", "T000002"]
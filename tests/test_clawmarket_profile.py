@@ -0,0 +1,41 @@
+import asyncio
+import threading
+import time
+
+import clawmarket_profile as prof
+
+
+# Blocking work on the loop thread; time.sleep lets the sampler in mid-call.
+def _work_a() -> None:
+    time.sleep(0.003)
+
+
+def _work_b() -> None:
+    time.sleep(0.003)
+
+
+async def _worker(work, rounds: int) -> None:
+    for _ in range(rounds):
+        work()
+        await asyncio.sleep(0)
+
+
+def test_session_counts_only_its_own_task(monkeypatch):
+    monkeypatch.setattr(prof.config, "interval_ms", 1.0)
+
+    async def main():
+        async def profiled():
+            s = prof.start("a", threads={threading.get_ident()}, task=asyncio.current_task())
+            try:
+                await _worker(_work_a, 60)
+            finally:
+                prof._SAMPLER.remove(s)
+            return s
+
+        session, _ = await asyncio.gather(profiled(), _worker(_work_b, 60))
+        return session
+
+    session = asyncio.run(main())
+    names = {frame for stack in session.stacks for frame in stack}
+    assert any(n.startswith("_work_a ") for n in names)
+    assert not any(n.startswith("_work_b ") for n in names)
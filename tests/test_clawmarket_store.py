@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import clawmarket_store as store
+from test_clawmarket import _state, _task
+
+
+def test_lazy_round_trip_and_partial_save(tmp_path):
+    path = str(tmp_path / "clawmarket.json")
+    st = _state([_task(f"T{i:06d}", i) for i in range(1, 51)])
+    st["users"] = {"+1": {"phone": "+1", "role": "both"}}
+    store.write_state(path, st)
+
+    # Still one plain JSON document.
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["tasks"] == st["tasks"]
+    assert store.index_is_fresh(path)
+
+    lazy = store.load_state(path, lazy=True)
+    tasks = lazy["tasks"]
+    assert isinstance(tasks, store.LazyRecords) and tasks.materialized() == 0
+    assert tasks.status_of("T000007") == "open"
+    assert tasks.meta_of("T000007")["createdAt"] == 7
+    assert tasks.materialized() == 0
+    assert lazy["users"]["+1"]["role"] == "both"
+
+    untouched = tasks.raw("T000002")
+    t = dict(tasks["T000001"], status="awarded")
+    tasks["T000001"] = t
+    del tasks["T000050"]
+    store.write_state(path, lazy)
+
+    again = store.load_state(path, lazy=True)
+    assert again["tasks"].status_of("T000001") == "awarded"
+    assert "T000050" not in again["tasks"] and len(again["tasks"]) == 49
+    assert again["tasks"].raw("T000002") == untouched
+    # The mapping that was saved is rebound to the new file.
+    assert tasks.raw("T000001") is not None and tasks.status_of("T000001") == "awarded"
+
+
+def test_stale_index_falls_back_to_full_parse(tmp_path):
+    path = str(tmp_path / "clawmarket.json")
+    store.write_state(path, _state([_task("T000001", 1)]))
+    st = _state([_task("T000001", 1), _task("T000002", 2)])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(st, f)  # written by something that does not keep the index
+    os.utime(path, ns=(1, 1))
+
+    assert not store.index_is_fresh(path)
+    loaded = store.load_state(path, lazy=True)
+    assert isinstance(loaded["tasks"], dict) and set(loaded["tasks"]) == {"T000001", "T000002"}
+
+
+def test_record_cache_is_bounded(tmp_path):
+    path = str(tmp_path / "clawmarket.json")
+    store.write_state(path, _state([_task(f"T{i:06d}", i) for i in range(1, 101)]))
+    idx = store._read_index(path)
+    tasks = store.LazyRecords(path, idx["tasks"], max_cached=10)
+    for tid in list(tasks):
+        assert tasks[tid]["id"] == tid
+    assert tasks.materialized() == 10
+    assert tasks.warm(["open"]) == 10
+
+
+def test_writer_reports_failed_saves_and_keeps_running(tmp_path):
+    path = str(tmp_path / "clawmarket.json")
+    st = _state([_task("T000001", 1)])
+
+    async def main():
+        w = store.AsyncWriter(path, st, None, poll=0.01)
+        w.start()
+        st["tasks"]["T000002"] = {"id": "T000002", "bad": {1, 2}}  # not JSON-encodable
+        w.mark_dirty()
+        with pytest.raises(TypeError):
+            await asyncio.wait_for(w.flushed(), 5)
+        assert w.alive
+
+        st["tasks"]["T000002"] = _task("T000002", 2)
+        w.mark_dirty()
+        await asyncio.wait_for(w.flushed(), 5)
+        await w.close()
+        return w.writes
+
+    assert asyncio.run(main()) == 1
+    with open(path, encoding="utf-8") as f:
+        assert sorted(json.load(f)["tasks"]) == ["T000001", "T000002"]
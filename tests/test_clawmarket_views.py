@@ -0,0 +1,44 @@
+import json
+
+from starlette.responses import JSONResponse
+
+import clawmarket_store as store
+import clawmarket_views as views
+from test_clawmarket import _state, _task
+
+
+def _lazy(tmp_path, tasks):
+    path = str(tmp_path / "clawmarket.json")
+    store.write_state(path, _state(tasks))
+    return store.load_state(path, lazy=True)["tasks"]
+
+
+def test_raw_fast_path_matches_the_parsed_path(tmp_path):
+    t = dict(_task("T000001", 1), title="Café ☕ \"quoted\"", budget=12.5, deadline=None,
+             proposals=[{"worker": "+2", "price": 3, "note": "olá\nnext line"}])
+    tasks = _lazy(tmp_path, [t, _task("T000002", 2)])
+    cache = views.ViewCache()
+
+    raw = cache.get(tasks, "T000001")
+    assert tasks.materialized() == 0  # served from the file, never decoded
+    assert raw == JSONResponse(t).body == cache.get({"T000001": t}, "T000001")
+    for view in views.VIEWS:
+        assert cache.get(tasks, "T000001", view) == cache.get({"T000001": t}, "T000001", view)
+    assert cache.join(tasks, ["T000002", "missing", "T000001"]) == JSONResponse([_task("T000002", 2), t]).body
+
+
+def test_assignment_invalidates_cached_views(tmp_path):
+    tasks = _lazy(tmp_path, [_task("T000001", 1)])
+    cache = views.ViewCache()
+    before = {view: cache.get(tasks, "T000001", view) for view in views.VIEWS}
+    assert cache.get(tasks, "T000001", "summary") is before["summary"] and cache.hits == 1
+
+    tasks["T000001"] = dict(tasks["T000001"], status="awarded", awardedTo="+2")
+    after = {view: cache.get(tasks, "T000001", view) for view in views.VIEWS}
+    for view in views.VIEWS:
+        assert after[view] != before[view]
+        assert json.loads(after[view])["status"] == "awarded"
+    assert "awardedTo" in json.loads(after["full"]) and "awardedTo" not in json.loads(after["redacted"])
+
+    del tasks["T000001"]
+    assert cache.get(tasks, "T000001") is None
@@ -0,0 +1,49 @@
+import io
+import json
+import time
+
+import youtube_captions as captions
+
+S = captions.Segment
+
+
+def _json3(n):
+    events = [{"tStartMs": i * 1000, "dDurationMs": 1000, "segs": [{"utf8": f"word{i} "}, {"utf8": "more"}]} for i in range(n)]
+    return json.dumps({"wireMagic": "pb3", "events": events})
+
+
+def test_json3_in_memory_and_chunked_agree_and_scale():
+    body = _json3(60_000)
+    assert len(body) > 4_000_000
+    t0 = time.perf_counter()
+    whole = list(captions.parse(body))
+    assert time.perf_counter() - t0 < 3.0  # was quadratic: ~10 s
+    assert len(whole) == 60_000 and whole[5] == S(5.0, 6.0, "word5 more")
+    assert list(captions.parse(io.BytesIO(body.encode()))) == whole
+
+
+def test_manual_repeats_survive():
+    lines = ["Welcome back.", "Thank you.", "Thank you.", "Today we sing.", "Row, row, row your boat",
+             "row your boat", "gently down the stream.", "Merrily, merrily,", "life is but a dream.", "Bye!"]
+    manual = [S(i, i + 1, text) for i, text in enumerate(lines)]
+    assert not captions.looks_rolling(manual)
+    assert list(captions.dedupe_if_rolling(manual)) == manual
+    assert list(captions.dedupe_if_rolling(manual, rolling=False)) == manual
+
+
+def test_rolling_captions_are_deduped():
+    vtt = (
+        "WEBVTT\nKind: captions\n\n"
+        "00:00:00.000 --> 00:00:02.000\nhello there my friends\n\n"
+        "00:00:02.000 --> 00:00:02.010\nhello there my friends\n\n"
+        "00:00:02.010 --> 00:00:04.000\nhello there my friends\nhow are you all\n\n"
+        "00:00:04.000 --> 00:00:06.000\nhow are you all\ntoday at the show\n"
+    )
+    segs = list(captions.parse_vtt(vtt))
+    assert captions.looks_rolling(segs)
+    assert captions.to_text(segs) == "hello there my friends how are you all today at the show"
+    assert [s.text for s in captions.dedupe_if_rolling(segs, rolling=True)] == [
+        "hello there my friends",
+        "how are you all",
+        "today at the show",
+    ]
@@ -0,0 +1,35 @@
+import youtube_captions as captions
+import youtube_chunker as chunker
+
+
+def _segments(n, words=8):
+    return [captions.Segment(i * 3.0, i * 3.0 + 3, " ".join(f"w{i}x{j}" for j in range(words)) + ".") for i in range(n)]
+
+
+def test_chunks_are_sentence_aligned_and_bounded():
+    segs = _segments(200)
+    chunks = list(chunker.iter_chunks(segs, 300))
+    assert all(len(c.text) <= 300 for c in chunks)
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+    assert all(c.text.endswith(".") for c in chunks)
+    assert " ".join(c.text for c in chunks) == captions.to_text(segs, dedupe=False)
+
+
+def test_fit_respects_the_budget_and_spreads_picks():
+    segs = _segments(400)
+    out = chunker.fit(segs, 2000)
+    assert 0 < len(out) <= 2000
+    stamps = [line.split("]")[0] for line in out.split("\n")]
+    assert stamps[0] == "[00:00" and stamps[-1] > "[10:00"
+    assert chunker.fit(segs[:2], 2000) == captions.to_text(segs[:2], dedupe=False)
+
+
+def test_budget_smaller_than_any_chunk_still_returns_text():
+    segs = _segments(50)
+    for budget in (40, 120, 299):
+        out = chunker.fit(segs, budget)
+        assert out and len(out) <= budget
+    chunks = list(chunker.iter_chunks(segs, 1200))
+    [only] = chunker.select(chunks, 100)
+    assert chunker._rendered_len(only) <= 100 and only.text
+    assert chunker.select(chunks, 5) == []
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import youtube_daemon as yd
+import youtube_monitor as ym
+import youtube_websub as websub
+
+CID = "UCaaaaaaaaaaaaaaaaaaaaaa"
+ENTRY = (
+    '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:yt="http://www.youtube.com/xml/schemas/2015">'
+    f"<entry><yt:videoId>v2</yt:videoId><yt:channelId>{CID}</yt:channelId><title>T</title></entry></feed>"
+).encode()
+
+
+def _wait(cond, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not cond() and time.monotonic() < end:
+        time.sleep(0.01)
+    return cond()
+
+
+def test_push_polls_now_and_rechecks(monkeypatch):
+    polls = []
+    monkeypatch.setattr(ym, "check_channel", lambda ch: polls.append((ch.name, time.monotonic())) or ([], 0))
+    monkeypatch.setattr(ym, "resolve_channel_id", lambda ch: ch.channel_id)
+    monkeypatch.setattr(ym, "channel_state", lambda ch: {})
+    monkeypatch.setattr(yd, "PUSH_RECHECKS", (0.3, 0.6))
+    monkeypatch.setattr(yd.random, "uniform", lambda a, b: a)  # first round at once, no jitter
+
+    hub = websub.LocalHub()
+    hub.start()
+    channels = [ym.Channel(name="a", channel_id=CID), ym.Channel(name="b", channel_id="UCbbbbbbbbbbbbbbbbbbbbbb")]
+    daemon = yd.Daemon(channels, min_interval=3600, max_interval=3600)
+    sub = websub.Subscriber("", ("127.0.0.1", 0), hub=hub.url, on_notify=daemon.on_notify, on_verified=daemon.on_verified)
+    sub.callback_url = f"http://127.0.0.1:{sub.address[1]}/websub"
+    sub.start()
+    daemon.subscriber = sub
+    t = threading.Thread(target=daemon.run)
+    t.start()
+    try:
+        topic = websub.topic_url(CID)
+        assert _wait(lambda: sub.expires(topic) > time.time() and len(polls) == 2)
+        polls.clear()
+
+        t0 = time.monotonic()
+        assert hub.publish(topic, ENTRY) == 1
+        assert _wait(lambda: len(polls) >= 3)
+        time.sleep(0.2)
+        assert [name for name, _ in polls] == ["a", "a", "a"]
+        offsets = [at - t0 for _, at in polls]
+        assert offsets[0] < 0.2
+        assert 0.3 <= offsets[1] < 0.5 and 0.6 <= offsets[2] < 0.8
+    finally:
+        daemon.stop()
+        t.join(5)
+        hub.close()
+    assert not t.is_alive()
+
+
+class _BrokenOut:
+    def write(self, _s):
+        raise OSError("stdout closed")
+
+    def flush(self):
+        pass
+
+
+def test_a_failing_poll_step_keeps_the_channel_scheduled(monkeypatch):
+    polls = []
+    monkeypatch.setattr(ym, "check_channel", lambda ch: polls.append(ch.name) or ([["NEW_VIDEO=true"]], 1))
+
+    def broken_state(ch):
+        raise ValueError("state unreadable")
+
+    monkeypatch.setattr(ym, "channel_state", broken_state)
+    monkeypatch.setattr(yd.random, "uniform", lambda a, b: a)
+
+    daemon = yd.Daemon([ym.Channel(name="a", channel_id=CID)], min_interval=0.05, max_interval=0.1, out=_BrokenOut())
+    t = threading.Thread(target=daemon.run)
+    t.start()
+    try:
+        # Every poll's output write raises, and so does the state read for the next interval.
+        assert _wait(lambda: len(polls) >= 3)
+    finally:
+        daemon.stop()
+        t.join(5)
+    assert not t.is_alive()
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+import youtube_fixture_server as yfs
+import youtube_http as yhttp
+
+
+@pytest.fixture
+def fx():
+    server = yfs.FixtureServer()
+    server.start()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client():
+    c = yhttp.HTTPClient(retries=2, backoff=0.01)
+    events = []
+    c.hooks.append(events.append)
+    c.events = events
+    yield c
+    c.close()
+
+
+def test_bodies_are_gzipped_and_decoded(fx, client):
+    r = client.get(fx.url + "/watch?v=abcdefghijk")
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert r.text().startswith("<html>") and "ytInitialPlayerResponse" in r.text()
+    assert client.events[-1]["bytes"] == len(r.body)
+
+
+def test_429_waits_for_retry_after(fx, client):
+    fx.fail("watch", 429, retry_after="1")
+    t0 = time.monotonic()
+    assert client.get(fx.url + "/watch?v=abcdefghijk").status == 200
+    assert time.monotonic() - t0 >= 1.0
+    assert client.events[-1]["attempts"] == 2
+
+
+def test_5xx_is_retried_until_the_budget_runs_out(fx, client):
+    fx.fail("feed", 503, count=2)
+    assert client.get(fx.url + "/feeds/videos.xml?channel_id=UCx").status == 200
+    assert client.events[-1]["attempts"] == 3
+
+    fx.fail("feed", 502, count=3)
+    with pytest.raises(yhttp.HTTPError) as e:
+        client.get(fx.url + "/feeds/videos.xml?channel_id=UCx")
+    assert e.value.code == 502
+
+
+def test_stale_keepalive_is_retried_once_then_counted(fx, client):
+    url = fx.url + "/watch?v=abcdefghijk"
+    client.get(url)
+    fx.fail("watch", 0)  # the pooled connection dies under the next request
+    assert client.get(url).status == 200
+    assert client.events[-1]["stale"] == 1 and client.events[-1]["attempts"] == 2
+
+    # Only the first failure is free: a second one needs a regular retry.
+    client.get(url)
+    fx.fail("watch", 0, count=4)
+    with pytest.raises((OSError, yhttp.http.client.HTTPException)):
+        client.get(url)
+    assert client.events[-1]["stale"] == 1 and client.events[-1]["attempts"] == 4
@@ -0,0 +1,152 @@
+import os
+import sys
+import textwrap
+import time
+
+import pytest
+
+import youtube_fixture_server as yfs
+import youtube_http as yhttp
+import youtube_monitor as ym
+import youtube_state as ystate
+import youtube_transcript_cache as tcache
+
+HANDLE = "@testchan"
+CID = yfs.channel_id_for(HANDLE)
+VTT = "WEBVTT\n\n00:00:00.000 --> 00:00:02.000\n{lang} line one\n\n00:00:02.000 --> 00:00:04.000\n{lang} line two\n"
+
+
+@pytest.fixture
+def ytdlp(tmp_path, monkeypatch):
+    """A stub yt-dlp on PATH; STUB_YTDLP=langs[:exit code] or "sleep"."""
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    stub = bindir / "yt-dlp"
+    stub.write_text(textwrap.dedent(f"""\
+        #!{sys.executable}
+        import os, sys, time
+        mode = os.environ["STUB_YTDLP"]
+        if mode == "sleep":
+            time.sleep(30)
+        langs, _, code = mode.partition(":")
+        out = sys.argv[sys.argv.index("-o") + 1]
+        for lang in filter(None, langs.split(",")):
+            with open(out.replace("%(id)s", "vid").replace("%(ext)s", lang + ".vtt"), "w") as f:
+                f.write({VTT!r}.format(lang=lang))
+        sys.exit(int(code or 0))
+    """))
+    stub.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bindir}{os.pathsep}{os.environ['PATH']}")
+    return lambda mode: monkeypatch.setenv("STUB_YTDLP", mode)
+
+
+def test_ytdlp_picks_the_first_preferred_language(ytdlp):
+    ytdlp("de,en,pt")
+    segments = ym._transcript_via_ytdlp("https://youtu.be/vid", ["pt", "en"])
+    assert [s.text for s in segments] == ["pt line one", "pt line two"]
+
+    ytdlp("en:1")  # a failed language does not hide the ones it wrote
+    assert [s.text for s in ym._transcript_via_ytdlp("https://youtu.be/vid", ["pt", "en"])] == ["en line one", "en line two"]
+
+    ytdlp("de")
+    assert ym._transcript_via_ytdlp("https://youtu.be/vid", ["pt", "en"]) == []
+    ytdlp(":1")
+    assert ym._transcript_via_ytdlp("https://youtu.be/vid", ["pt", "en"]) is None
+
+
+def test_ytdlp_timeout_is_reported(ytdlp, capsys):
+    ytdlp("sleep")
+    t0 = time.monotonic()
+    assert ym._transcript_via_ytdlp("https://youtu.be/vid", ["en"], timeout=0.5) is None
+    assert time.monotonic() - t0 < 5
+    assert "yt-dlp: timed out after 0.5s" in capsys.readouterr().err
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """The fixture server as youtube.com, with the monitor's state under tmp_path."""
+    fx = yfs.FixtureServer()
+    fx.start()
+    monkeypatch.setattr(yhttp, "BASE_URL", fx.url)
+    monkeypatch.setattr(ym, "store", ystate.StateStore(str(tmp_path / "state.json")))
+    monkeypatch.setattr(ym, "transcripts", tcache.TranscriptCache(root=str(tmp_path / "transcripts")))
+    monkeypatch.setattr(ym, "LEGACY_CHANNEL_IDS_PATH", str(tmp_path / "channel_ids.json"))
+    yield fx
+    fx.close()
+
+
+def _channel(tmp_path):
+    return ym.Channel(name="test", handle=HANDLE, languages=["en"], fallbacks=["watch-page"], state=str(tmp_path / "legacy.json"))
+
+
+def _new_ids(blocks):
+    assert all(b[0] in ("NEW_VIDEO=true", "NEW_VIDEO=false") for b in blocks)
+    return [b[1].split("=", 1)[1] for b in blocks if b[0] == "NEW_VIDEO=true"]
+
+
+def test_uploads_between_polls_are_reported_in_order_once(site, tmp_path):
+    ch = _channel(tmp_path)
+    blocks, n = ym.check_channel(ch)
+    assert n == 1 and _new_ids(blocks) == [yfs.video_id_for(CID, yfs.START_VIDEOS - 1)]
+    assert "===TRANSCRIPT_SNIPPET_START===" in blocks[0]
+
+    uploads = [site.publish(CID) for _ in range(3)]
+    blocks, n = ym.check_channel(ch)
+    assert n == 3 and _new_ids(blocks) == uploads
+
+    blocks, n = ym.check_channel(ch)
+    assert n == 0 and _new_ids(blocks) == [] and blocks[0][1] == f"VIDEO_ID={uploads[-1]}"
+
+
+def test_unchanged_feed_is_a_304_or_a_known_hash(site, tmp_path):
+    body, validators = ym.fetch_feed(CID, {})
+    assert body and validators["etag"] and validators["sha256"]
+    unchanged, same = ym.fetch_feed(CID, validators)
+    assert unchanged is None and same is validators  # a 304: nothing to hash
+
+    # A server without validators: the same body is still recognised.
+    again, new = ym.fetch_feed(CID, {"sha256": validators["sha256"]})
+    assert again is None and new["sha256"] == validators["sha256"]
+
+    site.publish(CID)
+    body, _ = ym.fetch_feed(CID, validators)
+    assert body is not None
+
+
+def test_unchanged_feed_ends_the_poll_early(site, tmp_path):
+    ch = _channel(tmp_path)
+    ym.check_channel(ch)
+    site.reset()
+    blocks, n = ym.check_channel(ch)
+    assert n == 0 and blocks[0][0] == "NEW_VIDEO=false"
+    assert site.stats()["by_kind"] == {"feed": {"requests": 1, "bytes": 0}}
+
+
+def test_channel_id_cache_expires_and_refreshes_after_a_404(site, tmp_path):
+    ch = _channel(tmp_path)
+    assert ym.resolve_channel_id(ch) == ym.resolve_channel_id(ch) == CID
+    assert site.stats()["by_kind"]["channel"]["requests"] == 1
+
+    old = int(time.time()) - ym.CHANNEL_ID_TTL - 1
+    ym.store.put("channel_ids", HANDLE, {"channel_id": "UCstalestalestalestale00", "resolved_unix": old})
+    site.fail("channel", 404, count=10)
+    assert ym.resolve_channel_id(ch) == "UCstalestalestalestale00"  # expired beats nothing
+    site.fail("channel", 404, count=0)
+    assert ym.resolve_channel_id(ch) == CID
+
+    # A fresh but wrong id: its feed 404s, so the handle is resolved again.
+    ym.store.put("channel_ids", HANDLE, {"channel_id": "UCstalestalestalestale00", "resolved_unix": int(time.time())})
+    site.fail("feed", 404)
+    blocks, n = ym.check_channel(ch)
+    assert n == 1 and _new_ids(blocks) == [yfs.video_id_for(CID, yfs.START_VIDEOS - 1)]
+    assert ym.store.get("channel_ids", HANDLE)["channel_id"] == CID
+
+
+def test_a_stand_in_never_writes_the_real_state_dir(site, tmp_path, monkeypatch):
+    assert ym.stand_in_conflicts() == []
+    monkeypatch.setattr(ym, "store", ystate.StateStore(os.path.join(ym.STATE_DIR, "youtube_state.json")))
+    assert ym.stand_in_conflicts() == ["YOUTUBE_STATE_PATH"]
+    with pytest.raises(SystemExit):
+        ym.main(["--config", str(tmp_path / "missing.json")])
+    monkeypatch.setattr(yhttp, "BASE_URL", yhttp.DEFAULT_BASE_URL)
+    assert ym.stand_in_conflicts() == []
@@ -0,0 +1,115 @@
+import functools
+import io
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import youtube_fixture_server as yfs
+import youtube_http as yhttp
+import youtube_public_captions as ypc
+import youtube_transcript_cache as tcache
+
+LANGS = ["en"]
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    pages = tmp_path / "fixtures" / "watch"
+    pages.mkdir(parents=True)
+    fx = yfs.FixtureServer(fixtures=str(tmp_path / "fixtures"))
+    fx.start()
+    monkeypatch.setattr(yhttp, "BASE_URL", fx.url)
+    yield fx, pages
+    fx.close()
+
+
+def _cache(tmp_path):
+    return tcache.TranscriptCache(root=str(tmp_path / "cache"), max_bytes=10**9)
+
+
+class _Counting(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.consumed = 0
+
+    def read(self, n=-1):
+        out = super().read(n)
+        self.consumed += len(out)
+        return out
+
+
+def test_player_response_stops_reading_early(server):
+    page = server[0].watch_page("abcdefghijk", "http://x")
+    stream = _Counting(page)
+    player, _ = ypc.read_player_response(stream, chunk_size=16 * 1024)
+    assert player["videoDetails"]["videoId"] == "abcdefghijk"
+    assert stream.consumed < len(page) - yfs.PAGE_TAIL_BYTES // 2
+
+    player, text = ypc.read_player_response(io.BytesIO(b"<html>consent</html>"))
+    assert player is None and text == "<html>consent</html>"
+
+
+def test_normal_page_is_fetched_and_cached(server, tmp_path):
+    fx, _ = server
+    cache = _cache(tmp_path)
+    text, lang = ypc.cached_captions(cache, "abcdefghijk", LANGS)
+    assert lang == "en" and text.startswith("[en] ")
+    assert ypc.cached_captions(cache, "abcdefghijk", LANGS) == (text, lang)
+    assert fx.stats()["by_kind"]["watch"]["requests"] == 1
+
+
+def test_consent_and_truncated_pages_are_not_cached(server, tmp_path):
+    fx, pages = server
+    (pages / "consentpage.html").write_text("<html><form action='https://consent.youtube.com/save'></form></html>")
+    full = fx.watch_page("truncatedxx", fx.url).decode("utf-8")
+    (pages / "truncatedxx.html").write_text(full[: full.index('"captions"')])
+    cache = _cache(tmp_path)
+
+    for video_id in ("consentpage", "truncatedxx"):
+        assert ypc.fetch_caption_tracks(video_id) is None
+        assert ypc.cached_captions(cache, video_id, LANGS) == ("", None)
+        assert cache.get_entry(video_id, "en", ypc.SOURCE) is None
+
+
+def test_page_without_tracks_is_cached_as_no_captions(server, tmp_path):
+    _, pages = server
+    (pages / "nocaptionsx.html").write_text('<script>var ytInitialPlayerResponse = {"videoDetails": {}};</script>')
+    cache = _cache(tmp_path)
+    assert ypc.cached_captions(cache, "nocaptionsx", LANGS) == ("", None)
+    assert cache.get_entry("nocaptionsx", "en", ypc.SOURCE)["text"] == ""
+
+
+def test_host_limiter_bounds_requests_in_flight_per_host():
+    limiter = ypc.HostLimiter(per_host=2)
+    lock = threading.Lock()
+    active, peak = {}, {}
+
+    def hit(url):
+        host = url.split("/")[2]
+        with limiter.slot(url):
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            time.sleep(0.02)
+            with lock:
+                active[host] -= 1
+
+    urls = [f"http://{host}/watch?v={i}" for i in range(12) for host in ("a.test", "b.test")]
+    with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+        list(pool.map(hit, urls))
+    assert peak == {"a.test": 2, "b.test": 2}
+
+
+def test_batch_prints_in_input_order(server, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(ypc, "_limiter", None)
+    monkeypatch.setattr(tcache, "TranscriptCache", functools.partial(tcache.TranscriptCache, root=str(tmp_path / "cache")))
+    ids = [f"video{i:06d}" for i in range(8)]
+    ids[3] = "not-an-id"
+    assert ypc.batch_main([*ids, ids[0], "--langs", "en", "--workers", "8"]) == 1
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [rec["id"] for rec in lines] == ids
+    assert lines[3]["error"] == "invalid video id"
+    assert all(rec["language"] == "en" for i, rec in enumerate(lines) if i != 3)
@@ -0,0 +1,74 @@
+import json
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+import youtube_state as ystate
+
+
+def _bump(path, n):
+    store = ystate.StateStore(path)
+    for _ in range(n):
+        store.update("channels", "a", lambda rec: rec.__setitem__("n", rec.get("n", 0) + 1))
+
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    path = str(tmp_path / "state.json")
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_bump, args=(path, 25)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    assert ystate.StateStore(path).get("channels", "a") == {"n": 100}
+
+
+def test_legacy_files_are_imported_once(tmp_path):
+    legacy = tmp_path / "a_last_video.json"
+    legacy.write_text(json.dumps({"video_id": "v1"}))
+    ids = tmp_path / "ids.json"
+    ids.write_text(json.dumps({"@alpha": {"channel_id": "UC1"}}))
+    store = ystate.StateStore(str(tmp_path / "state.json"))
+
+    assert store.get("channels", "a", str(legacy)) == {"video_id": "v1"}
+    assert store.get("channel_ids", "@alpha", str(ids), "@alpha") == {"channel_id": "UC1"}
+    assert store.get("channel_ids", "@beta", str(ids), "@beta") == {}
+    legacy.write_text(json.dumps({"video_id": "v0"}))
+    assert store.get("channels", "a", str(legacy)) == {"video_id": "v1"}  # the store wins from now on
+    assert os.path.exists(legacy)
+
+
+def test_claim_is_single_flight_and_clears_crashed_markers(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = ystate.StateStore(path)
+    held = threading.Event()
+    release = threading.Event()
+
+    def poller():
+        with ystate.StateStore(path).claim("a"):
+            store.mark("a", ["v1", "v2"])
+            held.set()
+            release.wait(5)
+
+    t = threading.Thread(target=poller)
+    t.start()
+    try:
+        assert held.wait(5)
+        with pytest.raises(ystate.Busy) as busy:
+            with store.claim("a"):
+                pass
+        assert busy.value.marker["videos"] == ["v1", "v2"]
+        assert "2 new video(s)" in str(busy.value)
+        with store.claim("b"):  # other channels are not blocked
+            pass
+    finally:
+        release.set()
+        t.join(5)
+    assert "in_progress" not in store.get("channels", "a")
+
+    # A marker without a lock holder was left by a run that died.
+    store.mark("a", ["v3"])
+    with store.claim("a"):
+        assert "in_progress" not in store.get("channels", "a")
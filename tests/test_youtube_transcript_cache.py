@@ -0,0 +1,19 @@
+import youtube_transcript_cache as tcache
+
+
+def test_size_tracks_overwrites_and_eviction(tmp_path):
+    cache = tcache.TranscriptCache(root=str(tmp_path), max_bytes=10**9)
+    cache.put("v1", "en", "api", "first")
+    for i in range(20):
+        cache.put("v1", "en", "api", "x" * i)
+    cache.put("v2", "en", "api", "")
+    assert cache._size == cache._scan_size()
+    assert cache.get_entry("v1", "en", "api")["text"] == "x" * 19
+    assert cache.get_entry("v2", "en", "api")["text"] == ""
+
+    one = cache._scan_size() // 2
+    cache.max_bytes = one * 3  # room for 3 entries
+    for i in range(3, 10):
+        cache.put(f"v{i}", "en", "api", "y" * 50)
+    assert cache._size == cache._scan_size() <= cache.max_bytes
+    assert cache.get_entry("v9", "en", "api") is not None